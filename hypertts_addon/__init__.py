@@ -10,6 +10,9 @@ import json
 if hasattr(sys, '_pytest_mode'):
     # called from within a test run
     pass
+elif os.environ.get('HYPER_TTS_HEADLESS', '') == 'enable':
+    # imported by the command line scripts, outside of Anki
+    pass
 else:
     # configure imports
     # =================
@@ -20,6 +23,10 @@ else:
     import aqt
     import anki.sound
 
+    # time each step of the initialization
+    from hypertts_addon import startup_tracer
+    tracer = startup_tracer.StartupTracer()
+
     # need to declare upfront whether we're doing crash reporting
     # ============================================================
     from hypertts_addon import constants
@@ -106,12 +113,15 @@ else:
         addon_config[constants.CONFIG_CONFIGURATION] = config_models.serialize_configuration(configuration)
         aqt.mw.addonManager.writeConfig(constants.CONFIG_ADDON_NAME, addon_config)
 
+    tracer.start_phase('read configuration')
     configuration, first_install = get_configuration()
     save_configuration(configuration)
+    tracer.end_phase()
 
     # setup sentry crash reporting
     # ============================
 
+    tracer.start_phase('sentry init')
     if hasattr(sys, '_sentry_crash_reporting'):
         # setup crash reporting
         # =====================
@@ -146,35 +156,29 @@ else:
         sentry_sdk.set_tag("hypertts_pro_user", configuration.hypertts_pro_api_key_set())
     else:
         logger.info(f'disabling crash reporting')
+    tracer.end_phase()
 
     # addon imports
     # =============
 
+    tracer.start_phase('addon imports')
     from . import anki_utils
-    from . import servicemanager
-    from . import hypertts
+    from . import startup
     from . import gui
+    tracer.end_phase()
 
     # initialize hypertts
     # ===================
 
     ankiutils = anki_utils.AnkiUtils()
-
-    def services_dir():
-        current_script_path = os.path.realpath(__file__)
-        current_script_dir = os.path.dirname(current_script_path)
-        return os.path.join(current_script_dir, 'services')
-    service_manager = servicemanager.ServiceManager(services_dir(), f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}', False)
-    service_manager.init_services()
-    hyper_tts = hypertts.HyperTTS(ankiutils, service_manager)
-    # configure services based on config
-    with hyper_tts.error_manager.get_single_action_context('Configuring Services'):
-        service_manager.configure(hyper_tts.get_configuration())
-    hyper_tts.schedule_sentry_email_update()
+    hyper_tts = startup.init_hypertts(ankiutils, tracer)
+    tracer.start_phase('gui init')
     gui.init(hyper_tts)
+    tracer.end_phase()
 
 
     # stats
+    tracer.start_phase('stats init')
     from . import stats
     from . import constants_events
     if not hasattr(sys, '_pytest_mode') and enable_stats_error_reporting:
@@ -199,4 +203,7 @@ else:
                     'hypertts_version': version.ANKI_HYPER_TTS_VERSION,
                     'hypertts_pro': configuration.hypertts_pro_api_key_set()
                 },
-            )
\ No newline at end of file
+            )
+    tracer.end_phase()
+
+    startup.finish_trace(ankiutils, tracer)
@@ -6,12 +6,14 @@ import aqt
 import anki.template
 import anki.sound
 import anki.collection
+import anki.utils
 import aqt.qt
 from typing import List
 from . import constants    
 from . import constants_events
 from . import errors
 from . import stats
+from . import media_link
 
 from . import logging_utils
 logger = logging_utils.get_child_logger(__name__)
@@ -100,6 +102,12 @@ class AnkiUtils():
         note = aqt.mw.col.get_note(note_id)
         return note
 
+    def get_note_mod_times(self, note_id_list):
+        # note_id -> modification time, in a single query, without loading the notes
+        ensure_anki_collection_open()
+        rows = aqt.mw.col.db.all(f'select id, mod from notes where id in {anki.utils.ids2str(note_id_list)}')
+        return {note_id: note_mod for note_id, note_mod in rows}
+
     def get_model(self, model_id):
         ensure_anki_collection_open()
         return aqt.mw.col.models.get(model_id)
@@ -124,9 +132,17 @@ class AnkiUtils():
 
     def media_add_file(self, filename):
         ensure_anki_collection_open()
+        # hardlink the cached file into the media folder when possible, so that it doesn't get stored twice
+        media_filename = media_link.link_media_file(filename, aqt.mw.col.media.dir())
+        if media_filename != None:
+            return media_filename
         full_filename = aqt.mw.col.media.add_file(filename)
         return full_filename
 
+    def media_file_exists(self, filename):
+        ensure_anki_collection_open()
+        return os.path.isfile(os.path.join(aqt.mw.col.media.dir(), filename))
+
     def undo_start(self):
         ensure_anki_collection_open()
         undo_id = aqt.mw.col.add_custom_undo_entry(constants.UNDO_ENTRY_NAME)
@@ -0,0 +1,119 @@
+"""audio cache packs let collaborators share the audio they generated. a pack is a zip file containing
+cached audio files from user_files (hypertts-<hash>.mp3), along with an index of the request each file
+was generated from. since the cache is content-addressed, an imported file gets used as soon as the
+same text is requested with the same voice and options."""
+
+import os
+import json
+import zipfile
+
+from . import constants
+from . import errors
+from . import options
+from . import voice as voice_module
+from . import config_models
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class AudioCachePackEntry():
+    def __init__(self, filename, source_text, voice_id: voice_module.TtsVoiceId_v3, voice_options):
+        self.filename = filename
+        self.source_text = source_text
+        self.voice_id = voice_id
+        self.voice_options = voice_options
+
+    def serialize(self):
+        audio_format = self.voice_options.get(options.AUDIO_FORMAT_PARAMETER, options.AudioFormat.mp3.name)
+        return {
+            'filename': self.filename,
+            'source_text': self.source_text,
+            'voice_id': voice_module.serialize_voice_id_v3(self.voice_id),
+            'options': self.voice_options,
+            'format': audio_format
+        }
+
+def deserialize_entry(data):
+    return AudioCachePackEntry(data['filename'], data['source_text'],
+        voice_module.deserialize_voice_id_v3(data['voice_id']), data['options'])
+
+
+def get_voice_list(voice_selection):
+    # any of the voices of a random or priority selection may have generated a note's audio
+    if voice_selection.selection_mode == constants.VoiceSelectionMode.single:
+        return [voice_selection.voice]
+    return voice_selection.get_voice_list()
+
+def collect_entries(hyper_tts, note_id_list, batch: config_models.BatchConfig):
+    """the cached audio files for the notes with the batch settings (a preset). notes whose audio isn't in
+    the cache are left out. each file appears once, even when several notes share the same text."""
+    entries = {}
+    voice_list = get_voice_list(batch.voice_selection)
+    for note_id in note_id_list:
+        note = hyper_tts.anki_utils.get_note_by_id(note_id)
+        try:
+            source_text = hyper_tts.get_source_text(note, batch.source, None)
+            processed_text = hyper_tts.process_text(source_text, batch.text_processing)
+        except errors.HyperTTSError as e:
+            logger.debug(f'skipping note {note_id}: {e}')
+            continue
+        for voice_with_options in voice_list:
+            full_filename = hyper_tts.get_audio_request_full_filename(processed_text, voice_with_options.voice_id, voice_with_options.options)
+            filename = os.path.basename(full_filename)
+            if filename not in entries and hyper_tts.is_cached_audio_file(full_filename):
+                entries[filename] = AudioCachePackEntry(filename, processed_text, voice_with_options.voice_id, voice_with_options.options)
+    return list(entries.values())
+
+def export_pack(hyper_tts, pack_path, entries):
+    user_files_dir = hyper_tts.anki_utils.get_user_files_dir()
+    index = {
+        'version': constants.AUDIO_CACHE_PACK_VERSION,
+        'entries': [entry.serialize() for entry in entries]
+    }
+    with zipfile.ZipFile(pack_path, 'w') as pack:
+        pack.writestr(constants.AUDIO_CACHE_PACK_INDEX, json.dumps(index, ensure_ascii=False, indent=1), compress_type=zipfile.ZIP_DEFLATED)
+        for entry in entries:
+            # mp3 and ogg are already compressed
+            pack.write(os.path.join(user_files_dir, entry.filename), entry.filename, compress_type=zipfile.ZIP_STORED)
+    logger.info(f'exported {len(entries)} audio files to {pack_path}')
+
+def read_index(pack, pack_path):
+    try:
+        index = json.loads(pack.read(constants.AUDIO_CACHE_PACK_INDEX).decode('utf-8'))
+    except (KeyError, ValueError) as e:
+        raise errors.InvalidAudioCachePack(pack_path, f'missing or invalid index: {e}')
+    if index.get('version', None) != constants.AUDIO_CACHE_PACK_VERSION:
+        raise errors.InvalidAudioCachePack(pack_path, f'unsupported version {index.get("version", None)}')
+    return index
+
+def import_pack(hyper_tts, pack_path):
+    """adds the audio files of the pack to the cache in user_files, files already in the cache are skipped.
+    returns (imported_count, skipped_count)"""
+    imported_count = 0
+    skipped_count = 0
+    try:
+        pack = zipfile.ZipFile(pack_path, 'r')
+    except (OSError, zipfile.BadZipFile) as e:
+        raise errors.InvalidAudioCachePack(pack_path, str(e))
+    with pack:
+        for entry_data in read_index(pack, pack_path)['entries']:
+            entry = deserialize_entry(entry_data)
+            # the name must be the one this addon would give to the request, otherwise the file would never be
+            # used, or could take the place of a different request's audio
+            full_filename = hyper_tts.get_audio_request_full_filename(entry.source_text, entry.voice_id, entry.voice_options)
+            if os.path.basename(full_filename) != entry.filename:
+                logger.warning(f'skipping {entry.filename} from {pack_path}, it does not match its request')
+                skipped_count += 1
+                continue
+            if hyper_tts.is_cached_audio_file(full_filename):
+                skipped_count += 1
+                continue
+            try:
+                audio_data = pack.read(entry.filename)
+            except KeyError:
+                raise errors.InvalidAudioCachePack(pack_path, f'{entry.filename} is in the index, but not in the pack')
+            # same as when audio gets generated
+            hyper_tts.write_audio_file(full_filename, audio_data)
+            imported_count += 1
+    logger.info(f'imported {imported_count} audio files from {pack_path}, {skipped_count} skipped')
+    return imported_count, skipped_count
@@ -0,0 +1,65 @@
+from . import options
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+# layer III bitrates in kbps, by bitrate index
+MP3_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+MP3_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+# by version bits, then sample rate index
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000], # MPEG 1
+    2: [22050, 24000, 16000], # MPEG 2
+    0: [11025, 12000, 8000], # MPEG 2.5
+}
+
+def join_audio_chunks(audio_chunks, audio_format: options.AudioFormat):
+    """joins the audio of the chunks of a long text into a single file"""
+    if audio_format == options.AudioFormat.mp3:
+        # mp3 frames can follow each other, but the ID3 tags and the Xing/Info frame of each chunk
+        # describe that chunk only, a player would stop at the end of the first one or seek wrongly
+        return b''.join([strip_mp3_headers(bytes(audio_chunk)) for audio_chunk in audio_chunks])
+    # ogg allows several streams one after the other (chained streams), each with its own headers
+    return b''.join([bytes(audio_chunk) for audio_chunk in audio_chunks])
+
+def strip_mp3_headers(audio_data):
+    # ID3v2 tag at the start
+    if audio_data[0:3] == b'ID3' and len(audio_data) >= 10:
+        tag_size = 10 + ((audio_data[6] & 0x7f) << 21 | (audio_data[7] & 0x7f) << 14 | (audio_data[8] & 0x7f) << 7 | (audio_data[9] & 0x7f))
+        if audio_data[5] & 0x10:
+            # footer
+            tag_size += 10
+        audio_data = audio_data[tag_size:]
+    # ID3v1 tag at the end
+    if len(audio_data) >= 128 and audio_data[-128:-125] == b'TAG':
+        audio_data = audio_data[:-128]
+    # Xing/Info or VBRI frame, a frame without audio which describes the whole file
+    frame_length = get_mp3_info_frame_length(audio_data)
+    if frame_length != None:
+        audio_data = audio_data[frame_length:]
+    return audio_data
+
+def get_mp3_info_frame_length(audio_data):
+    # length of the first frame if it's a Xing/Info or VBRI frame, None otherwise
+    if len(audio_data) < 4 or audio_data[0] != 0xff or (audio_data[1] & 0xe0) != 0xe0:
+        return None
+    version_bits = (audio_data[1] >> 3) & 0x03
+    layer_bits = (audio_data[1] >> 1) & 0x03
+    bitrate_index = audio_data[2] >> 4
+    sample_rate_index = (audio_data[2] >> 2) & 0x03
+    padding = (audio_data[2] >> 1) & 0x01
+    mono = (audio_data[3] >> 6) == 0x03
+    if version_bits not in MP3_SAMPLE_RATES or layer_bits != 1 or bitrate_index in [0, 15] or sample_rate_index == 3:
+        # not layer III, or a header we can't compute the length of
+        return None
+    sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    if version_bits == 3:
+        frame_length = 144 * MP3_BITRATES_MPEG1[bitrate_index] * 1000 // sample_rate + padding
+        side_info_length = 17 if mono else 32
+    else:
+        frame_length = 72 * MP3_BITRATES_MPEG2[bitrate_index] * 1000 // sample_rate + padding
+        side_info_length = 9 if mono else 17
+    xing_offset = 4 + side_info_length
+    if audio_data[xing_offset:xing_offset + 4] in [b'Xing', b'Info'] or audio_data[36:40] == b'VBRI':
+        return frame_length
+    return None
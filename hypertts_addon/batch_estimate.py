@@ -0,0 +1,90 @@
+import threading
+
+from . import constants
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class BatchEstimate():
+    """what running a batch is going to take: how many notes already have their audio in the cache,
+    how many requests will be made and how many characters get sent to each service, and roughly how
+    long it will take. filled in one note at a time, as the batch preview computes the processed text."""
+
+    def __init__(self, hypertts, voice_selection):
+        self.hypertts = hypertts
+        self.lock = threading.Lock()
+        self.candidate_voices = self.get_candidate_voices(voice_selection)
+        self.note_count = 0
+        self.cache_hits = 0.0
+        self.requests_by_service = {}
+        self.characters_by_service = {}
+        # audio files which will exist by the time we get to a given note
+        self.audio_filenames = set()
+
+    def get_candidate_voices(self, voice_selection):
+        # list of (voice with options, probability of being used)
+        if voice_selection == None:
+            return []
+        if voice_selection.selection_mode == constants.VoiceSelectionMode.single:
+            if voice_selection.voice == None:
+                return []
+            return [(voice_selection.voice, 1.0)]
+        elif voice_selection.selection_mode == constants.VoiceSelectionMode.random:
+            total_weight = sum([voice.random_weight for voice in voice_selection.voice_list])
+            if total_weight == 0:
+                return []
+            return [(voice, voice.random_weight / total_weight) for voice in voice_selection.voice_list]
+        elif voice_selection.selection_mode == constants.VoiceSelectionMode.priority:
+            # the other voices only get used when the first one doesn't have audio
+            if len(voice_selection.voice_list) == 0:
+                return []
+            return [(voice_selection.voice_list[0], 1.0)]
+        return []
+
+    def add_text(self, processed_text):
+        with self.lock:
+            self.note_count += 1
+            if processed_text == None or len(processed_text.strip()) == 0:
+                return
+            for voice_with_options, probability in self.candidate_voices:
+                full_filename = self.hypertts.get_audio_request_full_filename(processed_text,
+                    voice_with_options.voice_id, voice_with_options.options)
+                if full_filename in self.audio_filenames or self.hypertts.is_cached_audio_file(full_filename):
+                    self.cache_hits += probability
+                else:
+                    service = voice_with_options.voice_id.service
+                    self.requests_by_service[service] = self.requests_by_service.get(service, 0) + probability
+                    self.characters_by_service[service] = self.characters_by_service.get(service, 0) + probability * len(processed_text)
+                self.audio_filenames.add(full_filename)
+
+    def get_request_count(self):
+        with self.lock:
+            return sum(self.requests_by_service.values())
+
+    def get_projected_duration_seconds(self):
+        with self.lock:
+            duration_seconds = 0
+            for service, request_count in self.requests_by_service.items():
+                request_duration = self.hypertts.service_manager.get_average_request_duration(service)
+                if request_duration == None:
+                    request_duration = constants.BATCH_ESTIMATE_DEFAULT_REQUEST_SECONDS
+                duration_seconds += request_count * request_duration
+            return duration_seconds
+
+    def get_summary_text(self):
+        request_count = self.get_request_count()
+        duration_seconds = self.get_projected_duration_seconds()
+        with self.lock:
+            characters_text = ', '.join([f'{service}: {characters:,.0f} characters'
+                for service, characters in sorted(self.characters_by_service.items())])
+            cache_hits = self.cache_hits
+            note_count = self.note_count
+        if duration_seconds >= 120:
+            duration_text = f'{duration_seconds / 60:.0f} minutes'
+        else:
+            duration_text = f'{duration_seconds:.0f} seconds'
+        summary = f'<b>Estimate:</b> {note_count} notes, {cache_hits:.0f} already generated, {request_count:.0f} requests'
+        if len(characters_text) > 0:
+            summary += f' ({characters_text})'
+        summary += f', about {duration_text}'
+        return summary
@@ -0,0 +1,82 @@
+import os
+import json
+import time
+
+from . import constants
+from . import batch_status
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class BatchJournal():
+    """append-only record of the notes processed by a batch, one json line per note. when the
+    same batch gets run again after being interrupted, notes which are already done get skipped
+    and only the rest (including failures) get processed. a done note is only skipped as long as
+    it hasn't been modified since the batch updated it, and journals expire after a few days."""
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.entries = {} # note_id -> latest entry
+        self.file = None
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.journal_path):
+            return
+        if time.time() - os.path.getmtime(self.journal_path) > constants.BATCH_JOURNAL_MAX_AGE_SECONDS:
+            logger.info(f'batch journal {self.journal_path} expired, removing it')
+            os.remove(self.journal_path)
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line may be incomplete if anki was closed while writing it
+                    logger.warning(f'ignoring invalid line in batch journal {self.journal_path}')
+                    continue
+                self.entries[entry['note_id']] = entry
+        logger.info(f'loaded batch journal {self.journal_path} with {len(self.entries)} notes')
+
+    def get_done_note_ids(self):
+        return [note_id for note_id, entry in self.entries.items() if entry['status'] == constants.BatchNoteStatus.Done.name]
+
+    def get_done_entry(self, note_id, note_mod):
+        # note_mod: current modification time of the note. if the note was modified after the batch
+        # updated it, its audio may be outdated and it needs to be processed again
+        entry = self.entries.get(note_id, None)
+        if entry != None and entry['status'] == constants.BatchNoteStatus.Done.name and \
+            entry.get('note_mod', None) != None and entry['note_mod'] == note_mod:
+            return entry
+        return None
+
+    def record(self, note_id, status: constants.BatchNoteStatus, audio_filename=None, sound_file=None,
+            note_mod=None, source_text=None, processed_text=None):
+        entry = {
+            'note_id': note_id,
+            'status': status.name,
+            'audio_filename': audio_filename,
+            'sound_file': sound_file,
+            'note_mod': note_mod,
+            # restored into the batch status when the note gets skipped
+            'source_text': batch_status.truncate_text(source_text),
+            'processed_text': batch_status.truncate_text(processed_text)
+        }
+        self.entries[note_id] = entry
+        if self.file == None:
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            self.file = open(self.journal_path, 'a', encoding='utf-8')
+        self.file.write(json.dumps(entry) + '\n')
+        # make it to disk even if anki gets closed in the middle of the batch
+        self.file.flush()
+
+    def close(self):
+        if self.file != None:
+            self.file.close()
+            self.file = None
+
+    def delete(self):
+        self.close()
+        self.entries = {}
+        if os.path.isfile(self.journal_path):
+            os.remove(self.journal_path)
@@ -1,5 +1,6 @@
 import sys
 import time
+import array
 
 from . import constants
 from . import errors
@@ -9,14 +10,51 @@ logger = logging_utils.get_child_logger(__name__)
 if hasattr(sys, '_sentry_crash_reporting'):
     import sentry_sdk
 
+# compact codes for the status array, 0 is no status yet
+STATUS_LIST = [None] + list(constants.BatchNoteStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_LIST)}
+
+def truncate_text(text):
+    # the batch status only displays the texts, long ones don't need to be kept in full
+    if is_truncated(text):
+        return text[:constants.BATCH_STATUS_TEXT_PREVIEW_LENGTH] + '...'
+    return text
+
+def is_truncated(text):
+    # for a text of the batch status, whether it only has the beginning of the original
+    return text != None and len(text) > constants.BATCH_STATUS_TEXT_PREVIEW_LENGTH
+
 class NoteStatus():
-    def __init__(self, note_id):
-        self.note_id = note_id
-        self.source_text = None
-        self.processed_text = None
-        self.sound_file = None
-        self.error = None
-        self.status = None
+    """view of one row of the BatchStatus, created on access"""
+    __slots__ = ('batch_status', 'row')
+
+    def __init__(self, batch_status, row):
+        self.batch_status = batch_status
+        self.row = row
+
+    @property
+    def note_id(self):
+        return self.batch_status.note_id_list[self.row]
+
+    @property
+    def source_text(self):
+        return self.batch_status.source_texts[self.row]
+
+    @property
+    def processed_text(self):
+        return self.batch_status.processed_texts[self.row]
+
+    @property
+    def sound_file(self):
+        return self.batch_status.sound_files[self.row]
+
+    @property
+    def error(self):
+        return self.batch_status.errors[self.row]
+
+    @property
+    def status(self):
+        return STATUS_LIST[self.batch_status.status_codes[self.row]]
 
 class BatchNoteActionContext():
     def __init__(self, batch_status, note_id):
@@ -90,24 +128,26 @@ class BatchRunningActionContext():
         return False
 
 class BatchStatus():
+    """status of each note of a batch. stored column-wise, with the status as a byte array and the texts
+    truncated, so that memory stays low for large batches. errors are kept as messages, an exception
+    would hold on to its traceback, along with the note being processed."""
+
     def __init__(self, anki_utils, note_id_list, change_listener):
         self.anki_utils = anki_utils
         self.note_id_list = note_id_list
         self.change_listener = change_listener
-        self.note_status_array = []
-        self.note_status_map = {}
-        self.note_id_map = {}
+        note_count = len(note_id_list)
+        self.status_codes = array.array('B', bytes(note_count))
+        self.source_texts = [None] * note_count
+        self.processed_texts = [None] * note_count
+        self.sound_files = [None] * note_count
+        self.errors = [None] * note_count
+        self.note_id_map = {note_id: row for row, note_id in enumerate(note_id_list)}
+        self.start_time = None
         self.task_running = False
         self.must_continue = False
         self._track_metrics = False
-        i = 0
-        for note_id in self.note_id_list:
-            note_status = NoteStatus(note_id)
-            self.note_status_array.append(note_status)
-            self.note_status_map[note_id] = note_status
-            self.note_id_map[note_id] = i
-            i += 1
-    
+
     def is_running(self):
         return self.task_running
 
@@ -116,51 +156,68 @@ class BatchStatus():
         self.must_continue = False
 
     def __getitem__(self, array_index):
-        return self.note_status_array[array_index]
+        if array_index < 0 or array_index >= len(self.note_id_list):
+            raise IndexError(array_index)
+        return NoteStatus(self, array_index)
+
+    def __len__(self):
+        return len(self.note_id_list)
+
+    def __iter__(self):
+        for row in range(len(self.note_id_list)):
+            yield NoteStatus(self, row)
+
+    def get_note_status(self, note_id):
+        return NoteStatus(self, self.note_id_map[note_id])
+
+    def get_status(self, note_id):
+        return STATUS_LIST[self.status_codes[self.note_id_map[note_id]]]
 
     def get_batch_running_action_context(self, track_metrics=False):
         self._track_metrics = track_metrics
         return BatchRunningActionContext(self)
 
     def get_note_action_context(self, note_id, blank_fields):
-        note_status = self.note_status_map[note_id]
-        note_status.error = None
-        note_status.status = constants.BatchNoteStatus.Processing
+        row = self.note_id_map[note_id]
+        self.errors[row] = None
+        self.status_codes[row] = STATUS_CODES[constants.BatchNoteStatus.Processing]
         if blank_fields:
-            note_status.source_text = None
-            note_status.processed_text = None
-            note_status.sound_file = None
+            self.source_texts[row] = None
+            self.processed_texts[row] = None
+            self.sound_files[row] = None
         return BatchNoteActionContext(self, note_id)
 
     # error reporting
 
     def report_known_error(self, note_id, exception_value):
-        self.note_status_map[note_id].status = constants.BatchNoteStatus.Error
-        self.note_status_map[note_id].error = exception_value
+        row = self.note_id_map[note_id]
+        self.status_codes[row] = STATUS_CODES[constants.BatchNoteStatus.Error]
+        self.errors[row] = str(exception_value)
         self.notify_change(note_id)
 
     def report_unknown_exception(self, note_id, exception_value):
-        self.note_status_map[note_id].status = constants.BatchNoteStatus.Error
-        self.note_status_map[note_id].error = exception_value
+        row = self.note_id_map[note_id]
+        self.status_codes[row] = STATUS_CODES[constants.BatchNoteStatus.Error]
+        self.errors[row] = str(exception_value)
         self.anki_utils.report_unknown_exception_background(exception_value)
         self.notify_change(note_id)
 
-    # set the various fields on the NoteStatus
+    # set the various fields of a note
 
     def set_source_text(self, note_id, source_text):
-        self.note_status_map[note_id].source_text = source_text
+        self.source_texts[self.note_id_map[note_id]] = truncate_text(source_text)
         self.notify_change(note_id)
 
     def set_processed_text(self, note_id, processed_text):
-        self.note_status_map[note_id].processed_text = processed_text
+        self.processed_texts[self.note_id_map[note_id]] = truncate_text(processed_text)
         self.notify_change(note_id)
 
     def set_sound_file(self, note_id, sound_file):
-        self.note_status_map[note_id].sound_file = sound_file
+        self.sound_files[self.note_id_map[note_id]] = sound_file
         self.notify_change(note_id)
 
     def set_status(self, note_id, status):
-        self.note_status_map[note_id].status = status
+        self.status_codes[self.note_id_map[note_id]] = STATUS_CODES[status]
         self.notify_change(note_id)
 
     def notify_start(self):
@@ -0,0 +1,62 @@
+import time
+import threading
+
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class CircuitBreaker():
+    """tracks consecutive failures of one kind for a service. once failure_threshold is reached,
+    the circuit opens and requests fail immediately for open_seconds. after that, a single trial
+    request is let through (half-open): success closes the circuit, failure opens it again."""
+
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, open_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.lock = threading.Lock()
+        self.state = self.STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_time = None
+        self.trial_in_progress = False
+
+    def allow_request(self):
+        # returns (allowed, seconds until the next trial request)
+        with self.lock:
+            if self.state == self.STATE_CLOSED:
+                return True, 0
+            remaining_seconds = self.opened_time + self.open_seconds - time.monotonic()
+            if self.state == self.STATE_OPEN and remaining_seconds <= 0:
+                logger.info(f'circuit {self.name}: letting a trial request through')
+                self.state = self.STATE_HALF_OPEN
+            if self.state == self.STATE_HALF_OPEN and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return True, 0
+            return False, max(remaining_seconds, 0)
+
+    def record_success(self):
+        with self.lock:
+            if self.state != self.STATE_CLOSED:
+                logger.info(f'circuit {self.name}: closed')
+            self.state = self.STATE_CLOSED
+            self.consecutive_failures = 0
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.trial_in_progress = False
+            if self.state == self.STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.STATE_OPEN:
+                    logger.warning(f'circuit {self.name}: open after {self.consecutive_failures} consecutive failures')
+                self.state = self.STATE_OPEN
+                self.opened_time = time.monotonic()
+
+    def record_inconclusive(self):
+        # the request failed for another reason, which says nothing about the service being down
+        with self.lock:
+            self.trial_in_progress = False
@@ -7,15 +7,10 @@ import aqt.operations
 from . import constants
 from . import component_common
 from . import batch_status
+from . import batch_estimate
 from . import logging_utils
 logger = logging_utils.get_child_logger(__name__)
 
-class TableRepaintTimer():
-    def __init__(self, delay_ms):
-        self.delay_ms = delay_ms
-        self.timer_obj = None
-
-
 class BatchPreviewTableModel(aqt.qt.QAbstractTableModel):
     def __init__(self, batch_status):
         aqt.qt.QAbstractTableModel.__init__(self, None)
@@ -98,8 +93,15 @@ class BatchPreview(component_common.ComponentBase):
         self.selected_row = None
 
         self.apply_to_notes_batch_started = False
+        self.changed_notes_only_checkbox = aqt.qt.QCheckBox(constants.GUI_TEXT_BATCH_CHANGED_NOTES_ONLY)
+        self.changed_notes_only = False
+        self.discard_progress_checkbox = aqt.qt.QCheckBox(constants.GUI_TEXT_BATCH_DISCARD_PROGRESS)
+        self.discard_progress = False
 
-        self.table_repaint_timer = TableRepaintTimer(500)
+        self.table_repaint_timer = component_common.DebounceTimer(500)
+        self.batch_estimate = None
+        self.estimate_label = aqt.qt.QLabel()
+        self.estimate_label_timer = component_common.DebounceTimer(500)
 
     def load_model(self, model):
         self.batch_model = model
@@ -114,7 +116,10 @@ class BatchPreview(component_common.ComponentBase):
 
         logger.info('update_batch_status_task')
         if self.batch_model.text_processing != None:
-            self.hypertts.populate_batch_status_processed_text(self.note_id_list, self.batch_model.source, self.batch_model.text_processing, self.batch_status)
+            # the estimate gets filled in as we go through the notes
+            self.batch_estimate = batch_estimate.BatchEstimate(self.hypertts, self.batch_model.voice_selection)
+            self.hypertts.populate_batch_status_processed_text(self.note_id_list, self.batch_model.source,
+                self.batch_model.text_processing, self.batch_status, self.batch_estimate)
 
     def update_batch_status_task_done(self, result):
         logger.info('update_batch_status_task_done')
@@ -142,6 +147,10 @@ class BatchPreview(component_common.ComponentBase):
 
         # populate the "notRunning" stack
         notRunningLayout = aqt.qt.QVBoxLayout()
+        self.estimate_label.setWordWrap(True)
+        notRunningLayout.addWidget(self.estimate_label)
+        notRunningLayout.addWidget(self.changed_notes_only_checkbox)
+        notRunningLayout.addWidget(self.discard_progress_checkbox)
         self.batchNotRunningStack.setLayout(notRunningLayout)
 
         # poulate the "running" stack
@@ -191,6 +200,10 @@ class BatchPreview(component_common.ComponentBase):
         note_status = self.get_selected_note_status()
         if note_status != None:
             text = note_status.processed_text
+            if batch_status.is_truncated(text):
+                # the batch status only keeps the beginning of long texts
+                note = self.hypertts.anki_utils.get_note_by_id(note_status.note_id)
+                _, text = self.hypertts.get_source_processed_text(note, self.batch_model.source, self.batch_model.text_processing)
             self.sample_selection_fn(note_status.note_id, text)
 
     def update_error_label_for_selected(self):
@@ -211,13 +224,16 @@ class BatchPreview(component_common.ComponentBase):
 
     def apply_audio_to_notes(self):
         self.apply_to_notes_batch_started = True
+        self.changed_notes_only = self.changed_notes_only_checkbox.isChecked()
+        self.discard_progress = self.discard_progress_checkbox.isChecked()
         self.hypertts.anki_utils.run_in_background_collection_op(self.dialog, self.apply_audio_fn, self.finished_apply_audio_fn)
 
     def stop_button_pressed(self):
         self.batch_status.stop()
 
     def apply_audio_fn(self, anki_collection):
-        self.hypertts.process_batch_audio(self.note_id_list, self.batch_model, self.batch_status, anki_collection)
+        self.hypertts.process_batch_audio(self.note_id_list, self.batch_model, self.batch_status, anki_collection,
+            changed_notes_only=self.changed_notes_only, discard_progress=self.discard_progress)
 
     def finished_apply_audio_fn(self, result):
         logger.debug(f'finished_apply_audio_fn, result: {result}')
@@ -268,8 +284,21 @@ class BatchPreview(component_common.ComponentBase):
             # logger.info('table_viewport_repaint')
             self.table_view.viewport().repaint()
 
+    def estimate_label_refresh_timer(self):
+        # needs to be called on main thread. the timer isn't restarted on every change, so that the
+        # estimate keeps updating while the notes are being processed
+        timer_obj = self.estimate_label_timer.timer_obj
+        if timer_obj == None or not timer_obj.isActive():
+            self.hypertts.anki_utils.call_on_timer_expire(self.estimate_label_timer, self.update_estimate_label)
+
+    def update_estimate_label(self):
+        if self.batch_estimate != None:
+            self.estimate_label.setText(self.batch_estimate.get_summary_text())
+
     def batch_change(self, note_id, row, total_count, start_time, current_time):
         # logger.info(f'change_listener row {row}')
+        if not self.apply_to_notes_batch_started:
+            self.hypertts.anki_utils.run_on_main(self.estimate_label_refresh_timer)
         self.hypertts.anki_utils.run_on_main(lambda: self.batch_preview_table_model.notifyChange(row))
         self.hypertts.anki_utils.run_on_main(lambda: self.update_progress_bar(row, total_count, start_time, current_time))
         self.hypertts.anki_utils.run_on_main(lambda: self.table_viewport_repaint_refresh_timer())
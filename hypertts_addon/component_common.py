@@ -1,5 +1,12 @@
 import abc
 
+class DebounceTimer():
+    # used with anki_utils.call_on_timer_expire, which restarts the timer on every call,
+    # so that a burst of calls results in a single one once the delay is over
+    def __init__(self, delay_ms):
+        self.delay_ms = delay_ms
+        self.timer_obj = None
+
 class ComponentBase(abc.ABC):
     @abc.abstractmethod
     def draw(self):
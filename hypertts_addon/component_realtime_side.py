@@ -13,7 +13,6 @@ from . import text_utils
 from . import logging_utils
 logger = logging_utils.get_child_logger(__name__)
 
-
 class ComponentRealtimeSide(component_common.ConfigComponentBase):
     MIN_WIDTH_COMPONENT = 600
     MIN_HEIGHT = 400
@@ -36,6 +35,9 @@ class ComponentRealtimeSide(component_common.ConfigComponentBase):
 
         self.preview_sound_button = aqt.qt.QPushButton('Preview Sound')
 
+        # collapse bursts of model changes into a single preview render
+        self.preview_update_timer = component_common.DebounceTimer(constants.REALTIME_PREVIEW_UPDATE_DELAY_MS)
+
     def configure_note(self, note):
         self.note = note
         field_list = self.hypertts.get_fields_from_note(self.note)
@@ -96,7 +98,10 @@ class ComponentRealtimeSide(component_common.ConfigComponentBase):
         self.model_change_callback(self.model)
 
     def update_preview(self):
-        logger.info('update_preview')
+        self.hypertts.anki_utils.call_on_timer_expire(self.preview_update_timer, self.render_preview)
+
+    def render_preview(self):
+        logger.info('render_preview')
         try:
             # does the realtime model pass validation ?
             if self.get_model().side_enabled:
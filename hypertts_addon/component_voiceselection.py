@@ -41,26 +41,32 @@ class VoiceSelection(component_common.ConfigComponentBase):
             combobox.view().setVerticalScrollBarPolicy(aqt.qt.Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
         self.voices_combobox.setFont(gui_utils.get_large_combobox_font())
 
+        self.voice_search_lineedit = aqt.qt.QLineEdit()
+        self.voice_search_lineedit.setPlaceholderText('Search voices by name')
+        self.voice_search_lineedit.setClearButtonEnabled(True)
+
+        # positions (within self.voice_index) of the voices currently shown in voices_combobox
+        self.displayed_voice_positions = None
+
         self.play_sample_button = aqt.qt.QPushButton('Play Sample')
 
         self.reset_filters_button = aqt.qt.QPushButton('Reset Filters')        
 
+        self.concurrent_probing_checkbox = aqt.qt.QCheckBox('Request dictionary and free voices at the same time (faster, sends more requests)')
 
-    def get_voices(self):
-        self.voice_list = self.hypertts.service_manager.full_voice_list()
-
-        languages = set()
-        audio_languages = set()
-        services = set()
-        genders = set()
 
-        for voice in self.voice_list:
-            # with ttsvoice v3, voices can support multiple languages
-            for audio_language in voice.audio_languages:
-                audio_languages.add(audio_language)
-                languages.add(audio_language.lang)
-            services.add(voice.service)
-            genders.add(voice.gender)
+    def get_voices(self):
+        # the index keeps the voices sorted by display string, so self.voice_list positions
+        # line up with the voices combobox rows when no filter is applied
+        self.voice_index = voice_module.VoiceIndex(self.hypertts.service_manager.full_voice_list())
+        self.voice_list = self.voice_index.voices
+        self.displayed_voice_positions = None
+
+        # with ttsvoice v3, voices can support multiple languages
+        languages = self.voice_index.language_facet.keys()
+        audio_languages = self.voice_index.audio_language_facet.keys()
+        services = self.voice_index.service_facet.keys()
+        genders = self.voice_index.gender_facet.keys()
 
         def get_name(entry):
             return entry.name
@@ -122,6 +128,7 @@ class VoiceSelection(component_common.ConfigComponentBase):
         elif model.selection_mode == constants.VoiceSelectionMode.priority:
             self.radio_button_priority.setChecked(True)
             self.voice_selection_model = model
+            self.concurrent_probing_checkbox.setChecked(model.concurrent_probing)
             self.redraw_selected_voices()
 
         self.enable_model_change_callback = True
@@ -194,6 +201,9 @@ class VoiceSelection(component_common.ConfigComponentBase):
         gridlayout.addWidget(aqt.qt.QLabel('Gender'), row, 0, 1, 1)        
         gridlayout.addWidget(self.genders_combobox, row, 1, 1, 1)
         row +=1 
+        gridlayout.addWidget(aqt.qt.QLabel('Search'), row, 0, 1, 1)
+        gridlayout.addWidget(self.voice_search_lineedit, row, 1, 1, 1)
+        row +=1 
         gridlayout.addWidget(self.reset_filters_button, row, 0, 1, 2)
         self.groupbox_voice_filters.setLayout(gridlayout)
         self.voices_layout.addWidget(self.groupbox_voice_filters)
@@ -245,6 +255,9 @@ class VoiceSelection(component_common.ConfigComponentBase):
 
         self.add_voice_button = aqt.qt.QPushButton('Add Voice')
         vlayout.addWidget(self.add_voice_button)
+        # only applies to priority mode
+        vlayout.addWidget(self.concurrent_probing_checkbox)
+        self.concurrent_probing_checkbox.setVisible(False)
 
         # voice list grid
         # ---------------
@@ -275,6 +288,7 @@ class VoiceSelection(component_common.ConfigComponentBase):
         self.languages_combobox.currentIndexChanged.connect(self.filter_and_draw_voices)
         self.services_combobox.currentIndexChanged.connect(self.filter_and_draw_voices)
         self.genders_combobox.currentIndexChanged.connect(self.filter_and_draw_voices)
+        self.voice_search_lineedit.textChanged.connect(self.filter_and_draw_voices)
 
         self.voices_combobox.currentIndexChanged.connect(self.voice_selected)
 
@@ -289,6 +303,7 @@ class VoiceSelection(component_common.ConfigComponentBase):
         self.radio_button_priority.toggled.connect(self.voice_selection_mode_change)
 
         self.add_voice_button.pressed.connect(self.add_voice)
+        self.concurrent_probing_checkbox.stateChanged.connect(self.concurrent_probing_change)
 
         self.filter_and_draw_voices(0)
 
@@ -305,14 +320,22 @@ class VoiceSelection(component_common.ConfigComponentBase):
         elif self.radio_button_priority.isChecked():
             self.voice_list_display_stack.setCurrentIndex(1)
             self.voice_selection_model = config_models.VoiceSelectionPriority()
+            self.voice_selection_model.concurrent_probing = self.concurrent_probing_checkbox.isChecked()
+        self.concurrent_probing_checkbox.setVisible(self.radio_button_priority.isChecked())
         self.redraw_selected_voices()
         self.notify_model_update()
 
+    def concurrent_probing_change(self, checkbox_value):
+        if self.voice_selection_model.selection_mode == constants.VoiceSelectionMode.priority:
+            self.voice_selection_model.concurrent_probing = self.concurrent_probing_checkbox.isChecked()
+            self.notify_model_update()
+
     def reset_filters(self):
         self.audio_languages_combobox.setCurrentIndex(0)
         self.languages_combobox.setCurrentIndex(0)
         self.services_combobox.setCurrentIndex(0)
         self.genders_combobox.setCurrentIndex(0)
+        self.voice_search_lineedit.setText('')
 
     def get_selected_voice(self):
         if len(self.filtered_voice_list) == 0:
@@ -431,43 +454,58 @@ class VoiceSelection(component_common.ConfigComponentBase):
             self.voice_selection_model.set_voice(config_models.VoiceWithOptions(voice.voice_id, {}))
             self.notify_model_update()
 
+    def get_filter_value(self, combobox, values):
+        # first two entries are "All" and the separator
+        if combobox.currentIndex() <= 0:
+            return None
+        return values[combobox.currentIndex() - 2]
+
     def filter_and_draw_voices(self, current_index):
         logger.info('filter_and_draw_voices')
-        voice_list = self.voice_list
-        logger.debug(f'initial voice count: {len(voice_list)}')
-        # check filtering by audio language
-        if self.audio_languages_combobox.currentIndex() != 0:
-            audio_language = self.audio_languages[self.audio_languages_combobox.currentIndex() - 2]
-            voice_list = [voice for voice in voice_list if audio_language in voice.audio_languages]
-            logger.debug(f'filtered by audio_language {audio_language}, voice count: {len(voice_list)}')
-        # check filtering by language
-        if self.languages_combobox.currentIndex() != 0:
-            language = self.languages[self.languages_combobox.currentIndex() - 2]
-            voice_list = [voice for voice in voice_list if language in voice.language_list]
-            logger.debug(f'filtered by language {language}, voice count: {len(voice_list)}')
-        # check filtering by service
-        if self.services_combobox.currentIndex() != 0:
-            service = self.services[self.services_combobox.currentIndex() - 2]
-            voice_list = [voice for voice in voice_list if voice.service == service] 
-            logger.debug(f'filtered by service {service}, voice count: {len(voice_list)}')
-        # check filtering by gender
-        if self.genders_combobox.currentIndex() != 0:
-            gender = self.genders[self.genders_combobox.currentIndex() - 2]
-            voice_list = [voice for voice in voice_list if voice.gender == gender]
-            logger.debug(f'filtered by gender {gender}, voice count: {len(voice_list)}')
-        def voice_sort_key(voice):
-            return str(voice)
-        # sort
-        voice_list.sort(key=voice_sort_key)
-        self.filtered_voice_list = voice_list
-        # logger.debug(f'filtered_voice_list: {self.filtered_voice_list}')
-        self.draw_all_voices(self.filtered_voice_list)
-
-    def draw_all_voices(self, voice_list):
-        self.voices_combobox.clear()
-        self.voices_combobox.addItems([str(voice) for voice in voice_list])
+        positions = self.voice_index.filter(
+            audio_language=self.get_filter_value(self.audio_languages_combobox, self.audio_languages),
+            language=self.get_filter_value(self.languages_combobox, self.languages),
+            service=self.get_filter_value(self.services_combobox, self.services),
+            gender=self.get_filter_value(self.genders_combobox, self.genders),
+            search_text=self.voice_search_lineedit.text())
+        logger.debug(f'voice count: {len(positions)} out of {len(self.voice_list)}')
+        self.filtered_voice_list = [self.voice_list[position] for position in positions]
+        self.draw_all_voices(positions)
+
+    def draw_all_voices(self, positions):
+        previous_positions = self.displayed_voice_positions
+        if previous_positions == positions:
+            # nothing changed, keep the current selection
+            return
+
+        self.voices_combobox.blockSignals(True)
+        if previous_positions is None:
+            removed_positions = None
+        else:
+            new_position_set = set(positions)
+            previous_position_set = set(previous_positions)
+            removed_positions = previous_position_set - new_position_set
+            added_positions = new_position_set - previous_position_set
+        if removed_positions is None or len(removed_positions) + len(added_positions) >= len(positions):
+            # most rows change, a full repopulate is cheaper
+            self.voices_combobox.clear()
+            self.voices_combobox.addItems([self.voice_index.display_names[position] for position in positions])
+        else:
+            # only touch the rows which changed, both lists follow the index order
+            for row in reversed(range(len(previous_positions))):
+                if previous_positions[row] in removed_positions:
+                    self.voices_combobox.removeItem(row)
+            for row, position in enumerate(positions):
+                if position in added_positions:
+                    self.voices_combobox.insertItem(row, self.voice_index.display_names[position])
+        self.displayed_voice_positions = positions
+        if len(positions) > 0:
+            self.voices_combobox.setCurrentIndex(0)
+        self.voices_combobox.blockSignals(False)
         logger.debug(f'voices_combobox has {self.voices_combobox.count()} items')
 
+        self.voice_selected(self.voices_combobox.currentIndex())
+
     def clear_voice_list_grid_layout(self):
         for i in reversed(range(self.voice_list_grid_layout.count())): 
             self.voice_list_grid_layout.itemAt(i).widget().setParent(None)        
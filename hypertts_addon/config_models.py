@@ -300,6 +300,23 @@ class VoiceSelectionPriority(VoiceSelectionMultipleBase):
     def __init__(self):
         VoiceSelectionMultipleBase.__init__(self)
         self._selection_mode = constants.VoiceSelectionMode.priority
+        # request all voices at the same time, keep the highest priority one which found audio
+        self._concurrent_probing = False
+
+    def get_concurrent_probing(self):
+        return self._concurrent_probing
+
+    def set_concurrent_probing(self, concurrent_probing):
+        self._concurrent_probing = concurrent_probing
+
+    concurrent_probing = property(get_concurrent_probing, set_concurrent_probing)
+
+    def serialize(self):
+        result = VoiceSelectionMultipleBase.serialize(self)
+        # only written out when enabled, presets saved before this option existed don't change
+        if self._concurrent_probing:
+            result['concurrent_probing'] = True
+        return result
 
 # text processing
 # ===============
@@ -692,20 +709,69 @@ class MappingRule:
                 return False
         return True
 
+class MappingRulesIndex():
+    """
+    lookup tables from model_id / (model_id, deck_id) to the candidate rules, in their original order.
+    enabled/automatic flags are still evaluated on the candidates, only the note type / deck matching
+    is precomputed. built from the saved rules, which are not modified afterwards.
+    """
+    def __init__(self, rules: List[MappingRule]):
+        # NoteType rules, keyed by model_id
+        self.note_type_rules = {}
+        # DeckNoteType rules, keyed by (model_id, deck_id)
+        self.deck_note_type_rules = {}
+        # default rules (easy mode), keyed by (model_id, deck_id)
+        self.default_rules = {}
+        for absolute_index, rule in enumerate(rules):
+            if rule.rule_type == constants.MappingRuleType.DeckNoteType:
+                self.deck_note_type_rules.setdefault((rule.model_id, rule.deck_id), []).append((absolute_index, rule))
+            else:
+                self.note_type_rules.setdefault(rule.model_id, []).append((absolute_index, rule))
+            if rule.is_default:
+                self.default_rules.setdefault((rule.model_id, rule.deck_id), rule)
+        # merged candidate lists, computed on first lookup for a given deck_note_type
+        self.candidates_cache = {}
+
+    def get_candidate_rules(self, deck_note_type: DeckNoteType):
+        key = (deck_note_type.model_id, deck_note_type.deck_id)
+        candidates = self.candidates_cache.get(key, None)
+        if candidates == None:
+            candidates = sorted(self.note_type_rules.get(deck_note_type.model_id, []) +
+                self.deck_note_type_rules.get(key, []), key=lambda x: x[0])
+            self.candidates_cache[key] = candidates
+        return candidates
+
+    def get_default_rule(self, deck_note_type: DeckNoteType) -> Optional[MappingRule]:
+        return self.default_rules.get((deck_note_type.model_id, deck_note_type.deck_id), None)
+
 @dataclass
 class PresetMappingRules:
     rules: List[MappingRule] = field(default_factory=list)
     # whether to use the easy add mode
     use_easy_mode: bool = False
+    # lookup index, not serialized. only built on the saved rules (see HyperTTS.load_mapping_rules_indexed),
+    # the copies edited in the GUI do full scans
+    _index: Optional[MappingRulesIndex] = field(default=None, init=False, repr=False, compare=False)
+
+    def build_index(self):
+        """precompute rule lookups, called when the rules are loaded from / saved to the config"""
+        self._index = MappingRulesIndex(self.rules)
+
+    def get_index(self) -> Optional[MappingRulesIndex]:
+        return self._index
 
     def iterate_applicable_rules(self, deck_note_type: DeckNoteType, automated: bool):
+        index = self.get_index()
+        if index != None:
+            candidates = index.get_candidate_rules(deck_note_type)
+        else:
+            candidates = enumerate(self.rules)
         subset_index = 0
-        for absolute_index, rule in enumerate(self.rules):
-            logger.info(f'evaluating rule {rule} with deck_note_type {deck_note_type}')
+        for absolute_index, rule in candidates:
             if rule.rule_applies(deck_note_type, automated):
-                logger.info(f'rule applies: {rule} on deck_note_type {deck_note_type}')
                 yield absolute_index, subset_index, rule
                 subset_index += 1
+        logger.debug(f'found {subset_index} applicable rules for deck_note_type {deck_note_type}')
 
     def iterate_related_rules(self, deck_note_type: DeckNoteType):
         """get list of rules to display in the GUI"""
@@ -715,28 +781,35 @@ class PresetMappingRules:
                 yield absolute_index, subset_index, rule
                 subset_index += 1
 
-    def get_default_preset_id(self, deck_note_type: DeckNoteType) -> Optional[str]:
-        """Get the preset_id marked as default for this deck/note type combination"""
+    def get_default_rule(self, deck_note_type: DeckNoteType) -> Optional[MappingRule]:
+        index = self.get_index()
+        if index != None:
+            return index.get_default_rule(deck_note_type)
         for rule in self.rules:
             if (rule.model_id == deck_note_type.model_id and 
                 rule.deck_id == deck_note_type.deck_id and 
                 rule.is_default):
-                return rule.preset_id
+                return rule
+        return None
+
+    def get_default_preset_id(self, deck_note_type: DeckNoteType) -> Optional[str]:
+        """Get the preset_id marked as default for this deck/note type combination"""
+        rule = self.get_default_rule(deck_note_type)
+        if rule != None:
+            return rule.preset_id
         return None
 
     def set_default_preset_id(self, deck_note_type: DeckNoteType, preset_id: str):
         """Set a preset as the default for a deck/note type combination"""
         
         # Look for an existing rule for this preset/deck/note type
-        for rule in self.rules:
-            if (rule.model_id == deck_note_type.model_id and 
-                rule.deck_id == deck_note_type.deck_id and 
-                rule.is_default == True):
-                # we've located the default rule for this preset
-                # set its preset_id again, it might been unchanged
-                rule.preset_id = preset_id
-                # then return, so that we don't create a new rule
-                return
+        rule = self.get_default_rule(deck_note_type)
+        if rule != None:
+            # we've located the default rule for this preset
+            # set its preset_id again, it might been unchanged
+            rule.preset_id = preset_id
+            # then return, so that we don't create a new rule
+            return
 
         # Create new rule if none exists
         new_rule = MappingRule(
@@ -749,6 +822,8 @@ class PresetMappingRules:
             is_default=True
         )
         self.rules.append(new_rule)
+        # the index doesn't know about the new rule
+        self._index = None
 
 
 def serialize_preset_mapping_rules(preset_mapping_rules):
@@ -17,6 +17,60 @@ RequestTimeoutShort = 3
 BATCH_RETRY_DELAYS = [1, 2, 4]
 BATCH_RETRY_MAX = 3
 
+# number of requests in flight to any given service, of which some are kept for requests the user is waiting on
+SERVICE_MAX_CONCURRENT_REQUESTS = 4
+SERVICE_RESERVED_INTERACTIVE_REQUESTS = 1
+
+# when estimating how long a batch will take, duration of a request to a service we haven't used yet
+BATCH_ESTIMATE_DEFAULT_REQUEST_SECONDS = 1.0
+
+# after this many consecutive connection / gateway errors, requests to a service fail immediately
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+# how long requests fail immediately, before a trial request is let through
+CIRCUIT_BREAKER_OPEN_SECONDS = 60
+
+# when applying / previewing all preset rules on a note, how many presets generate audio at the same time
+RULES_MAX_CONCURRENT_REQUESTS = 4
+# priority mode voice selection with concurrent probing: maximum number of voices requested at the same time
+PRIORITY_PROBING_MAX_CONCURRENT_REQUESTS = 4
+# long texts split into chunks are synthesized in parallel, up to this many at a time
+CHUNKED_SYNTHESIS_MAX_CONCURRENT_REQUESTS = 4
+# audio requests in flight for the command line batch runner, services rate limit beyond a few
+HEADLESS_BATCH_DEFAULT_WORKERS = 4
+
+# number of realtime TTS tags for which we remember the audio file
+REALTIME_AUDIO_CACHE_SIZE = 2000
+# number of card templates kept around for realtime TTS tag previews
+REALTIME_PREVIEW_TEMPLATE_CACHE_SIZE = 32
+# delay before the realtime TTS tag preview gets re-rendered, while the user is making changes
+REALTIME_PREVIEW_UPDATE_DELAY_MS = 300
+
+# access tokens get refreshed in the background when they are this close to expiring
+ACCESS_TOKEN_REFRESH_MARGIN_SECONDS = 120
+# access tokens are not handed out anymore when they are this close to expiring
+ACCESS_TOKEN_EXPIRE_MARGIN_SECONDS = 30
+
+# dictionary services lookups (word -> audio url / not found) are remembered in this file, in user_files
+LOOKUP_CACHE_FILENAME = 'dictionary_lookup_cache.sqlite'
+LOOKUP_CACHE_FOUND_TTL_SECONDS = 30 * 24 * 3600
+LOOKUP_CACHE_NOT_FOUND_TTL_SECONDS = 7 * 24 * 3600
+
+# progress of interrupted batches, in user_files, so that they can be resumed
+BATCH_JOURNAL_DIRECTORY = 'batch_journals'
+# journals older than this are discarded instead of being resumed
+BATCH_JOURNAL_MAX_AGE_SECONDS = 7 * 24 * 3600
+# what the audio of each note was last generated from, in user_files, for the changed notes only batch mode
+NOTE_FINGERPRINTS_FILENAME = 'batch_note_fingerprints.sqlite'
+
+# audio cache packs: zip files with cached audio files and the requests they were generated from
+AUDIO_CACHE_PACK_INDEX = 'index.json'
+AUDIO_CACHE_PACK_VERSION = 1
+
+# timeline of the last addon initialization, in user_files
+STARTUP_REPORT_FILENAME = 'startup_timeline.json'
+# log a warning when the addon initialization takes longer than this, None to disable
+STARTUP_WARNING_SECONDS = 1.0
+
 CLOUDLANGUAGETOOLS_API_BASE_URL = 'https://cloudlanguagetools-api.vocab.ai'
 VOCABAI_API_BASE_URL = 'https://app.vocab.ai'
 
@@ -37,6 +91,12 @@ class AudioRequestReason(enum.Enum):
     editor_browser = enum.auto()
     editor_add = enum.auto()
 
+# order in which requests waiting on a busy service are let through
+class RequestPriority(enum.Enum):
+    realtime = 1
+    interactive = 2
+    batch = 3
+
 # what triggered this request (batch / on the fly / editor)
 class RequestMode(enum.Enum):
     batch = enum.auto()
@@ -57,6 +117,11 @@ class VoiceSelectionMode(enum.Enum):
     random = enum.auto() # a random voice is selected, with optional weights
     priority = enum.auto() # the first voice is selected, and if audio is not found, move to the second one
 
+# number of notes whose text gets processed at once when populating the batch preview
+BATCH_PREVIEW_TEXT_PROCESSING_CHUNK_SIZE = 500
+# source and processed texts longer than this are truncated in the batch status, which only displays them
+BATCH_STATUS_TEXT_PREVIEW_LENGTH = 200
+
 class BatchNoteStatus(enum.Enum):
     Waiting = enum.auto()
     Processing = enum.auto()
@@ -64,6 +129,7 @@ class BatchNoteStatus(enum.Enum):
     Done = enum.auto()
     Error = enum.auto()
     OK = enum.auto()
+    Unchanged = enum.auto()
 
 class TextReplacementRuleType(enum.Enum):
     Simple = enum.auto()
@@ -233,6 +299,9 @@ GUI_TEXT_BATCH_COMPLETED = """<b>Finished adding Audio to notes</b>. You can und
 Undo HyperTTS: Add Audio to Notes. You may close this dialog.
 """
 
+GUI_TEXT_BATCH_CHANGED_NOTES_ONLY = 'Only process notes changed since the last run of these settings'
+GUI_TEXT_BATCH_DISCARD_PROGRESS = 'Start over, discarding the progress of an interrupted run of these settings'
+
 GUI_TEXT_HYPERTTS_PRO = """HyperTTS Pro gives you access to <b>all premium TTS services</b>."""\
 """ Azure, Google, Amazon, Watson and others. Over <b>1200 voices, 60+ languages</b>. """ +\
 """"""
@@ -7,6 +7,14 @@ PREFIX = 'anki_addon_v2'
 ADDON = 'hypertts'
 
 GENERATE_MAX_EVENTS = 5
+# per batch event counts are remembered for this many batches at most
+GENERATE_EVENT_COUNT_MAX_BATCHES = 100
+
+# events are queued and sent together, at most this often
+EVENT_QUEUE_FLUSH_INTERVAL_SECONDS = 5
+EVENT_QUEUE_BATCH_SIZE = 50
+# when events can't be sent fast enough, the oldest ones get dropped
+EVENT_QUEUE_MAX_SIZE = 500
 
 # feature flags
 FEATURE_FLAG_DEFAULT_VALUE = 'control'
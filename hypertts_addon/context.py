@@ -20,6 +20,16 @@ class AudioRequestContext():
         }
         return request_mode_map.get(self.audio_request_reason, constants.RequestMode.batch)
 
+    def get_request_priority(self) -> constants.RequestPriority:
+        request_priority_map = {
+            constants.AudioRequestReason.realtime: constants.RequestPriority.realtime,
+            constants.AudioRequestReason.preview: constants.RequestPriority.interactive,
+            constants.AudioRequestReason.editor_browser: constants.RequestPriority.interactive,
+            constants.AudioRequestReason.editor_add: constants.RequestPriority.interactive,
+            constants.AudioRequestReason.batch: constants.RequestPriority.batch,
+        }
+        return request_priority_map.get(self.audio_request_reason, constants.RequestPriority.batch)
+
     def get_audio_request_reason_tag(self):
         return self.audio_request_reason.name
 
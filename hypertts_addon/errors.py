@@ -37,6 +37,8 @@ logger = logging.getLogger(__name__)
 # +-- RealtimePresetNotFound             Realtime preset settings key missing from config
 # +-- MissingDirectory                   User files directory for audio storage doesn't exist
 # +-- MissingGraphicsFile                UI graphics file missing (corrupted installation)
+# +-- InvalidAudioCachePack              Audio cache pack file not readable or of an unsupported version
+# +-- AccessTokenError                   Service credentials could not be exchanged for an access token
 # +-- RequestError                       Legacy service request error (non-retry-aware services)
 # +-- NoVoiceSelected                    Single voice mode but no voice picked
 # +-- NoVoicesAvailable                  No TTS services configured at all
@@ -143,6 +145,12 @@ class ServicePermissionError(PermanentError):
 class ServiceInputError(PermanentError):
     pass
 
+class ServiceUnavailableError(PermanentError):
+    # raised without making a request, after the service failed repeatedly
+    def __init__(self, source_text, voice, service_name, retry_seconds):
+        super().__init__(source_text, voice, f'{service_name} is unavailable after repeated errors, will try again in {retry_seconds:.0f}s')
+        self.service_name = service_name
+
 class AudioNotFoundError(PermanentError):
     def __init__(self, source_text, voice):
         super().__init__(source_text, voice, 'Audio not found')
@@ -180,6 +188,19 @@ class MissingDirectory(HyperTTSError):
         super().__init__(message)        
 
 
+class InvalidAudioCachePack(HyperTTSError):
+    def __init__(self, pack_path, reason):
+        message = f'Could not read audio cache pack {pack_path}: {reason}'
+        super().__init__(message)
+
+class AccessTokenError(HyperTTSError):
+    def __init__(self, service_name, error_message):
+        message = f'Could not obtain {service_name} access token: {error_message}'
+        super().__init__(message)
+        self.service_name = service_name
+        self.error_message = error_message
+
+
 class MissingGraphicsFile(HyperTTSError):
     def __init__(self, filename):
         message = f'Could not find graphics file {filename}. This is likely due to a corrupted installation. Please re-install HyperTTS from AnkiWeb.'
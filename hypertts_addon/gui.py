@@ -237,7 +237,7 @@ def init(hypertts):
         with hypertts.error_manager.get_single_action_context('Previewing Audio'):
             if component_choose_easy_advanced.ensure_easy_advanced_choice_made(hypertts):
                 editor_context = hypertts.get_editor_context(editor)
-                if hypertts.load_mapping_rules().use_easy_mode:
+                if hypertts.load_mapping_rules_indexed().use_easy_mode:
                     logger.debug('use easy mode')
                     deck_note_type: config_models.DeckNoteType = hypertts.get_editor_deck_note_type(editor)
                     component_easy.create_dialog_editor(hypertts, deck_note_type, editor_context)
@@ -248,7 +248,7 @@ def init(hypertts):
         with hypertts.error_manager.get_single_action_context('Generating Audio'):
             if component_choose_easy_advanced.ensure_easy_advanced_choice_made(hypertts):
                 editor_context = hypertts.get_editor_context(editor)
-                if hypertts.load_mapping_rules().use_easy_mode:
+                if hypertts.load_mapping_rules_indexed().use_easy_mode:
                     logger.debug('use easy mode')
                     deck_note_type: config_models.DeckNoteType = hypertts.get_editor_deck_note_type(editor)
                     component_easy.create_dialog_editor(hypertts, deck_note_type, editor_context)
@@ -306,6 +306,12 @@ def init(hypertts):
     # editor buttons
     aqt.gui_hooks.editor_did_init_buttons.append(setup_editor_buttons)
 
+    # service clients get built once the main window is up, off the main thread
+    aqt.gui_hooks.main_window_did_init.append(hypertts.prepare_service_clients)
+
+    # send the queued stats events before Anki closes the profile or exits
+    aqt.gui_hooks.profile_will_close.append(stats.flush_events)
+
     # register TTS player
     aqt.sound.av_player.players.append(ttsplayer.AnkiHyperTTSPlayer(aqt.mw.taskman, hypertts))
 
@@ -0,0 +1,313 @@
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import concurrent.futures
+import anki.collection
+import anki.utils
+
+from . import constants
+from . import errors
+from . import context
+from . import anki_utils
+from . import media_link
+from . import batch_status
+from . import audio_cache_pack
+from . import startup
+from . import startup_tracer
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class HeadlessAnkiUtils(anki_utils.AnkiUtils):
+    """AnkiUtils for running batches outside of the Anki GUI, on a collection opened with the anki library.
+    the addon configuration is read from a file and only modified in memory, messages go to the console."""
+
+    def __init__(self, col, config, user_files_dir=None):
+        self.col = col
+        self.config = config
+        self.user_files_dir = user_files_dir
+
+    def get_config(self):
+        return self.config
+
+    def write_config(self, config):
+        self.config = config
+
+    def get_user_files_dir(self):
+        if self.user_files_dir != None:
+            return self.user_files_dir
+        return super().get_user_files_dir()
+
+    def get_note_by_id(self, note_id):
+        return self.col.get_note(note_id)
+
+    def get_note_mod_times(self, note_id_list):
+        rows = self.col.db.all(f'select id, mod from notes where id in {anki.utils.ids2str(note_id_list)}')
+        return {note_id: note_mod for note_id, note_mod in rows}
+
+    def get_model(self, model_id):
+        return self.col.models.get(model_id)
+
+    def get_deck(self, deck_id):
+        return self.col.decks.get(deck_id)
+
+    def get_model_id(self, model_name):
+        return self.col.models.id_for_name(model_name)
+
+    def get_deck_id(self, deck_name):
+        return self.col.decks.id_for_name(deck_name)
+
+    def media_add_file(self, filename):
+        media_filename = media_link.link_media_file(filename, self.col.media.dir())
+        if media_filename != None:
+            return media_filename
+        return self.col.media.add_file(filename)
+
+    def media_file_exists(self, filename):
+        return os.path.isfile(os.path.join(self.col.media.dir(), filename))
+
+    def update_note(self, note):
+        self.col.update_note(note)
+
+    def get_anki_collection(self):
+        return self.col
+
+    def run_in_background(self, task_fn, task_done_fn):
+        # same contract as anki's taskman, the done function receives a future
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(task_fn())
+        except Exception as e:
+            future.set_exception(e)
+        if task_done_fn != None:
+            task_done_fn(future)
+
+    def run_on_main(self, task_fn):
+        task_fn()
+
+    def info_message(self, message, parent):
+        print(self.restrict_message_length(message), file=sys.stderr)
+
+    def critical_message(self, message, parent):
+        print(self.restrict_message_length(message), file=sys.stderr)
+
+    def tooltip_message(self, message):
+        print(self.restrict_message_length(message), file=sys.stderr)
+
+    def report_error_event(self, error_message):
+        logger.warning(error_message)
+
+    def broadcast_audio_added(self):
+        pass
+
+    def broadcast_services_configured(self):
+        pass
+
+
+class ConsoleProgress():
+    """batch status listener which reports progress on a single console line"""
+
+    def __init__(self, stream, label):
+        self.stream = stream
+        self.label = label
+        self.lock = threading.Lock()
+        self.completed_count = 0
+
+    def batch_start(self):
+        pass
+
+    def batch_change(self, note_id, row, total_count, start_time, current_time):
+        self.report(row + 1, total_count, (current_time - start_time).total_seconds())
+
+    def batch_end(self, completed):
+        self.stream.write('\n')
+        self.stream.flush()
+
+    def increment(self, total_count, elapsed_seconds):
+        # used by the audio prefetch, where notes complete out of order
+        with self.lock:
+            self.completed_count += 1
+            self.report(self.completed_count, total_count, elapsed_seconds)
+
+    def report(self, done_count, total_count, elapsed_seconds):
+        rate = done_count / elapsed_seconds if elapsed_seconds > 0 else 0
+        remaining = f'{(total_count - done_count) / rate:.0f}s' if rate > 0 else '-'
+        self.stream.write(f'\r{self.label}: {done_count}/{total_count} notes, {rate:.1f} notes/s, remaining {remaining}  ')
+        self.stream.flush()
+
+
+def load_addon_config(config_path):
+    # either the addon's config.json, or the meta.json from the addon folder, which wraps the config
+    with open(config_path, encoding='utf-8') as config_file:
+        config = json.load(config_file)
+    if 'config' in config and constants.CONFIG_PRESETS not in config:
+        config = config['config']
+    return config
+
+def find_preset_id(hyper_tts, preset):
+    # the preset can be given by id or by name
+    for preset_info in hyper_tts.get_preset_list():
+        if preset in [preset_info.id, preset_info.name]:
+            return preset_info.id
+    raise errors.PresetNotFound(preset)
+
+def get_changed_note_ids(hyper_tts, note_id_list, batch):
+    # notes modified since the last run of this batch, the others will be skipped by process_batch_audio
+    previous_fingerprints = hyper_tts.get_note_fingerprints().get_fingerprints(hyper_tts.get_batch_settings_key(batch))
+    note_mods = hyper_tts.anki_utils.get_note_mod_times(note_id_list)
+    return [note_id for note_id in note_id_list
+        if note_id not in previous_fingerprints or previous_fingerprints[note_id].note_mod != note_mods.get(note_id, None)]
+
+def prefetch_batch_audio(hyper_tts, note_id_list, batch, workers, progress):
+    """generates the audio of the notes with several requests in flight, filling the audio cache in user_files.
+    notes aren't modified, process_batch_audio then finds the audio in the cache. errors are left for
+    process_batch_audio to report."""
+    audio_request_context = context.AudioRequestContext(constants.AudioRequestReason.batch)
+    start_time = time.monotonic()
+
+    def prefetch_note_audio(note_id):
+        try:
+            note = hyper_tts.anki_utils.get_note_by_id(note_id)
+            hyper_tts.generate_note_audio(batch, note, audio_request_context, None)
+        except Exception as e:
+            logger.debug(f'could not prefetch audio for note {note_id}: {e}')
+        progress.increment(len(note_id_list), time.monotonic() - start_time)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        for future in concurrent.futures.as_completed([executor.submit(prefetch_note_audio, note_id) for note_id in note_id_list]):
+            future.result()
+    finally:
+        # on interruption, notes which haven't started yet get dropped
+        executor.shutdown(wait=True, cancel_futures=True)
+        hyper_tts.service_manager.batch_finished(audio_request_context)
+    progress.stream.write('\n')
+
+def run_batch(hyper_tts, note_id_list, batch, workers=1, changed_notes_only=False, stream=None, discard_progress=False):
+    """runs the batch on the notes, the way the batch dialog does, returns the BatchStatus"""
+    if stream == None:
+        stream = sys.stderr
+    prefetch_note_id_list = note_id_list
+    if changed_notes_only:
+        prefetch_note_id_list = get_changed_note_ids(hyper_tts, note_id_list, batch)
+    if workers > 1 and len(prefetch_note_id_list) > 0:
+        prefetch_batch_audio(hyper_tts, prefetch_note_id_list, batch, workers, ConsoleProgress(stream, 'generating audio'))
+
+    status = batch_status.BatchStatus(hyper_tts.anki_utils, note_id_list, ConsoleProgress(stream, 'updating notes'))
+    # in a separate thread, so that an interruption stops the batch cleanly, and can be resumed from the journal
+    batch_thread = threading.Thread(target=hyper_tts.process_batch_audio,
+        args=(note_id_list, batch, status, hyper_tts.anki_utils.get_anki_collection()),
+        kwargs={'changed_notes_only': changed_notes_only, 'discard_progress': discard_progress})
+    batch_thread.start()
+    try:
+        while batch_thread.is_alive():
+            batch_thread.join(0.2)
+    except KeyboardInterrupt:
+        print('\ninterrupted, finishing the current note', file=stream)
+        status.stop()
+        batch_thread.join()
+    return status
+
+def get_status_summary(status):
+    counts = {}
+    for note_status in status:
+        status_name = note_status.status.name if note_status.status != None else 'NotProcessed'
+        counts[status_name] = counts.get(status_name, 0) + 1
+    return ', '.join([f'{status_name}: {count}' for status_name, count in sorted(counts.items())])
+
+def get_argument_parser():
+    parser = argparse.ArgumentParser(description='add audio to the notes of an Anki collection, without the Anki GUI. '
+        'the collection must not be open in Anki at the same time.')
+    parser.add_argument('collection', help='path to the collection file (collection.anki2)')
+    parser.add_argument('--config', required=True, help='HyperTTS addon config file (config.json or meta.json from the addon folder)')
+    parser.add_argument('--preset', required=True, help='name or id of the preset to run')
+    parser.add_argument('--query', required=True, help='Anki search selecting the notes, for example "deck:Chinese"')
+    parser.add_argument('--user-files', help='directory for the audio cache and batch journals, defaults to the addon user_files')
+    parser.add_argument('--workers', type=int, default=constants.HEADLESS_BATCH_DEFAULT_WORKERS,
+        help=f'number of audio requests in flight, defaults to {constants.HEADLESS_BATCH_DEFAULT_WORKERS}')
+    parser.add_argument('--changed-only', action='store_true', help='only process notes changed since the last run of this preset')
+    parser.add_argument('--start-over', action='store_true', help='discard the progress of an interrupted run instead of resuming it')
+    return parser
+
+def main(argv=None):
+    args = get_argument_parser().parse_args(argv)
+
+    col = anki.collection.Collection(args.collection)
+    try:
+        headless_anki_utils = HeadlessAnkiUtils(col, load_addon_config(args.config), args.user_files)
+        hyper_tts = startup.init_hypertts(headless_anki_utils, startup_tracer.StartupTracer())
+        try:
+            batch = hyper_tts.load_preset(find_preset_id(hyper_tts, args.preset))
+        except errors.HyperTTSError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        note_id_list = list(col.find_notes(args.query))
+        print(f'running preset {batch.name} on {len(note_id_list)} notes', file=sys.stderr)
+
+        try:
+            status = run_batch(hyper_tts, note_id_list, batch, max(args.workers, 1), args.changed_only,
+                discard_progress=args.start_over)
+        except KeyboardInterrupt:
+            # while generating audio, no note has been modified yet
+            print('\ninterrupted', file=sys.stderr)
+            return 1
+        print(get_status_summary(status), file=sys.stderr)
+        for note_status in status:
+            if note_status.status == constants.BatchNoteStatus.Error:
+                print(f'note {note_status.note_id}: {note_status.error}', file=sys.stderr)
+    finally:
+        col.close()
+
+    if any(note_status.status != constants.BatchNoteStatus.Done and note_status.status != constants.BatchNoteStatus.Unchanged
+            for note_status in status):
+        return 1
+    return 0
+
+def get_cache_pack_argument_parser():
+    parser = argparse.ArgumentParser(description='share cached audio: export the audio of a preset to a pack file, '
+        'or import a pack into the audio cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='export the cached audio of the notes')
+    export_parser.add_argument('collection', help='path to the collection file (collection.anki2)')
+    export_parser.add_argument('pack', help='pack file to write')
+    export_parser.add_argument('--config', required=True, help='HyperTTS addon config file (config.json or meta.json from the addon folder)')
+    export_parser.add_argument('--preset', required=True, help='name or id of the preset the audio was generated with')
+    export_parser.add_argument('--query', required=True, help='Anki search selecting the notes, for example "deck:Chinese"')
+    export_parser.add_argument('--user-files', help='directory of the audio cache, defaults to the addon user_files')
+    import_parser = subparsers.add_parser('import', help='add the audio of a pack to the audio cache')
+    import_parser.add_argument('pack', help='pack file to read')
+    import_parser.add_argument('--user-files', help='directory of the audio cache, defaults to the addon user_files')
+    return parser
+
+def cache_pack_main(argv=None):
+    args = get_cache_pack_argument_parser().parse_args(argv)
+
+    if args.command == 'import':
+        hyper_tts = startup.init_hypertts(HeadlessAnkiUtils(None, {}, args.user_files), startup_tracer.StartupTracer())
+        try:
+            imported_count, skipped_count = audio_cache_pack.import_pack(hyper_tts, args.pack)
+        except errors.HyperTTSError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        print(f'imported {imported_count} audio files, {skipped_count} already in the cache or skipped', file=sys.stderr)
+        return 0
+
+    col = anki.collection.Collection(args.collection)
+    try:
+        headless_anki_utils = HeadlessAnkiUtils(col, load_addon_config(args.config), args.user_files)
+        hyper_tts = startup.init_hypertts(headless_anki_utils, startup_tracer.StartupTracer())
+        try:
+            batch = hyper_tts.load_preset(find_preset_id(hyper_tts, args.preset))
+        except errors.HyperTTSError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        note_id_list = list(col.find_notes(args.query))
+        entries = audio_cache_pack.collect_entries(hyper_tts, note_id_list, batch)
+        audio_cache_pack.export_pack(hyper_tts, args.pack, entries)
+        print(f'exported {len(entries)} audio files for {len(note_id_list)} notes', file=sys.stderr)
+    finally:
+        col.close()
+    return 0
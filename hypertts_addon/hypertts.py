@@ -8,8 +8,11 @@ import random
 import copy
 import json
 import time
+import threading
+import concurrent.futures
 from typing import List, Dict
 import pprint
+import cachetools
 
 # anki imports
 import aqt
@@ -24,11 +27,14 @@ from . import options
 from . import voice as voice_module
 from . import errors
 from . import text_utils
+from . import audio_utils
 from . import config_models
 from . import context
 from . import logging_utils
 from . import gui
 from . import preset_rules_status
+from . import batch_journal
+from . import note_fingerprints
 logger = logging_utils.get_child_logger(__name__)
 
 if hasattr(sys, '_sentry_crash_reporting'):
@@ -57,61 +63,176 @@ class HyperTTS():
         self.error_manager = errors.ErrorManager(self.anki_utils)
         self.config = self.anki_utils.get_config()
         self.latest_saved_batch_name = None
+        # deserialized and indexed mapping rules, rebuilt when the rules are saved
+        self.mapping_rules_indexed = None
+        # (hypertts_preset, field_text) -> full audio filename, for realtime TTS tags
+        self.realtime_audio_cache = cachetools.LRUCache(maxsize=constants.REALTIME_AUDIO_CACHE_SIZE)
+        self.realtime_audio_cache_lock = threading.Lock()
+        # (note type id, note type mod, card_ord) -> template with TTS tags removed, used for realtime previews
+        self.realtime_preview_template_cache = cachetools.LRUCache(maxsize=constants.REALTIME_PREVIEW_TEMPLATE_CACHE_SIZE)
+        self.realtime_preview_template_cache_lock = threading.Lock()
+        # created on first use, see get_note_fingerprints
+        self.note_fingerprints = None
 
         # do maintenance on the configuration
         self.perform_config_migration()
 
 
-    def process_batch_audio(self, note_id_list, batch, batch_status, anki_collection):
-        # for each note, generate audio
+    def process_batch_audio(self, note_id_list, batch, batch_status, anki_collection, changed_notes_only=False,
+            discard_progress=False):
+        # for each note, generate audio. with changed_notes_only, notes which haven't changed since the
+        # last run of the same batch settings are skipped. discard_progress starts over instead of
+        # resuming an interrupted run
         with batch_status.get_batch_running_action_context(track_metrics=True):
 
-            modified_notes = []
-
             audio_request_context = context.AudioRequestContext(constants.AudioRequestReason.batch)
             
             delays = constants.BATCH_RETRY_DELAYS
             retry_max = constants.BATCH_RETRY_MAX
 
-            for note_id in note_id_list:
-                with batch_status.get_note_action_context(note_id, False) as note_action_context:
-                    with _start_span(op="db.anki.note.fetch", name="get_note_by_id"):
-                        note = self.anki_utils.get_note_by_id(note_id)
-                    audio_request_context.retry_count = 0
-                    for attempt in range(retry_max + 1):
-                        try:
-                            source_text, processed_text, sound_file, full_filename = self.process_note_audio(batch, note, False,
-                                audio_request_context, None, anki_collection)
-                            break
-                        except errors.TransientError as e:
-                            if attempt >= retry_max:
-                                raise
-                            if isinstance(e, errors.RateLimitRetryAfterError):
-                                delay = e.retry_after
-                            else:
-                                delay = delays[min(attempt, len(delays) - 1)]
-                            logger.warning(f'Transient error on note {note_id} (attempt {attempt + 1}/{retry_max}), '
-                                           f'retrying in {delay}s: {e}')
-                            note_action_context.set_status(constants.BatchNoteStatus.Retrying)
-                            note_action_context.record_retry(e, delay)
-                            with _start_span(op="batch.retry.sleep", name=f"attempt {attempt}") as span:
-                                if span is not None:
-                                    span.set_data("delay_seconds", delay)
-                                    span.set_data("exception_type", type(e).__name__)
-                                time.sleep(delay)
-                            audio_request_context.increment_retry_count()
-                    # update note action context
-                    note_action_context.set_source_text(source_text)
-                    note_action_context.set_processed_text(processed_text)
-                    note_action_context.set_sound(sound_file)
-                    note_action_context.set_status(constants.BatchNoteStatus.Done)
-
-                    modified_notes.append(note)
-                if batch_status.must_continue == False:
-                    logger.info('batch_status execution interrupted')
-                    break
+            # what the audio of each note was generated from, recorded after every run
+            batch_key = self.get_batch_settings_key(batch)
+            previous_fingerprints = {}
+            note_mods = {}
+            if changed_notes_only:
+                previous_fingerprints = self.get_note_fingerprints().get_fingerprints(batch_key)
+                # one query for the whole batch, unchanged notes don't even get loaded
+                note_mods = self.anki_utils.get_note_mod_times(note_id_list)
+            new_fingerprints = {}
+
+            # progress is recorded as we go, so that an interrupted batch can be resumed
+            journal = batch_journal.BatchJournal(self.get_batch_journal_path(batch))
+            if discard_progress:
+                journal.delete()
+            journal_note_mods = {}
+            if len(journal.get_done_note_ids()) > 0:
+                journal_note_mods = self.anki_utils.get_note_mod_times(journal.get_done_note_ids())
+            try:
+                for note_id in note_id_list:
+                    done_entry = journal.get_done_entry(note_id, journal_note_mods.get(note_id, None))
+                    if done_entry != None:
+                        # processed by a previous run of this batch which got interrupted, not modified since
+                        batch_status.set_source_text(note_id, done_entry.get('source_text', None))
+                        batch_status.set_processed_text(note_id, done_entry.get('processed_text', None))
+                        batch_status.set_sound_file(note_id, done_entry['sound_file'])
+                        batch_status.set_status(note_id, constants.BatchNoteStatus.Done)
+                        continue
+                    previous_fingerprint = previous_fingerprints.get(note_id, None)
+                    if previous_fingerprint != None and previous_fingerprint.note_mod == note_mods.get(note_id, None) and \
+                        self.anki_utils.media_file_exists(previous_fingerprint.sound_file):
+                        # note not modified since the last run, so it still has the sound tag, and the audio is still there
+                        batch_status.set_sound_file(note_id, previous_fingerprint.sound_file)
+                        batch_status.set_status(note_id, constants.BatchNoteStatus.Unchanged)
+                        continue
+                    with batch_status.get_note_action_context(note_id, False) as note_action_context:
+                        with _start_span(op="db.anki.note.fetch", name="get_note_by_id"):
+                            note = self.anki_utils.get_note_by_id(note_id)
+                        if previous_fingerprint != None:
+                            # the note was modified, but maybe not in a way that changes the audio
+                            fingerprint = self.get_note_fingerprint(batch, note)
+                            if fingerprint == previous_fingerprint.fingerprint and \
+                                f'[sound:{previous_fingerprint.sound_file}]' in note[batch.target.target_field] and \
+                                self.anki_utils.media_file_exists(previous_fingerprint.sound_file):
+                                # as of this modification time, no need to check the note again next time
+                                new_fingerprints[note_id] = note_fingerprints.NoteFingerprint(note.mod,
+                                    previous_fingerprint.fingerprint, previous_fingerprint.sound_file)
+                                note_action_context.set_sound(previous_fingerprint.sound_file)
+                                note_action_context.set_status(constants.BatchNoteStatus.Unchanged)
+                                continue
+                        audio_request_context.retry_count = 0
+                        for attempt in range(retry_max + 1):
+                            try:
+                                source_text, processed_text, sound_file, full_filename = self.process_note_audio(batch, note, False,
+                                    audio_request_context, None, anki_collection)
+                                break
+                            except errors.TransientError as e:
+                                if attempt >= retry_max:
+                                    raise
+                                if isinstance(e, errors.RateLimitRetryAfterError):
+                                    delay = e.retry_after
+                                else:
+                                    delay = delays[min(attempt, len(delays) - 1)]
+                                logger.warning(f'Transient error on note {note_id} (attempt {attempt + 1}/{retry_max}), '
+                                               f'retrying in {delay}s: {e}')
+                                note_action_context.set_status(constants.BatchNoteStatus.Retrying)
+                                note_action_context.record_retry(e, delay)
+                                with _start_span(op="batch.retry.sleep", name=f"attempt {attempt}") as span:
+                                    if span is not None:
+                                        span.set_data("delay_seconds", delay)
+                                        span.set_data("exception_type", type(e).__name__)
+                                    time.sleep(delay)
+                                audio_request_context.increment_retry_count()
+                        # update note action context
+                        note_action_context.set_source_text(source_text)
+                        note_action_context.set_processed_text(processed_text)
+                        note_action_context.set_sound(sound_file)
+                        note_action_context.set_status(constants.BatchNoteStatus.Done)
+                        # modification time of the note as updated by the batch, later edits can be told apart
+                        journal.record(note_id, constants.BatchNoteStatus.Done, os.path.basename(full_filename), sound_file,
+                            note.mod, source_text, processed_text)
+                        new_fingerprints[note_id] = note_fingerprints.NoteFingerprint(note.mod,
+                            self.get_processed_text_fingerprint(batch, processed_text), sound_file)
+                    if batch_status.get_status(note_id) == constants.BatchNoteStatus.Error:
+                        journal.record(note_id, constants.BatchNoteStatus.Error)
+                    if batch_status.must_continue == False:
+                        logger.info('batch_status execution interrupted')
+                        break
+            finally:
+                journal.close()
+                self.service_manager.batch_finished(audio_request_context)
+                self.record_note_fingerprints(batch_key, new_fingerprints)
+
+            if batch_status.must_continue and all([batch_status.get_status(note_id) in
+                    [constants.BatchNoteStatus.Done, constants.BatchNoteStatus.Unchanged] for note_id in note_id_list]):
+                # the batch ran to the end without errors, nothing left to resume
+                journal.delete()
+
+    def get_batch_settings_key(self, batch: config_models.BatchConfig):
+        # identifies the batch settings, regardless of the preset name
+        batch_settings = {
+            'source': config_models.serialize_batchsource(batch.source),
+            'target': batch.target.serialize(),
+            'voice_selection': batch.voice_selection.serialize(),
+            'text_processing': batch.text_processing.serialize()
+        }
+        return hashlib.sha224(json.dumps(batch_settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get_batch_journal_path(self, batch: config_models.BatchConfig):
+        # the same batch settings share a journal
+        return os.path.join(self.anki_utils.get_user_files_dir(), constants.BATCH_JOURNAL_DIRECTORY,
+            f'{self.get_batch_settings_key(batch)}.jsonl')
+
+    def get_note_fingerprints(self):
+        if self.note_fingerprints == None:
+            self.note_fingerprints = note_fingerprints.NoteFingerprintStore(
+                os.path.join(self.anki_utils.get_user_files_dir(), constants.NOTE_FINGERPRINTS_FILENAME))
+        return self.note_fingerprints
+
+    def get_processed_text_fingerprint(self, batch: config_models.BatchConfig, processed_text):
+        fingerprint_data = [processed_text, batch.voice_selection.serialize()]
+        return hashlib.sha224(json.dumps(fingerprint_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get_note_fingerprint(self, batch: config_models.BatchConfig, note):
+        source_text = self.get_source_text(note, batch.source, None)
+        processed_text = self.process_text(source_text, batch.text_processing)
+        return self.get_processed_text_fingerprint(batch, processed_text)
+
+    def record_note_fingerprints(self, batch_key, fingerprints):
+        if len(fingerprints) == 0:
+            return
+        self.get_note_fingerprints().put_fingerprints(batch_key, fingerprints)
 
     def process_note_audio(self, batch: config_models.BatchConfig, note, add_mode, audio_request_context, text_override, anki_collection):
+        source_text, processed_text, full_filename, audio_filename = self.generate_note_audio(batch, note, audio_request_context, text_override)
+        sound_file = self.update_note_sound_tag(batch, note, add_mode, full_filename, audio_filename, anki_collection)
+        if not add_mode:
+            # the collection doesn't refresh the modification time of the note object, read it back right away,
+            # before the user gets a chance to edit the note again
+            note.mod = self.anki_utils.get_note_mod_times([note.id]).get(note.id, note.mod)
+        return source_text, processed_text, sound_file, full_filename
+
+    def generate_note_audio(self, batch: config_models.BatchConfig, note, audio_request_context, text_override):
+        # generate the audio file for a note, without modifying the note
         target_field = batch.target.target_field
 
         if target_field not in note:
@@ -122,6 +243,10 @@ class HyperTTS():
             processed_text = self.process_text(source_text, batch.text_processing)
 
         full_filename, audio_filename = self.get_audio_file(processed_text, batch.voice_selection, audio_request_context)
+        return source_text, processed_text, full_filename, audio_filename
+
+    def update_note_sound_tag(self, batch: config_models.BatchConfig, note, add_mode, full_filename, audio_filename, anki_collection):
+        target_field = batch.target.target_field
         sound_tag, sound_file = self.get_collection_sound_tag(full_filename, audio_filename)
 
         target_field_content = note[target_field]
@@ -146,7 +271,7 @@ class HyperTTS():
             with _start_span(op="db.anki.note.update", name="update_note"):
                 anki_collection.update_note(note)
 
-        return source_text, processed_text, sound_file, full_filename
+        return sound_file
 
     def get_note_audio(self, batch, note, audio_request_context, text_override):
         source_text = self.get_source_text(note, batch.source, text_override)
@@ -171,7 +296,10 @@ class HyperTTS():
         priority_mode = voice_selection.selection_mode == constants.VoiceSelectionMode.priority
         if priority_mode:
             voice_list = copy.copy(voice_selection.voice_list)
+            if voice_selection.concurrent_probing and len(voice_list) > 1:
+                return self.get_audio_file_concurrent_probing(processed_text, voice_list, audio_request_context)
         sound_found = False
+        unavailable_error = None
         # loop while we haven't found the sound. this will be used for priority mode
         loop_condition = True
         while loop_condition:
@@ -192,9 +320,61 @@ class HyperTTS():
                 if not priority_mode:
                     # re-raise the exception
                     raise exc
+            except errors.ServiceUnavailableError as exc:
+                # the service is down, fall back to the next voice
+                if not priority_mode:
+                    raise exc
+                unavailable_error = exc
             loop_condition = priority_mode and sound_found == False and len(voice_list) > 0
+        if unavailable_error != None:
+            raise unavailable_error
+        raise errors.AudioNotFoundAnyVoiceError(processed_text)
+
+    def get_audio_file_concurrent_probing(self, processed_text, voice_list, audio_request_context):
+        # priority mode, but the dictionary and free voices get requested at the same time upfront. we then
+        # go through the voices in priority order, the first voice which found audio wins, same as when
+        # trying them one by one. the other voices are requested one by one when their turn comes, so that
+        # a paid voice doesn't get billed when a higher priority voice already found audio.
+        probed = [self.voice_can_be_probed(voice_with_options.voice_id) for voice_with_options in voice_list]
+        executor = None
+        if any(probed):
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(probed.count(True), constants.PRIORITY_PROBING_MAX_CONCURRENT_REQUESTS))
+        try:
+            futures = [executor.submit(self.generate_audio_write_file, processed_text,
+                voice_with_options.voice_id, voice_with_options.options, audio_request_context) if voice_probed else None
+                for voice_with_options, voice_probed in zip(voice_list, probed)]
+            unavailable_error = None
+            for voice_with_options, future in zip(voice_list, futures):
+                try:
+                    if future != None:
+                        full_filename, audio_filename = future.result()
+                    else:
+                        full_filename, audio_filename = self.generate_audio_write_file(processed_text,
+                            voice_with_options.voice_id, voice_with_options.options, audio_request_context)
+                except errors.AudioNotFoundError:
+                    logger.debug(f'audio not found for {processed_text} with voice {voice_with_options.voice_id}, trying next voice')
+                    continue
+                except errors.ServiceUnavailableError as exc:
+                    unavailable_error = exc
+                    continue
+                logger.debug(f'finished generating audio file and write to file for {processed_text}')
+                self.config_register_added_audio()
+                return full_filename, audio_filename
+        finally:
+            if executor != None:
+                # lower priority probes which haven't started yet are not needed anymore,
+                # those already running finish in the background and their result is discarded
+                executor.shutdown(wait=False, cancel_futures=True)
+        if unavailable_error != None:
+            raise unavailable_error
         raise errors.AudioNotFoundAnyVoiceError(processed_text)
 
+    def voice_can_be_probed(self, voice_id: voice_module.TtsVoiceId_v3) -> bool:
+        # dictionary lookups and free services can be requested without knowing whether the result will be used
+        service = self.service_manager.get_service(voice_id.service)
+        return service.service_type == constants.ServiceType.dictionary or service.service_fee == constants.ServiceFee.free
+
     def choose_voice(self, voice_selection, voice_list) -> config_models.VoiceWithOptions:
         if voice_selection.selection_mode == constants.VoiceSelectionMode.single:
             return voice_selection.voice
@@ -214,6 +394,15 @@ class HyperTTS():
         # used by :
         #  - component_batch.py
         #  - component_mappingrule.py
+        generated_audio = self.editor_note_generate_audio(batch, editor_context, text_input)
+        self.editor_note_apply_audio(batch, editor_context, generated_audio)
+
+    def editor_note_generate_audio(self,
+            batch: config_models.BatchConfig,
+            editor_context: config_models.EditorContext,
+            text_input = None):
+        """generate the audio for the editor note, without modifying the note. safe to call concurrently for
+        different presets, the result should be passed to editor_note_apply_audio"""
 
         # adding audio after the cursor is not yet supported
         if batch.target.insert_location == config_models.InsertLocation.CURSOR_LOCATION:
@@ -235,9 +424,16 @@ class HyperTTS():
                 if editor_context.selected_text != None:
                     text_override = editor_context.selected_text
         logger.debug(f'text_override: {text_override}')
-        source_text, processed_text, sound_file, full_filename = self.process_note_audio(batch, editor_context.note, editor_context.add_mode,
-            audio_request_context, text_override, self.anki_utils.get_anki_collection())
-        logger.debug('after process_note_audio')
+        return self.generate_note_audio(batch, editor_context.note, audio_request_context, text_override)
+
+    def editor_note_apply_audio(self,
+            batch: config_models.BatchConfig,
+            editor_context: config_models.EditorContext,
+            generated_audio):
+        source_text, processed_text, full_filename, audio_filename = generated_audio
+        self.update_note_sound_tag(batch, editor_context.note, editor_context.add_mode,
+            full_filename, audio_filename, self.anki_utils.get_anki_collection())
+        logger.debug('after update_note_sound_tag')
         logger.debug(f'about to call editor.set_note: {editor_context.note}')
         def get_set_note_lambda(editor, note):
             def editor_set_note():
@@ -362,11 +558,20 @@ class HyperTTS():
     # ================
 
     def preview_note_audio_editor(self, batch, editor_context: config_models.EditorContext):
+        self.preview_note_audio(batch, editor_context.note, self.get_editor_preview_text_override(batch, editor_context))
+
+    def preview_note_audio_editor_generate(self, batch, editor_context: config_models.EditorContext):
+        # same as preview_note_audio_editor, but doesn't play the sound
+        batch.validate()
+        return self.get_note_audio(batch, editor_context.note, context.AudioRequestContext(constants.AudioRequestReason.preview),
+            self.get_editor_preview_text_override(batch, editor_context))
+
+    def get_editor_preview_text_override(self, batch, editor_context: config_models.EditorContext):
         text_override = None
         if batch.source.use_selection:
             if editor_context.selected_text != None:
                 text_override = editor_context.selected_text
-        self.preview_note_audio(batch, editor_context.note, text_override)
+        return text_override
 
     def preview_note_audio(self, batch, note, text_override):
         batch.validate()
@@ -384,15 +589,39 @@ class HyperTTS():
         full_filename, audio_filename = self.generate_audio_write_file(source_text, voice_id, options, context.AudioRequestContext(constants.AudioRequestReason.preview))
         self.anki_utils.play_sound(full_filename)
 
+    def process_rules_concurrently(self, status: preset_rules_status.PresetRulesStatus, rules, generate_fn, complete_fn):
+        """generate audio for all the rules concurrently, then complete each rule (update the note, play the sound)
+        one by one, in rule order. success / failure is reported in the status for each rule."""
+        rule_action_context_list = [status.get_rule_action_context(rule) for rule in rules]
+        if len(rule_action_context_list) == 0:
+            return
+
+        def get_generate_task(rule_action_context):
+            def generate_task():
+                preset = self.load_preset(rule_action_context.rule.preset_id)
+                rule_action_context.set_preset(preset)
+                return preset, generate_fn(preset)
+            return generate_task
+
+        max_workers = min(len(rule_action_context_list), constants.RULES_MAX_CONCURRENT_REQUESTS)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(get_generate_task(rule_action_context)) for rule_action_context in rule_action_context_list]
+            for rule_action_context, future in zip(rule_action_context_list, futures):
+                with rule_action_context:
+                    preset, generate_result = future.result()
+                    logger.debug(f'completing rule {rule_action_context.rule}')
+                    complete_fn(preset, generate_result)
+
     def get_preview_all_rules_task(self, deck_note_type: config_models.DeckNoteType,editor_context: config_models.EditorContext, preset_mapping_rules: config_models.PresetMappingRules):
         def preview_fn():
             status = preset_rules_status.PresetRulesStatus('Previewing', self.anki_utils)
-            for absolute_index, subset_index, rule in preset_mapping_rules.iterate_applicable_rules(deck_note_type, False):
-                with status.get_rule_action_context(rule) as rule_action_context:
-                    logger.debug(f'previewing audio for rule {rule}')
-                    preset = self.load_preset(rule.preset_id)
-                    rule_action_context.set_preset(preset)
-                    self.preview_note_audio_editor(preset, editor_context)
+            rules = [rule for absolute_index, subset_index, rule in preset_mapping_rules.iterate_applicable_rules(deck_note_type, False)]
+            def generate_fn(preset):
+                return self.preview_note_audio_editor_generate(preset, editor_context)
+            def complete_fn(preset, generate_result):
+                full_filename, audio_filename = generate_result
+                self.anki_utils.play_sound(full_filename)
+            self.process_rules_concurrently(status, rules, generate_fn, complete_fn)
         return preview_fn
 
     def get_preview_all_rules_done(self):
@@ -404,7 +633,7 @@ class HyperTTS():
     def preview_all_mapping_rules(self, editor_context: config_models.EditorContext, preset_mapping_rules: config_models.PresetMappingRules = None):
         if preset_mapping_rules == None:
             # load the saved rules
-            preset_mapping_rules = self.load_mapping_rules()
+            preset_mapping_rules = self.load_mapping_rules_indexed()
 
         if len(preset_mapping_rules.rules) == 0:
             raise errors.NoPresetMappingRulesDefined()
@@ -416,12 +645,12 @@ class HyperTTS():
     def get_apply_all_rules_task(self, deck_note_type: config_models.DeckNoteType,editor_context: config_models.EditorContext, preset_mapping_rules: config_models.PresetMappingRules):
         def apply_fn():
             status = preset_rules_status.PresetRulesStatus('Applying', self.anki_utils)
-            for absolute_index, subset_index, rule in preset_mapping_rules.iterate_applicable_rules(deck_note_type, False):
-                with status.get_rule_action_context(rule) as rule_action_context:
-                    logger.debug(f'previewing audio for rule {rule}')
-                    preset = self.load_preset(rule.preset_id)
-                    rule_action_context.set_preset(preset)
-                    self.editor_note_add_audio(preset, editor_context)
+            rules = [rule for absolute_index, subset_index, rule in preset_mapping_rules.iterate_applicable_rules(deck_note_type, False)]
+            def generate_fn(preset):
+                return self.editor_note_generate_audio(preset, editor_context)
+            def complete_fn(preset, generate_result):
+                self.editor_note_apply_audio(preset, editor_context, generate_result)
+            self.process_rules_concurrently(status, rules, generate_fn, complete_fn)
         return apply_fn
 
     def get_apply_all_rules_done(self):
@@ -433,7 +662,7 @@ class HyperTTS():
     def apply_all_mapping_rules(self, editor_context: config_models.EditorContext, preset_mapping_rules: config_models.PresetMappingRules = None):
         if preset_mapping_rules == None:
             # load the saved rules
-            preset_mapping_rules = self.load_mapping_rules()
+            preset_mapping_rules = self.load_mapping_rules_indexed()
 
         if len(preset_mapping_rules.rules) == 0:
             raise errors.NoPresetMappingRulesDefined()
@@ -448,17 +677,13 @@ class HyperTTS():
 
     def generate_audio_write_file(self, source_text, voice_id: voice_module.TtsVoiceId_v3, voice_options, audio_request_context):
         assert isinstance(voice_id, voice_module.TtsVoiceId_v3), f"Expected voice_id to be TtsVoiceId_v3, got {type(voice_id).__name__}"
-        format = options.AudioFormat.mp3 # default to mp3
-        if options.AUDIO_FORMAT_PARAMETER in voice_options:
-            format = options.AudioFormat[voice_options[options.AUDIO_FORMAT_PARAMETER]]
 
         # write to user files directory
         with _start_span(op="cache.lookup", name="audio_file_cache_check") as span:
-            hash_str = self.get_hash_for_audio_request(source_text, voice_id, voice_options)
-            audio_filename = self.get_audio_filename(hash_str, format)
-            full_filename = self.get_full_audio_file_name(hash_str, format)
-            logger.info(f'requesting audio for hash {hash_str}, full filename {full_filename}')
-            cache_hit = os.path.exists(full_filename) and os.path.getsize(full_filename) > 0
+            full_filename = self.get_audio_request_full_filename(source_text, voice_id, voice_options)
+            audio_filename = os.path.basename(full_filename)
+            logger.info(f'requesting audio, full filename {full_filename}')
+            cache_hit = self.is_cached_audio_file(full_filename)
             if span is not None:
                 span.set_data("cache_hit", cache_hit)
         if not cache_hit:
@@ -468,21 +693,61 @@ class HyperTTS():
                 voice = self.service_manager.locate_voice(voice_id)
             logger.info(f'located voice: {voice}')
 
-            audio_data = self.service_manager.get_tts_audio(source_text, voice, voice_options, audio_request_context)
+            audio_data = self.get_tts_audio_chunked(source_text, voice, voice_options, audio_request_context)
             logger.info(f'not found in cache, requesting')
             logger.debug(f'opening {full_filename}')
             with _start_span(op="file.write", name="write_audio_to_user_files") as span:
                 if span is not None:
                     span.set_data("bytes", len(audio_data))
-                f = open(full_filename, 'wb')
-                logger.debug(f'done opening {full_filename}')
-                f.write(audio_data)
-                logger.debug(f'wrote audio data')
-                f.close()
+                self.write_audio_file(full_filename, audio_data)
         else:
             logger.info(f'file exists in cache')
         return full_filename, audio_filename
 
+    def write_audio_file(self, full_filename, audio_data):
+        # write a new file and swap it in, the cached file may be hardlinked into the collection media
+        # folder, writing into it would modify the media file as well
+        temp_filename = f'{full_filename}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_filename, 'wb') as f:
+                f.write(audio_data)
+            logger.debug(f'wrote audio data to {temp_filename}')
+            os.replace(temp_filename, full_filename)
+        except Exception:
+            # don't leave a partial file behind, e.g. when the disk is full
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
+    def get_tts_audio_chunked(self, source_text, voice, voice_options, audio_request_context):
+        # texts longer than what the service accepts get split at sentence boundaries, the chunks are
+        # requested in parallel and the audio joined back together into a single playable file.
+        max_text_length = self.service_manager.get_service(voice.service).MAX_TEXT_LENGTH
+        if max_text_length == None or len(source_text) <= max_text_length:
+            return self.service_manager.get_tts_audio(source_text, voice, voice_options, audio_request_context)
+        chunks = text_utils.split_text_chunks(source_text, max_text_length)
+        logger.info(f'text too long for {voice.service} ({len(source_text)} characters), requesting {len(chunks)} chunks')
+        max_workers = min(len(chunks), constants.CHUNKED_SYNTHESIS_MAX_CONCURRENT_REQUESTS)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            audio_chunks = list(executor.map(lambda chunk: self.service_manager.get_tts_audio(
+                chunk, voice, voice_options, audio_request_context), chunks))
+        return audio_utils.join_audio_chunks(audio_chunks, self.get_audio_format(voice_options))
+
+    def get_audio_format(self, voice_options):
+        # default to mp3
+        if options.AUDIO_FORMAT_PARAMETER in voice_options:
+            return options.AudioFormat[voice_options[options.AUDIO_FORMAT_PARAMETER]]
+        return options.AudioFormat.mp3
+
+    def get_audio_request_full_filename(self, source_text, voice_id: voice_module.TtsVoiceId_v3, voice_options):
+        # where generate_audio_write_file puts the audio for this request
+        hash_str = self.get_hash_for_audio_request(source_text, voice_id, voice_options)
+        return self.get_full_audio_file_name(hash_str, self.get_audio_format(voice_options))
+
+    def is_cached_audio_file(self, full_filename):
+        # an empty file is left behind when writing the audio failed, it doesn't count
+        return os.path.isfile(full_filename) and os.path.getsize(full_filename) > 0
+
     def get_collection_sound_tag(self, full_filename, audio_filename):
         with _start_span(op="db.anki.media.add", name="media_add_file"):
             self.anki_utils.media_add_file(full_filename)
@@ -525,10 +790,25 @@ class HyperTTS():
 
     def get_audio_filename_tts_tag(self, tts_tag):
         hypertts_preset = self.extract_hypertts_preset(tts_tag.other_args)
+        cache_key = (hypertts_preset, tts_tag.field_text)
+        with self.realtime_audio_cache_lock:
+            full_filename = self.realtime_audio_cache.get(cache_key, None)
+        # the file could have been removed from the user_files directory
+        if full_filename != None and self.is_cached_audio_file(full_filename):
+            return full_filename
+
         realtime_side_model = self.get_realtime_side_config(hypertts_preset)
         full_filename, audio_filename = self.get_realtime_audio(realtime_side_model, tts_tag.field_text)
+        # in random mode, a different voice may be picked every time, don't remember the file
+        if realtime_side_model.voice_selection.selection_mode != constants.VoiceSelectionMode.random:
+            with self.realtime_audio_cache_lock:
+                self.realtime_audio_cache[cache_key] = full_filename
         return full_filename
 
+    def clear_realtime_audio_cache(self):
+        with self.realtime_audio_cache_lock:
+            self.realtime_audio_cache.clear()
+
     def build_realtime_tts_tag(self, realtime_side_model: config_models.RealtimeConfigSide, setting_key):
         logger.debug('build_realtime_tts_tag')
         if realtime_side_model.source.mode == constants.RealtimeSourceType.AnkiTTSTag:
@@ -609,12 +889,15 @@ class HyperTTS():
         return self.alter_tts_tag_note_model(note_model, side, card_ord, clear_only, tts_tag)
 
 
+    def get_side_template_key(self, side):
+        if side == constants.AnkiCardSide.Back:
+            return 'afmt'
+        return 'qfmt'
+
     def alter_tts_tag_note_model(self, note_model, side, card_ord, clear_only, tts_tag):
         # alter card template
         card_template = note_model["tmpls"][card_ord]
-        side_template_key = 'qfmt'
-        if side == constants.AnkiCardSide.Back:
-            side_template_key = 'afmt'
+        side_template_key = self.get_side_template_key(side)
         side_template = card_template[side_template_key]
         side_template = self.remove_tts_tag(side_template)
         if not clear_only:
@@ -625,14 +908,36 @@ class HyperTTS():
 
         return note_model
 
-    def render_card_template_extract_tts_tag(self, realtime_model: config_models.RealtimeConfig, note, side, card_ord):
+    def get_realtime_preview_template(self, note, note_model, card_ord):
+        # the card template with TTS tags stripped from both sides, shared between previews
+        # of the same note type. the note type's mod time is part of the key, so editing
+        # the note type invalidates the entry.
+        cache_key = (note.mid, note_model.get('mod', None), card_ord)
+        with self.realtime_preview_template_cache_lock:
+            preview_template = self.realtime_preview_template_cache.get(cache_key, None)
+            if preview_template == None:
+                preview_template = dict(note_model["tmpls"][card_ord])
+                for side_template_key in ['qfmt', 'afmt']:
+                    preview_template[side_template_key] = self.remove_tts_tag(preview_template[side_template_key])
+                self.realtime_preview_template_cache[cache_key] = preview_template
+        return preview_template
+
+    def clear_realtime_preview_template_cache(self):
+        with self.realtime_preview_template_cache_lock:
+            self.realtime_preview_template_cache.clear()
+
+    def render_card_template_extract_tts_tag(self, realtime_model: config_models.RealtimeConfigSide, note, side, card_ord):
         realtime_model.validate()
         note_model = note.note_type()
-        note_model = copy.deepcopy(note_model)
-        note_model = self.set_tts_tag_note_model(realtime_model, 'preview', note_model, side, card_ord, False)
-        logger.debug(f'render_card_template_extract_tts_tag, note_model {pprint.pformat(note_model, compact=True, width=500)}')
-
-        card = self.anki_utils.create_card_from_note(note, card_ord, note_model, note_model["tmpls"][card_ord])
+        # only the side being previewed gets altered, on a shallow copy of the cached template.
+        # the note type itself is never modified, so there is no need to copy it.
+        side_template_key = self.get_side_template_key(side)
+        template = dict(note_model["tmpls"][card_ord])
+        template[side_template_key] = self.get_realtime_preview_template(note, note_model, card_ord)[side_template_key] + \
+            '\n' + self.build_realtime_tts_tag(realtime_model, 'preview')
+        logger.debug(f'render_card_template_extract_tts_tag, {side_template_key}: {template[side_template_key]}')
+
+        card = self.anki_utils.create_card_from_note(note, card_ord, note_model, template)
         if side == constants.AnkiCardSide.Front:
             return self.anki_utils.extract_tts_tags(card.question_av_tags())
         elif side == constants.AnkiCardSide.Back:
@@ -667,6 +972,7 @@ class HyperTTS():
 
         # save note model
         self.anki_utils.save_note_type_update(note_model)
+        self.clear_realtime_preview_template_cache()
 
         self.anki_utils.undo_end(undo_id)
 
@@ -679,6 +985,7 @@ class HyperTTS():
         side = constants.AnkiCardSide.Back
         note_model = self.alter_tts_tag_note_model(note_model, side, card_ord, True, None)
         self.anki_utils.save_note_type_update(note_model)
+        self.clear_realtime_preview_template_cache()
         self.anki_utils.undo_end(undo_id)        
 
 
@@ -696,15 +1003,32 @@ class HyperTTS():
     def get_fields_from_note(self, note):
         return list(note.keys())
 
-    def populate_batch_status_processed_text(self, note_id_list, batch_source, text_processing, batch_status):
+    def populate_batch_status_processed_text(self, note_id_list, batch_source, text_processing, batch_status, batch_estimate=None):
+        # the text processing runs on chunks of notes at once, see text_utils.process_text_bulk
+        chunk_size = constants.BATCH_PREVIEW_TEXT_PROCESSING_CHUNK_SIZE
         with batch_status.get_batch_running_action_context():
-            for note_id in note_id_list:
-                with batch_status.get_note_action_context(note_id, True) as note_action_context:
-                    note = self.anki_utils.get_note_by_id(note_id)
-                    source_text, processed_text = self.get_source_processed_text(note, batch_source, text_processing)
-                    note_action_context.set_source_text(source_text)
-                    note_action_context.set_processed_text(processed_text)
-                    note_action_context.set_status(constants.BatchNoteStatus.OK)
+            for chunk_start in range(0, len(note_id_list), chunk_size):
+                # notes whose source text could be read
+                chunk_note_ids = []
+                source_texts = []
+                for note_id in note_id_list[chunk_start:chunk_start + chunk_size]:
+                    with batch_status.get_note_action_context(note_id, True) as note_action_context:
+                        note = self.anki_utils.get_note_by_id(note_id)
+                        source_text = self.get_source_text(note, batch_source, None)
+                        note_action_context.set_source_text(source_text)
+                        chunk_note_ids.append(note_id)
+                        source_texts.append(source_text)
+                    if batch_status.must_continue == False:
+                        break
+                processed_texts, text_errors = text_utils.process_text_bulk(source_texts, text_processing)
+                for i, note_id in enumerate(chunk_note_ids):
+                    with batch_status.get_note_action_context(note_id, False) as note_action_context:
+                        if i in text_errors:
+                            raise text_errors[i]
+                        if batch_estimate != None:
+                            batch_estimate.add_text(processed_texts[i])
+                        note_action_context.set_processed_text(processed_texts[i])
+                        note_action_context.set_status(constants.BatchNoteStatus.OK)
                 if batch_status.must_continue == False:
                     logger.info('batch_status execution interrupted')
                     break
@@ -777,7 +1101,7 @@ class HyperTTS():
 
     def get_default_preset_id(self, deck_note_type: config_models.DeckNoteType) -> str:
         # returns preset_id or None
-        mapping_rules = self.load_mapping_rules()
+        mapping_rules = self.load_mapping_rules_indexed()
         return mapping_rules.get_default_preset_id(deck_note_type)
 
     def save_default_preset(self, deck_note_type: config_models.DeckNoteType, preset: config_models.BatchConfig):
@@ -794,12 +1118,24 @@ class HyperTTS():
     def save_mapping_rules(self, mapping_rules: config_models.PresetMappingRules):
         self.config[constants.CONFIG_MAPPING_RULES] = config_models.serialize_preset_mapping_rules(mapping_rules)
         self.anki_utils.write_config(self.config)
+        # rebuild the index from the saved rules
+        self.mapping_rules_indexed = None
+        self.load_mapping_rules_indexed()
         logger.info('saved mapping rules')
 
     def load_mapping_rules(self) -> config_models.PresetMappingRules:
         if constants.CONFIG_MAPPING_RULES not in self.config:
             return config_models.PresetMappingRules()
         return config_models.deserialize_preset_mapping_rules(self.config[constants.CONFIG_MAPPING_RULES])
+
+    def load_mapping_rules_indexed(self) -> config_models.PresetMappingRules:
+        """saved mapping rules with their lookup index. shared instance, callers must not modify it,
+        use load_mapping_rules to get a copy which can be edited"""
+        if self.mapping_rules_indexed == None:
+            mapping_rules = self.load_mapping_rules()
+            mapping_rules.build_index()
+            self.mapping_rules_indexed = mapping_rules
+        return self.mapping_rules_indexed
     
     # realtime config
 
@@ -821,6 +1157,8 @@ class HyperTTS():
             final_key = settings_key
         self.config[constants.CONFIG_REALTIME_CONFIG][final_key] = realtime_model.serialize()
         self.anki_utils.write_config(self.config)
+        # tags for this realtime config may now resolve to different audio
+        self.clear_realtime_audio_cache()
         return final_key
 
     def load_realtime_config(self, settings_key):
@@ -866,8 +1204,17 @@ class HyperTTS():
         if services_enabled:
             # at least one service was enabled
             self.anki_utils.broadcast_services_configured()
+        self.prepare_service_clients()
         self.schedule_sentry_email_update()
 
+    def prepare_service_clients(self):
+        """builds the clients of the enabled services in the background, so that the first request doesn't wait for them"""
+        self.anki_utils.run_in_background(self.service_manager.prepare_service_clients, self.prepare_service_clients_done)
+
+    def prepare_service_clients_done(self, result):
+        with self.error_manager.get_single_action_context('Preparing Services'):
+            result.result()
+
     def schedule_sentry_email_update(self):
         if not hasattr(sys, '_sentry_crash_reporting'):
             return
@@ -1002,6 +1349,7 @@ class HyperTTS():
             return random
         elif voice_selection_mode == constants.VoiceSelectionMode.priority:
             priority = config_models.VoiceSelectionPriority()
+            priority.concurrent_probing = voice_selection_config.get('concurrent_probing', False)
             for voice_data in voice_selection_config['voice_list']:
                 voice_id = voice_module.deserialize_voice_id_v3(voice_data['voice_id'])
                 try:
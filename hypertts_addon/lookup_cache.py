@@ -0,0 +1,75 @@
+import time
+import sqlite3
+import threading
+
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class LookupCache():
+    """persistent cache of dictionary lookups (word -> audio url, or not found), so that
+    dictionary services don't need to fetch and parse the same pages again. stored in an
+    sqlite file, shared by all services."""
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self.lock = threading.Lock()
+        self.connection = None
+        self.disabled = False
+
+    def get_connection(self):
+        # must be called with self.lock held
+        if self.connection == None and not self.disabled:
+            try:
+                self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+                self.connection.execute("""CREATE TABLE IF NOT EXISTS lookups (
+                    service TEXT NOT NULL,
+                    lookup_key TEXT NOT NULL,
+                    audio_url TEXT,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (service, lookup_key))""")
+                self.connection.commit()
+            except sqlite3.Error as e:
+                logger.warning(f'could not open lookup cache {self.database_path}, disabling: {e}')
+                self.connection = None
+                self.disabled = True
+        return self.connection
+
+    def get(self, service_name, lookup_key, found_ttl_seconds, not_found_ttl_seconds):
+        # returns (cached, audio_url), audio_url is None when the word was not found
+        with self.lock:
+            connection = self.get_connection()
+            if connection == None:
+                return False, None
+            row = connection.execute('SELECT audio_url, timestamp FROM lookups WHERE service = ? AND lookup_key = ?',
+                (service_name, lookup_key)).fetchone()
+        if row == None:
+            return False, None
+        audio_url, timestamp = row
+        ttl_seconds = found_ttl_seconds if audio_url != None else not_found_ttl_seconds
+        if time.time() - timestamp > ttl_seconds:
+            return False, None
+        return True, audio_url
+
+    def put(self, service_name, lookup_key, audio_url):
+        with self.lock:
+            connection = self.get_connection()
+            if connection == None:
+                return
+            connection.execute('INSERT OR REPLACE INTO lookups (service, lookup_key, audio_url, timestamp) VALUES (?, ?, ?, ?)',
+                (service_name, lookup_key, audio_url, time.time()))
+            connection.commit()
+
+    def remove(self, service_name, lookup_key):
+        with self.lock:
+            connection = self.get_connection()
+            if connection == None:
+                return
+            connection.execute('DELETE FROM lookups WHERE service = ? AND lookup_key = ?', (service_name, lookup_key))
+            connection.commit()
+
+    def close(self):
+        with self.lock:
+            if self.connection != None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,83 @@
+import sys
+import os
+import errno
+import ctypes
+import ctypes.util
+import threading
+
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+# linux ioctl which makes the target file share the extents of the source file (btrfs, xfs)
+FICLONE = 0x40049409
+
+# media directories on which neither hardlinks nor reflinks worked, we don't try again
+unsupported_media_dirs = set()
+unsupported_media_dirs_lock = threading.Lock()
+
+
+def reflink_file(source_path, target_path):
+    # copy-on-write clone, raises OSError when the platform or filesystem doesn't support it
+    if sys.platform.startswith('linux'):
+        import fcntl
+        with open(source_path, 'rb') as source_file:
+            with open(target_path, 'xb') as target_file:
+                try:
+                    fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+                except OSError:
+                    target_file.close()
+                    os.remove(target_path)
+                    raise
+    elif sys.platform == 'darwin':
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if libc.clonefile(os.fsencode(source_path), os.fsencode(target_path), 0) != 0:
+            error_number = ctypes.get_errno()
+            raise OSError(error_number, os.strerror(error_number))
+    else:
+        raise OSError(errno.ENOTSUP, 'reflinks not supported on this platform')
+
+def verify_link(source_path, target_path, hardlink):
+    if hardlink:
+        return os.path.samefile(source_path, target_path)
+    return os.path.getsize(source_path) == os.path.getsize(target_path)
+
+def link_media_file(source_path, media_dir):
+    """places the audio file into the collection media folder under the same name, as a hardlink, or a
+    reflink if hardlinks don't work. both only work when user_files and the media folder are on the same
+    filesystem. returns the media filename, or None when the caller needs to fall back to a regular copy."""
+    filename = os.path.basename(source_path)
+    target_path = os.path.join(media_dir, filename)
+
+    if os.path.exists(target_path):
+        if os.path.samefile(source_path, target_path):
+            # linked previously, nothing to do
+            return filename
+        # a file with the same name but different contents is handled by the regular copy, which renames it
+        return None
+
+    with unsupported_media_dirs_lock:
+        if media_dir in unsupported_media_dirs:
+            return None
+
+    if os.path.getsize(source_path) == 0:
+        return None
+
+    for link_type, link_fn in [('hardlink', os.link), ('reflink', reflink_file)]:
+        try:
+            link_fn(source_path, target_path)
+        except FileExistsError:
+            # another thread placed the same file
+            return link_media_file(source_path, media_dir)
+        except OSError as e:
+            logger.debug(f'could not {link_type} {source_path} into {media_dir}: {e}')
+            continue
+        if verify_link(source_path, target_path, link_type == 'hardlink'):
+            logger.debug(f'{link_type} {source_path} into {media_dir}')
+            return filename
+        logger.warning(f'{link_type} of {source_path} into {media_dir} could not be verified, removing it')
+        os.remove(target_path)
+
+    logger.info(f'could not link files into {media_dir}, copying them instead')
+    with unsupported_media_dirs_lock:
+        unsupported_media_dirs.add(media_dir)
+    return None
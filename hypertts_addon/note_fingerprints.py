@@ -0,0 +1,70 @@
+import sqlite3
+import threading
+
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class NoteFingerprint():
+    def __init__(self, note_mod, fingerprint, sound_file):
+        # modification time of the note once the batch had updated it
+        self.note_mod = note_mod
+        # hash of the processed text and voice selection the audio was generated from
+        self.fingerprint = fingerprint
+        self.sound_file = sound_file
+
+
+class NoteFingerprintStore():
+    """remembers, for each batch settings and note, what the audio was last generated from. lets
+    a batch skip the notes which haven't changed since the previous run. stored in an sqlite file."""
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self.lock = threading.Lock()
+        self.connection = None
+        self.disabled = False
+
+    def get_connection(self):
+        # must be called with self.lock held
+        if self.connection == None and not self.disabled:
+            try:
+                self.connection = sqlite3.connect(self.database_path, check_same_thread=False)
+                self.connection.execute("""CREATE TABLE IF NOT EXISTS note_fingerprints (
+                    batch_key TEXT NOT NULL,
+                    note_id INTEGER NOT NULL,
+                    note_mod INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    sound_file TEXT NOT NULL,
+                    PRIMARY KEY (batch_key, note_id))""")
+                self.connection.commit()
+            except sqlite3.Error as e:
+                logger.warning(f'could not open note fingerprints {self.database_path}, disabling: {e}')
+                self.connection = None
+                self.disabled = True
+        return self.connection
+
+    def get_fingerprints(self, batch_key):
+        # note_id -> NoteFingerprint, for all the notes processed with these batch settings
+        with self.lock:
+            connection = self.get_connection()
+            if connection == None:
+                return {}
+            rows = connection.execute('SELECT note_id, note_mod, fingerprint, sound_file FROM note_fingerprints WHERE batch_key = ?',
+                (batch_key,)).fetchall()
+        return {note_id: NoteFingerprint(note_mod, fingerprint, sound_file) for note_id, note_mod, fingerprint, sound_file in rows}
+
+    def put_fingerprints(self, batch_key, fingerprints):
+        # fingerprints: note_id -> NoteFingerprint
+        with self.lock:
+            connection = self.get_connection()
+            if connection == None:
+                return
+            connection.executemany('INSERT OR REPLACE INTO note_fingerprints (batch_key, note_id, note_mod, fingerprint, sound_file) VALUES (?, ?, ?, ?, ?)',
+                [(batch_key, note_id, entry.note_mod, entry.fingerprint, entry.sound_file) for note_id, entry in fingerprints.items()])
+            connection.commit()
+
+    def close(self):
+        with self.lock:
+            if self.connection != None:
+                self.connection.close()
+                self.connection = None
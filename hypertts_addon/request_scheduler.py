@@ -0,0 +1,58 @@
+import heapq
+import itertools
+import threading
+import contextlib
+
+from . import constants
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class RequestScheduler():
+    """limits the number of requests in flight to each service. when a service is busy, waiting
+    requests are let through by priority: realtime playback first, then previews and the editor,
+    and batches last. batches can't take up all the slots, so that there is always room for a
+    request which the user is waiting on."""
+
+    def __init__(self, max_concurrent_requests, reserved_interactive_requests):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.reserved_interactive_requests = reserved_interactive_requests
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.running_requests = {} # service name -> number of requests in flight
+        self.waiting_requests = {} # service name -> heap of (priority, sequence)
+
+    def get_request_limit(self, priority: constants.RequestPriority):
+        if priority == constants.RequestPriority.batch:
+            return self.max_concurrent_requests - self.reserved_interactive_requests
+        return self.max_concurrent_requests
+
+    @contextlib.contextmanager
+    def request_slot(self, service_name, priority: constants.RequestPriority):
+        self.acquire(service_name, priority)
+        try:
+            yield
+        finally:
+            self.release(service_name)
+
+    def acquire(self, service_name, priority: constants.RequestPriority):
+        with self.condition:
+            ticket = (priority.value, next(self.sequence))
+            waiting = self.waiting_requests.setdefault(service_name, [])
+            heapq.heappush(waiting, ticket)
+            limit = self.get_request_limit(priority)
+            while waiting[0] != ticket or self.running_requests.get(service_name, 0) >= limit:
+                self.condition.wait()
+            heapq.heappop(waiting)
+            self.running_requests[service_name] = self.running_requests.get(service_name, 0) + 1
+            # the next request in line may be able to go too
+            self.condition.notify_all()
+
+    def release(self, service_name):
+        with self.condition:
+            self.running_requests[service_name] -= 1
+            self.condition.notify_all()
+
+    def waiting_request_count(self, service_name):
+        with self.condition:
+            return len(self.waiting_requests.get(service_name, []))
@@ -3,6 +3,9 @@ import abc
 import json
 import os
 import functools
+import time
+import threading
+import concurrent.futures
 import databind.json
 from posixpath import dirname
 import typing
@@ -13,12 +16,149 @@ from . import languages
 from . import errors
 from . import logging_utils
 
-from .services import voicelist
-
 logger = logging_utils.get_child_logger(__name__)
 
 
+class ServiceManifestEntry():
+    """what the service manager needs to know about a service before its module gets imported.
+    each services package lists its services in manifest.py, the module is only imported when
+    the service is first used."""
+
+    def __init__(self, name: str, module_name: str, service_type: constants.ServiceType, service_fee: constants.ServiceFee,
+                 cloudlanguagetools_enabled: bool, test_service: bool = False):
+        self.name = name
+        self.module_name = module_name
+        self.service_type = service_type
+        self.service_fee = service_fee
+        self.cloudlanguagetools_enabled = cloudlanguagetools_enabled
+        self.test_service = test_service
+
+
+class AccessTokenManager():
+    """caches an expiring access token for a service. the token is shared by all threads
+    (batch workers), only one of them performs the auth round trip when the token is missing
+    or expired, and a token which is about to expire gets refreshed in the background while
+    the current one keeps being handed out."""
+
+    def __init__(self, service):
+        self.service = service
+        self.lock = threading.Lock()
+        self.fetch_lock = threading.Lock()
+        self.token = None
+        self.expire_time = 0
+        self.refresh_time = 0
+        self.background_refresh_running = False
+        # incremented by invalidate(), a fetch which started before that must not store its token
+        self.generation = 0
+
+    def get_token(self):
+        now = time.monotonic()
+        with self.lock:
+            token = self.token
+            token_valid = token != None and now < self.expire_time
+            refresh_due = token_valid and now >= self.refresh_time and not self.background_refresh_running
+            if refresh_due:
+                self.background_refresh_running = True
+        if refresh_due:
+            threading.Thread(target=self.background_refresh, daemon=True).start()
+        if token_valid:
+            return token
+
+        with self.fetch_lock:
+            # another thread may have fetched the token while we were waiting
+            with self.lock:
+                if self.token != None and time.monotonic() < self.expire_time:
+                    return self.token
+            return self.fetch_token()
+
+    def set_token(self, token, expires_in_seconds, generation=None):
+        now = time.monotonic()
+        with self.lock:
+            if generation != None and generation != self.generation:
+                # the service was reconfigured while the token was being fetched
+                logger.debug(f'{self.service.name}: discarding access token fetched before invalidation')
+                return
+            self.token = token
+            self.expire_time = now + expires_in_seconds - constants.ACCESS_TOKEN_EXPIRE_MARGIN_SECONDS
+            self.refresh_time = now + expires_in_seconds - constants.ACCESS_TOKEN_REFRESH_MARGIN_SECONDS
+
+    def invalidate(self):
+        with self.lock:
+            self.token = None
+            self.expire_time = 0
+            self.refresh_time = 0
+            self.generation += 1
+
+    def fetch_token(self):
+        logger.debug(f'{self.service.name}: requesting access token')
+        with self.lock:
+            generation = self.generation
+        token, expires_in_seconds = self.service.fetch_access_token()
+        self.set_token(token, expires_in_seconds, generation)
+        return token
+
+    def background_refresh(self):
+        try:
+            with self.fetch_lock:
+                self.fetch_token()
+        except Exception as e:
+            # the current token stays in use until it expires, the next caller will retry
+            logger.warning(f'{self.service.name}: could not refresh access token: {e}')
+        finally:
+            with self.lock:
+                self.background_refresh_running = False
+
+
+class ServiceClientManager():
+    """holds a client object which is expensive to build (an sdk client for example). configuring
+    the service only records the settings, the client gets built in the background once Anki is up,
+    or by the first request if that comes earlier. requests only wait while the client is being built."""
+
+    def __init__(self, service):
+        self.service = service
+        self.lock = threading.Lock()
+        self.future = None
+
+    def get_client(self):
+        with self.lock:
+            future = self.future
+            build_client = future == None
+            if build_client:
+                future = concurrent.futures.Future()
+                self.future = future
+        if build_client:
+            self.build_client(future)
+        # other threads wait here until the client is ready
+        return future.result()
+
+    def build_client(self, future):
+        logger.debug(f'{self.service.name}: building client')
+        try:
+            future.set_result(self.service.build_client())
+        except Exception as e:
+            future.set_exception(e)
+            # don't remember the failure, the next request will try again
+            with self.lock:
+                if self.future is future:
+                    self.future = None
+
+    def invalidate(self):
+        with self.lock:
+            self.future = None
+
+
 class ServiceBase(abc.ABC):
+    _token_manager_lock = threading.Lock()
+    _client_manager_lock = threading.Lock()
+
+    # persistent dictionary lookup cache, assigned by the ServiceManager
+    lookup_cache = None
+    LOOKUP_FOUND_TTL_SECONDS = constants.LOOKUP_CACHE_FOUND_TTL_SECONDS
+    LOOKUP_NOT_FOUND_TTL_SECONDS = constants.LOOKUP_CACHE_NOT_FOUND_TTL_SECONDS
+    # maximum number of characters accepted in one request. longer texts get split at
+    # sentence boundaries and the chunks are synthesized separately, None means no limit
+    MAX_TEXT_LENGTH = None
+
     def __init__(self):
         self._config = {}
     
@@ -41,6 +181,26 @@ class ServiceBase(abc.ABC):
 
     enabled = property(fget=_get_enabled, fset=_set_enabled)
 
+    # shared access token cache, for services which need to request tokens
+    def _get_token_manager(self):
+        if not hasattr(self, '_token_manager'):
+            with ServiceBase._token_manager_lock:
+                if not hasattr(self, '_token_manager'):
+                    self._token_manager = AccessTokenManager(self)
+        return self._token_manager
+
+    token_manager = property(fget=_get_token_manager)
+
+    # shared client, for services which override build_client
+    def _get_client_manager(self):
+        if not hasattr(self, '_client_manager'):
+            with ServiceBase._client_manager_lock:
+                if not hasattr(self, '_client_manager'):
+                    self._client_manager = ServiceClientManager(self)
+        return self._client_manager
+
+    client_manager = property(fget=_get_client_manager)
+
     # whether the service is supported by cloud-language-tools
     def cloudlanguagetools_enabled(self):
         return False # default
@@ -74,6 +234,8 @@ class ServiceBase(abc.ABC):
     # some helper functions
     def basic_voice_list(self) -> typing.List[voice_module.TtsVoice_v3]:
         """basic processing for voice list which should work for most services which are represented in voicelist.py"""
+        # the voice catalog is large, only import it once a service needs it
+        from .services import voicelist
         voice_list = voicelist.VOICE_LIST
         service_voices = [voice_candidate for voice_candidate in voice_list if voice_candidate.service == self.name]
         return service_voices
@@ -85,6 +247,45 @@ class ServiceBase(abc.ABC):
     def configure(self, config):
         self._config = config
 
+    # services which exchange their credentials for an expiring access token override this,
+    # returning (token, expires_in_seconds). they then call get_access_token() for every request.
+    def fetch_access_token(self):
+        raise NotImplementedError(f'{self.name} does not use access tokens')
+
+    def get_access_token(self):
+        return self.token_manager.get_token()
+
+    # services with a client which is expensive to build override this and call get_client() for every
+    # request. configure() should only record and validate the settings.
+    def build_client(self):
+        raise NotImplementedError(f'{self.name} does not use a client')
+
+    def uses_client(self):
+        return type(self).build_client != ServiceBase.build_client
+
+    def get_client(self):
+        return self.client_manager.get_client()
+
+    # dictionary services: lookup_fn fetches and parses the dictionary page, and returns the audio url,
+    # or None when the dictionary doesn't have a recording for this word. both outcomes get cached,
+    # lookup_fn should raise on transient errors so that they don't get remembered.
+    def lookup_audio_url(self, lookup_key, lookup_fn):
+        if self.lookup_cache != None:
+            cached, audio_url = self.lookup_cache.get(self.name, lookup_key,
+                self.LOOKUP_FOUND_TTL_SECONDS, self.LOOKUP_NOT_FOUND_TTL_SECONDS)
+            if cached:
+                logger.debug(f'{self.name}: lookup cache hit for {lookup_key}: {audio_url}')
+                return audio_url
+        audio_url = lookup_fn()
+        if self.lookup_cache != None:
+            self.lookup_cache.put(self.name, lookup_key, audio_url)
+        return audio_url
+
+    def forget_audio_url(self, lookup_key):
+        # the cached audio url didn't work anymore
+        if self.lookup_cache != None:
+            self.lookup_cache.remove(self.name, lookup_key)
+
     def get_configuration_value_mandatory(self, key):
         value = self._config.get(key, None)
         if value == None or (self.configuration_options()[key] == str and len(value) == 0):
@@ -8,6 +8,8 @@ import requests
 import pprint
 import functools
 import time
+import threading
+import cachetools
 
 
 from . import voice as voice_module
@@ -18,12 +20,19 @@ from . import constants
 from . import constants_events
 from . import config_models
 from . import cloudlanguagetools as cloudlanguagetools_module
+from . import circuit_breaker
+from . import request_scheduler
 from . import logging_utils
 from . import stats
 logger = logging_utils.get_child_logger(__name__)
 
-# don't publish more than X events for a batch uuid
-COUNT_BY_BATCH_UUID = {}
+# don't publish more than X events for a batch uuid. entries are removed when a batch finishes,
+# the others (realtime, editor) get pushed out by newer ones
+COUNT_BY_BATCH_UUID = cachetools.LRUCache(maxsize=constants_events.GENERATE_EVENT_COUNT_MAX_BATCHES)
+COUNT_BY_BATCH_UUID_LOCK = threading.Lock()
+
+# errors which indicate that a service is down, each one gets its own circuit breaker
+CIRCUIT_BREAKER_ERRORS = [errors.ServiceConnectionError, errors.ServiceGatewayError]
 
 if hasattr(sys, '_sentry_crash_reporting'):
     import sentry_sdk
@@ -36,10 +45,31 @@ class ServiceManager():
     def __init__(self, services_directory, package_name, allow_test_services, cloudlanguagetools=cloudlanguagetools_module.CloudLanguageTools()):
         self.services_directory = services_directory
         self.package_name = package_name
+        # services which have been imported and instantiated, see load_service
         self.services = {}
+        # service name -> ServiceManifestEntry, for all the services we know about
+        self.service_manifest = {}
+        # enabled state of services which haven't been loaded yet
+        self.pending_service_enabled = {}
+        self.service_load_lock = threading.RLock()
         self.cloudlanguagetools_enabled = False
         self.allow_test_services = allow_test_services
         self.cloudlanguagetools = cloudlanguagetools
+        self.lookup_cache = None
+        # (service name, error class name) -> CircuitBreaker
+        self.circuit_breakers = {}
+        self.circuit_breakers_lock = threading.Lock()
+        # service name -> moving average of the request duration in seconds
+        self.request_durations = {}
+        # realtime, editor and batch requests all go through here, interactive requests first
+        self.request_scheduler = request_scheduler.RequestScheduler(constants.SERVICE_MAX_CONCURRENT_REQUESTS,
+            constants.SERVICE_RESERVED_INTERACTIVE_REQUESTS)
+
+    def set_lookup_cache(self, lookup_cache):
+        # persistent cache used by dictionary services
+        self.lookup_cache = lookup_cache
+        for service in self.services.values():
+            service.lookup_cache = lookup_cache
 
     def configure(self, configuration_model, disable_ssl_verification: bool = False) -> bool:
         # will return true if at least one service is enabled
@@ -49,17 +79,22 @@ class ServiceManager():
             if not self.service_exists(service_name):
                 logger.warning(f'could not find service {service_name}, cannot configure')
                 continue
-            service = self.get_service(service_name)
-            logger.info(f'configuring service {service_name}, hypertts_pro_mode: {hypertts_pro_mode}, clt_enabled: {service.cloudlanguagetools_enabled()}')
-            if not (hypertts_pro_mode == True and service.cloudlanguagetools_enabled()):
-                service.enabled = enabled
+            clt_enabled = self.service_cloudlanguagetools_enabled(service_name)
+            logger.info(f'configuring service {service_name}, hypertts_pro_mode: {hypertts_pro_mode}, clt_enabled: {clt_enabled}')
+            if not (hypertts_pro_mode == True and clt_enabled):
+                self.set_service_enabled(service_name, enabled)
                 if enabled:
                     # at least one service enabled
                     return_value = True
-                # do we need to set configuration for this service ? only do so if the service is enabled
+                # do we need to set configuration for this service ? only do so if the service is enabled,
+                # disabled services don't get imported at all
                 if enabled and service_name in configuration_model.get_service_config():
+                    service = self.get_service(service_name)
                     service_config = configuration_model.get_service_config()[service_name]
                     service.configure(service_config)
+                    # credentials may have changed
+                    service.token_manager.invalidate()
+                    service.client_manager.invalidate()
         # if we enable cloudlanguagetools, it may force some services to enabled
         self.cloudlanguagetools.configure(configuration_model, disable_ssl_verification)
         if hypertts_pro_mode:
@@ -69,6 +104,10 @@ class ServiceManager():
         else:
             self.cloudlanguagetools_enabled = False
 
+        # configuration changed, give all services a fresh start
+        with self.circuit_breakers_lock:
+            self.circuit_breakers = {}
+
         return return_value
 
     def remove_non_existent_services(self, configuration_model):
@@ -104,33 +143,97 @@ class ServiceManager():
         return module_names
 
     def init_services(self):
-        self.import_services()
-        self.instantiate_services()
-
-    def import_services(self):
-        module_names = self.discover_services()
-        logger.info(f'discovered {len(module_names)} services')
-        for module_name in module_names:
-            logger.info(f'importing module {module_name}, package_name: {self.package_name}')
-            importlib.import_module(f'{self.package_name}.{module_name}')
-
-    def instantiate_services(self):
-        for subclass in service.ServiceBase.__subclasses__():
-            subclass_instance = subclass()
-            if subclass_instance.test_service() and self.allow_test_services == False:
-                logger.info(f'skipping test service {subclass_instance.name}')
-                continue
-            logger.info(f'instantiating service {subclass_instance.name}')
-            self.services[subclass_instance.name] = subclass_instance
+        with self.service_load_lock:
+            self.services = {}
+            self.pending_service_enabled = {}
+            self.service_manifest = {}
+            manifest_entries = self.load_manifest()
+            for entry in manifest_entries:
+                if entry.test_service and self.allow_test_services == False:
+                    logger.info(f'skipping test service {entry.name}')
+                    continue
+                self.service_manifest[entry.name] = entry
+            # services which are in the manifest get imported on first use
+            manifest_module_names = set([entry.module_name for entry in manifest_entries])
+            for module_name in self.discover_services():
+                if module_name not in manifest_module_names:
+                    logger.warning(f'service module {module_name} is not in the manifest, importing it now')
+                    self.instantiate_services(self.import_service_module(module_name))
+
+    def load_manifest(self):
+        try:
+            manifest_module = importlib.import_module(f'{self.package_name}.manifest')
+        except ModuleNotFoundError:
+            logger.warning(f'no service manifest in {self.package_name}, all services will be imported')
+            return []
+        return manifest_module.SERVICES
+
+    def import_service_module(self, module_name):
+        logger.info(f'importing module {module_name}, package_name: {self.package_name}')
+        return importlib.import_module(f'{self.package_name}.{module_name}')
+
+    def instantiate_services(self, module):
+        # instantiate the services defined in a module which isn't in the manifest
+        for name, value in vars(module).items():
+            if isinstance(value, type) and issubclass(value, service.ServiceBase) and value.__module__ == module.__name__:
+                self.add_service(value())
+
+    def add_service(self, service_instance):
+        # must be called with self.service_load_lock held
+        if service_instance.test_service() and self.allow_test_services == False:
+            logger.info(f'skipping test service {service_instance.name}')
+            return
+        logger.info(f'instantiating service {service_instance.name}')
+        service_instance.lookup_cache = self.lookup_cache
+        if service_instance.name in self.pending_service_enabled:
+            service_instance.enabled = self.pending_service_enabled.pop(service_instance.name)
+        self.services[service_instance.name] = service_instance
+
+    def load_service(self, service_name):
+        # imports and instantiates the service the first time it's needed
+        service_instance = self.services.get(service_name, None)
+        if service_instance != None:
+            return service_instance
+        with self.service_load_lock:
+            if service_name not in self.services:
+                entry = self.service_manifest[service_name]
+                module = self.import_service_module(entry.module_name)
+                self.add_service(getattr(module, entry.name)())
+            return self.services[service_name]
+
+    def get_service_names(self):
+        service_names = list(self.service_manifest.keys())
+        service_names.extend([service_name for service_name in self.services.keys() if service_name not in self.service_manifest])
+        return service_names
 
     def service_exists(self, service_name):
-        return service_name in self.services
+        return service_name in self.service_manifest or service_name in self.services
     
     def get_service(self, service_name):
-        return self.services[service_name]
+        return self.load_service(service_name)
 
     def get_all_services(self):
-        return list(self.services.values())
+        # the configuration dialog needs all of them, this imports every service module
+        return [self.get_service(service_name) for service_name in self.get_service_names()]
+
+    def set_service_enabled(self, service_name, enabled):
+        with self.service_load_lock:
+            if service_name in self.services:
+                self.services[service_name].enabled = enabled
+            else:
+                self.pending_service_enabled[service_name] = enabled
+
+    def is_service_enabled(self, service_name):
+        with self.service_load_lock:
+            if service_name in self.services:
+                return self.services[service_name].enabled
+            # no service is enabled by default, so services which haven't been loaded are disabled unless configured
+            return self.pending_service_enabled.get(service_name, False)
+
+    def service_cloudlanguagetools_enabled(self, service_name):
+        if service_name in self.service_manifest:
+            return self.service_manifest[service_name].cloudlanguagetools_enabled
+        return self.get_service(service_name).cloudlanguagetools_enabled()
 
     # service configuration
     # =====================
@@ -139,13 +242,27 @@ class ServiceManager():
         logger.info('configure_cloudlanguagetools')
         self.cloudlanguagetools_enabled = True
         # enable all services which are supported by cloud language tools
-        for service in self.get_all_services():
-            if service.cloudlanguagetools_enabled():
-                logger.info(f'enabling {service.name} with cloud language tools')
-                service.enabled = True
+        for service_name in self.get_service_names():
+            if self.service_cloudlanguagetools_enabled(service_name):
+                logger.info(f'enabling {service_name} with cloud language tools')
+                self.set_service_enabled(service_name, True)
+
+    def prepare_service_clients(self):
+        # builds the clients of the enabled services ahead of the first request. runs in the background
+        # once Anki is up, a request which comes earlier builds the client itself or waits for it.
+        for service_instance in list(self.services.values()):
+            if not service_instance.enabled or not service_instance.uses_client():
+                continue
+            if self.cloudlanguagetools_enabled and self.service_cloudlanguagetools_enabled(service_instance.name):
+                # requests go through cloud language tools
+                continue
+            try:
+                service_instance.get_client()
+            except Exception as e:
+                logger.warning(f'could not prepare client for service {service_instance.name}: {e}')
 
     def service_configuration_options(self, service_name):
-        return self.services[service_name].configuration_options()
+        return self.get_service(service_name).configuration_options()
 
     # getting TTS audio and voice list
     # ================================
@@ -153,8 +270,7 @@ class ServiceManager():
     def use_cloud_language_tools(self, voice: voice_module.TtsVoice_v3):
         assert isinstance(voice, voice_module.TtsVoice_v3), f"Expected voice to be TtsVoice_v3, got {type(voice).__name__}"
         if self.cloudlanguagetools_enabled:
-            service = self.get_service(voice.service)
-            if service.cloudlanguagetools_enabled():
+            if self.service_cloudlanguagetools_enabled(voice.service):
                 return True
         return False
 
@@ -162,10 +278,64 @@ class ServiceManager():
         logger.debug(f'get_tts_audio for voice: {voice}')
         # assert the type of voice being passed in
         assert isinstance(voice, voice_module.TtsVoice_v3), f"Expected voice to be TtsVoice_v3, got {type(voice).__name__}"
-        if hasattr(sys, '_sentry_crash_reporting'):
-            return self.get_tts_audio_instrumented(source_text, voice, options, audio_request_context)
+        # fails right away if the service is down, without making a request
+        breakers = self.acquire_circuit_breakers(source_text, voice)
+        try:
+            with self.request_scheduler.request_slot(voice.service, audio_request_context.get_request_priority()):
+                start_time = time.monotonic()
+                if hasattr(sys, '_sentry_crash_reporting'):
+                    audio_data = self.get_tts_audio_instrumented(source_text, voice, options, audio_request_context)
+                else:
+                    audio_data = self.get_tts_audio_implementation(source_text, voice, options, audio_request_context)
+                self.record_request_duration(voice.service, time.monotonic() - start_time)
+        except Exception as e:
+            for error_class, breaker in breakers:
+                if isinstance(e, error_class):
+                    breaker.record_failure()
+                elif isinstance(e, errors.PermanentError):
+                    # the service responded
+                    breaker.record_success()
+                else:
+                    breaker.record_inconclusive()
+            raise
+        for error_class, breaker in breakers:
+            breaker.record_success()
+        return audio_data
+
+    def record_request_duration(self, service_name, duration_seconds):
+        previous_duration = self.request_durations.get(service_name, None)
+        if previous_duration == None:
+            self.request_durations[service_name] = duration_seconds
         else:
-            return self.get_tts_audio_implementation(source_text, voice, options, audio_request_context)
+            self.request_durations[service_name] = previous_duration + 0.2 * (duration_seconds - previous_duration)
+
+    def get_average_request_duration(self, service_name):
+        # None if we haven't made any requests to this service yet
+        return self.request_durations.get(service_name, None)
+
+    def get_circuit_breakers(self, service_name):
+        breakers = []
+        with self.circuit_breakers_lock:
+            for error_class in CIRCUIT_BREAKER_ERRORS:
+                key = (service_name, error_class.__name__)
+                if key not in self.circuit_breakers:
+                    self.circuit_breakers[key] = circuit_breaker.CircuitBreaker(f'{service_name}/{error_class.__name__}',
+                        constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD, constants.CIRCUIT_BREAKER_OPEN_SECONDS)
+                breakers.append((error_class, self.circuit_breakers[key]))
+        return breakers
+
+    def acquire_circuit_breakers(self, source_text, voice: voice_module.TtsVoice_v3):
+        breakers = self.get_circuit_breakers(voice.service)
+        acquired_breakers = []
+        for error_class, breaker in breakers:
+            allowed, retry_seconds = breaker.allow_request()
+            if not allowed:
+                # give back any trial request we may have been granted by the other breakers
+                for _, acquired_breaker in acquired_breakers:
+                    acquired_breaker.record_inconclusive()
+                raise errors.ServiceUnavailableError(source_text, voice, voice.service, retry_seconds)
+            acquired_breakers.append((error_class, breaker))
+        return breakers
 
     def get_tts_audio_instrumented(self, source_text, voice: voice_module.TtsVoice_v3, options, audio_request_context):
         with sentry_sdk.new_scope() as sentry_scope:
@@ -265,7 +435,10 @@ class ServiceManager():
         logger.debug(f'get_tts_audio_implementation for voice: {voice}, source_text: {source_text}')
         use_clt = self.use_cloud_language_tools(voice)
 
-        event_count = COUNT_BY_BATCH_UUID.get(audio_request_context.batch_uuid, 0)
+        with COUNT_BY_BATCH_UUID_LOCK:
+            event_count = COUNT_BY_BATCH_UUID.get(audio_request_context.batch_uuid, 0)
+            if event_count < constants_events.GENERATE_MAX_EVENTS:
+                COUNT_BY_BATCH_UUID[audio_request_context.batch_uuid] = event_count + 1
         if event_count < constants_events.GENERATE_MAX_EVENTS:
             stats.send_event_bg(constants_events.EventContext.servicemanager,
                                 constants_events.Event.get_tts_audio,
@@ -277,17 +450,21 @@ class ServiceManager():
                                     'voice_name': voice.name,
                                     'voice_key': voice.voice_key,
                                 })
-            event_count += 1
-            COUNT_BY_BATCH_UUID[audio_request_context.batch_uuid] = event_count
 
         if use_clt:
             logger.debug(f'voice: {voice}, using cloudlanguagetools')
             return self.cloudlanguagetools.get_tts_audio(source_text, voice, options, audio_request_context)
         else:
+            # imports the service module on first use
+            self.load_service(voice.service)
             service_instance = self.services[voice.service]
             logger.debug(f'voice: {voice}, using service {service_instance.name}')
             return self._get_tts_audio_service(service_instance, source_text, voice, options)
 
+    def batch_finished(self, audio_request_context):
+        with COUNT_BY_BATCH_UUID_LOCK:
+            COUNT_BY_BATCH_UUID.pop(audio_request_context.batch_uuid, None)
+
     # Raises only subclasses of:
     #   PermanentError  – non-retryable
     #   TransientError  – retryable (timeout, unknown)
@@ -305,13 +482,14 @@ class ServiceManager():
 
     def full_voice_list(self, single_service_name=None) -> typing.List[voice_module.TtsVoice_v3]:
         full_list = []
-        for service_name, service_instance in self.services.items():
+        for service_name in self.get_service_names():
             if single_service_name != None:
                 # we only want voices for a particular service
                 if service_name != single_service_name:
                     continue
-            logger.debug(f'getting voice list for service {service_name}, enabled: {service_instance.enabled}')
-            if service_instance.enabled:
+            enabled = self.is_service_enabled(service_name)
+            logger.debug(f'getting voice list for service {service_name}, enabled: {enabled}')
+            if enabled:
                 voices = self.get_service_voice_list(service_name)
                 logger.debug(f'got {len(voices)} voices from service {service_name}')
                 full_list.extend(voices)
@@ -319,7 +497,7 @@ class ServiceManager():
 
     @functools.lru_cache(maxsize=None)
     def get_service_voice_list(self, service_name: str) -> typing.List[voice_module.TtsVoice_v3]:
-        service_instance = self.services[service_name]
+        service_instance = self.get_service(service_name)
         voices = service_instance.voice_list()
         return voices
 
@@ -0,0 +1,35 @@
+"""services known to the service manager without importing their modules. keep this in sync
+when adding a service or changing its type, fee or cloud language tools support,
+test_servicemanager.py checks it against the service classes."""
+
+from hypertts_addon import constants
+from hypertts_addon.service import ServiceManifestEntry
+
+SERVICES = [
+    ServiceManifestEntry('Alibaba', 'service_alibaba', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Amazon', 'service_amazon', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Azure', 'service_azure', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Cambridge', 'service_cambridge', constants.ServiceType.dictionary, constants.ServiceFee.free, False),
+    ServiceManifestEntry('CereProc', 'service_cereproc', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Duden', 'service_duden', constants.ServiceType.dictionary, constants.ServiceFee.free, False),
+    ServiceManifestEntry('DigitalesWorterbuchDeutschenSprache', 'service_dwds', constants.ServiceType.dictionary, constants.ServiceFee.free, False),
+    ServiceManifestEntry('ElevenLabs', 'service_elevenlabs', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('ElevenLabsCustom', 'service_elevenlabscustom', constants.ServiceType.tts, constants.ServiceFee.paid, False),
+    ServiceManifestEntry('ESpeakNg', 'service_espeakng', constants.ServiceType.tts, constants.ServiceFee.free, False),
+    ServiceManifestEntry('Forvo', 'service_forvo', constants.ServiceType.dictionary, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('FptAi', 'service_fptai', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('FptAiClassic', 'service_fptaiclassic', constants.ServiceType.tts, constants.ServiceFee.paid, False),
+    ServiceManifestEntry('Gemini', 'service_gemini', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Google', 'service_google', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('GoogleTranslate', 'service_googletranslate', constants.ServiceType.tts, constants.ServiceFee.free, False),
+    ServiceManifestEntry('MacOS', 'service_macos', constants.ServiceType.tts, constants.ServiceFee.free, False),
+    ServiceManifestEntry('Naver', 'service_naver', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('NaverPapago', 'service_naverpapago', constants.ServiceType.tts, constants.ServiceFee.free, False),
+    ServiceManifestEntry('OpenAI', 'service_openai', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Oxford', 'service_oxford', constants.ServiceType.dictionary, constants.ServiceFee.free, False),
+    ServiceManifestEntry('SpanishDict', 'service_spanishdict', constants.ServiceType.dictionary, constants.ServiceFee.free, False),
+    ServiceManifestEntry('VocalWare', 'service_vocalware', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Watson', 'service_watson', constants.ServiceType.tts, constants.ServiceFee.paid, True),
+    ServiceManifestEntry('Windows', 'service_windows', constants.ServiceType.tts, constants.ServiceFee.free, False),
+    ServiceManifestEntry('Youdao', 'service_youdao', constants.ServiceType.dictionary, constants.ServiceFee.free, False),
+]
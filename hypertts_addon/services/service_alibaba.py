@@ -18,8 +18,6 @@ class Alibaba(service.ServiceBase):
     CONFIG_ACCESS_KEY_ID = 'access_key_id'
     CONFIG_ACCESS_KEY_SECRET = 'access_key_secret'
     CONFIG_APP_KEY = 'app_key'
- 
-    access_token = None
 
     def cloudlanguagetools_enabled(self):
         return True
@@ -40,7 +38,7 @@ class Alibaba(service.ServiceBase):
         }
     
     # this process is described by https://www.alibabacloud.com/help/en/isi/getting-started/use-http-or-https-to-obtain-an-access-token?spm=a2c63.p38356.0.i1#topic-2572194
-    def refresh_token(self):
+    def fetch_access_token(self):
         logger.info(f"refreshing token")
         params = {
             "AccessKeyId": self.get_configuration_value_mandatory(self.CONFIG_ACCESS_KEY_ID),
@@ -84,18 +82,19 @@ class Alibaba(service.ServiceBase):
         # API definition says any error will return non-200 RC
         if r.status_code != 200:
             logger.warning(f"Request to http://nlsmeta.ap-southeast-1.aliyuncs.com/?{params_str} failed:\n {r.text}")
-            return
+            raise errors.AccessTokenError(self.name, f'status code: {r.status_code}')
         
         j = r.json()
-        self.access_token = j["Token"]
-        logger.info(f"Got access token: {self.access_token}")
+        access_token = j["Token"]
+        logger.info(f"Got access token: {access_token}")
+        # ExpireTime is a unix timestamp
+        return access_token, access_token["ExpireTime"] - int(time.time())
 
     def voice_list(self):
         return self.basic_voice_list()
 
     def get_tts_audio(self, source_text, voice: voice.VoiceBase, voice_options):
-        if not self.access_token or self.access_token["ExpireTime"] <= int(time.time()):
-            self.refresh_token()
+        access_token = self.get_access_token()
 
         app_key = self.get_configuration_value_mandatory(self.CONFIG_APP_KEY)
         speed = int(voice_options.get('speed', voice.options['speed']['default']))
@@ -108,7 +107,7 @@ class Alibaba(service.ServiceBase):
             "speech_rate": speed,
             "pitch_rate": pitch,
             "text": source_text,
-            "token": self.access_token["Id"],
+            "token": access_token["Id"],
             "voice": voice_name
         }
 
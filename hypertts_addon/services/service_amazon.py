@@ -2,8 +2,7 @@ import sys
 import requests
 import datetime
 import time
-import boto3
-import botocore
+import botocore.exceptions
 import contextlib
 
 
@@ -20,6 +19,8 @@ class Amazon(service.ServiceBase):
     CONFIG_SECRET_ACCESS_KEY = 'aws_secret_access_key'
     CONFIG_REGION = 'aws_region'
     CONFIG_THROTTLE_SECONDS = 'throttle_seconds'
+    # polly accepts up to 3000 billed characters per request
+    MAX_TEXT_LENGTH = 3000
 
     def __init__(self):
         service.ServiceBase.__init__(self)
@@ -70,11 +71,19 @@ class Amazon(service.ServiceBase):
 
     def configure(self, config):
         self._config = config
-        self.polly_client = boto3.client("polly",
+        # the polly client gets built by get_client(), in the background after startup
+        self.get_configuration_value_mandatory(self.CONFIG_ACCESS_KEY_ID)
+        self.get_configuration_value_mandatory(self.CONFIG_SECRET_ACCESS_KEY)
+
+    def build_client(self):
+        # importing boto3 alone takes several hundred milliseconds
+        import boto3
+        import botocore.config
+        return boto3.client("polly",
             aws_access_key_id=self.get_configuration_value_mandatory(self.CONFIG_ACCESS_KEY_ID),
             aws_secret_access_key=self.get_configuration_value_mandatory(self.CONFIG_SECRET_ACCESS_KEY),
             region_name=self.get_configuration_value_optional(self.CONFIG_REGION, 'us-east-1'),
-            config=botocore.config.Config(connect_timeout=constants.RequestTimeout, read_timeout=constants.RequestTimeout))        
+            config=botocore.config.Config(connect_timeout=constants.RequestTimeout, read_timeout=constants.RequestTimeout))
 
 
     def voice_list(self):
@@ -113,13 +122,14 @@ class Amazon(service.ServiceBase):
     </prosody>
 </speak>"""
 
+        polly_client = self.get_client()
         try:
             if voice.voice_key['engine'] in ['generative', 'long-form']:
                 logger.info(f'voice: {voice}, generating text format: {source_text}')
-                response = self.polly_client.synthesize_speech(Text=source_text, TextType="text", OutputFormat=audio_format_map[audio_format], VoiceId=voice.voice_key['voice_id'], Engine=voice.voice_key['engine'])            
+                response = polly_client.synthesize_speech(Text=source_text, TextType="text", OutputFormat=audio_format_map[audio_format], VoiceId=voice.voice_key['voice_id'], Engine=voice.voice_key['engine'])            
             else:
                 logger.info(f'voice: {voice}, generating ssml format: {ssml_str}')
-                response = self.polly_client.synthesize_speech(Text=ssml_str, TextType="ssml", OutputFormat=audio_format_map[audio_format], VoiceId=voice.voice_key['voice_id'], Engine=voice.voice_key['engine'])
+                response = polly_client.synthesize_speech(Text=ssml_str, TextType="ssml", OutputFormat=audio_format_map[audio_format], VoiceId=voice.voice_key['voice_id'], Engine=voice.voice_key['engine'])
         except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
             raise errors.RequestError(source_text, voice, str(error))
 
@@ -1,6 +1,5 @@
 import sys
 import requests
-import datetime
 import time
 
 from hypertts_addon import voice
@@ -16,9 +15,11 @@ class Azure(service.ServiceBase):
     CONFIG_API_KEY = 'api_key'
     CONFIG_THROTTLE_SECONDS = 'throttle_seconds'
 
+    # issued tokens are valid for 10 minutes
+    ACCESS_TOKEN_LIFETIME_SECONDS = 600
+
     def __init__(self):
         service.ServiceBase.__init__(self)
-        self.access_token = None
 
     def cloudlanguagetools_enabled(self):
         return True
@@ -74,7 +75,9 @@ class Azure(service.ServiceBase):
             self.CONFIG_THROTTLE_SECONDS: float
         }
 
-    def get_token(self, subscription_key, region):
+    def fetch_access_token(self):
+        region = self.get_configuration_value_mandatory(self.CONFIG_REGION)
+        subscription_key = self.get_configuration_value_mandatory(self.CONFIG_API_KEY)
         if len(subscription_key) == 0:
             raise ValueError("subscription key required")
 
@@ -83,19 +86,24 @@ class Azure(service.ServiceBase):
             'Ocp-Apim-Subscription-Key': subscription_key
         }
         response = requests.post(fetch_token_url, headers=headers, timeout=constants.RequestTimeout)
-        self.access_token = str(response.text)
-        self.access_token_timestamp = datetime.datetime.now()
         logger.debug(f'requested access_token')
+        return str(response.text), self.ACCESS_TOKEN_LIFETIME_SECONDS
+
+    # the access token is held by the shared token manager
+    def _get_access_token_value(self):
+        return self.token_manager.token
+
+    def _set_access_token_value(self, access_token):
+        if access_token == None:
+            self.token_manager.invalidate()
+        else:
+            self.token_manager.set_token(access_token, self.ACCESS_TOKEN_LIFETIME_SECONDS)
+
+    access_token = property(fget=_get_access_token_value, fset=_set_access_token_value)
 
     def token_refresh_required(self):
-        if self.access_token == None:
-            logger.debug(f'no token, must request')
-            return True
-        time_diff = datetime.datetime.now() - self.access_token_timestamp
-        if time_diff.total_seconds() > 300:
-            logger.debug(f'time_diff: {time_diff}, requesting token')
-            return True
-        return False
+        with self.token_manager.lock:
+            return self.token_manager.token == None or time.monotonic() >= self.token_manager.expire_time
 
     def voice_list(self):
         return self.basic_voice_list()
@@ -103,14 +111,12 @@ class Azure(service.ServiceBase):
     def get_tts_audio(self, source_text, voice: voice.VoiceBase, voice_options):
 
         region = self.get_configuration_value_mandatory(self.CONFIG_REGION)
-        subscription_key = self.get_configuration_value_mandatory(self.CONFIG_API_KEY)
         throttle_seconds = self.get_configuration_value_optional(self.CONFIG_THROTTLE_SECONDS, 0)
 
         if throttle_seconds > 0:
             time.sleep(throttle_seconds)
         
-        if self.token_refresh_required():
-            self.get_token(subscription_key, region)
+        access_token = self.get_access_token()
 
         voice_name = voice.voice_key['name']
 
@@ -155,7 +161,7 @@ class Azure(service.ServiceBase):
         url_path = 'cognitiveservices/v1'
         constructed_url = base_url + url_path
         headers = {
-            'Authorization': 'Bearer ' + self.access_token,
+            'Authorization': 'Bearer ' + access_token,
             'Content-Type': 'application/ssml+xml',
             'X-Microsoft-OutputFormat': audio_format_map[audio_format],
             'User-Agent': 'anki-hyper-tts'
@@ -172,6 +178,8 @@ class Azure(service.ServiceBase):
             error_message = f'status code {response.status_code}: {response.reason}, response content: {response.text}'
             logger.warning(error_message)
             if response.status_code == 401:
+                # the token may have been revoked, request a new one next time
+                self.token_manager.invalidate()
                 raise errors.ServicePermissionError(source_text, voice, error_message)
             raise errors.RequestError(source_text, voice, error_message)
 
@@ -50,28 +50,36 @@ class Cambridge(service.ServiceBase):
         }
 
         complete_url = self.SEARCH_URL + source_text
-        logger.info(f'loading url: {complete_url}')
-        response = requests.get(complete_url, headers=headers, timeout=constants.RequestTimeout)
 
-        soup = bs4.BeautifulSoup(response.content, 'html.parser')
+        def lookup_sound_url():
+            logger.info(f'loading url: {complete_url}')
+            response = requests.get(complete_url, headers=headers, timeout=constants.RequestTimeout)
+            if response.status_code not in [200, 404]:
+                raise errors.RequestError(source_text, voice, f'status code {response.status_code} loading {complete_url}')
 
-        section_class_map = {
-            languages.AudioLanguage.en_GB: 'uk dpron-i',
-            languages.AudioLanguage.en_US: 'us dpron-i',
-        }
-        wanted_class = section_class_map[voice.audio_languages[0]]
-        logger.debug(f'wanted_class: [{wanted_class}]')
-        
-        # <span class="uk dpron-i ">
-        # Some pages have multiple pronunciation spans, and the first one may not
-        # contain an audio source tag, so iterate through all matches.
-        for span_pronunciation_section in soup.find_all('span', {'class': wanted_class}):
-            logger.debug(f'span_pronunciation_section: {span_pronunciation_section}')
-            source_tag = span_pronunciation_section.find('source', {'type': 'audio/mpeg'})
-            if source_tag != None:
-                sound_url = self.WEBSITE + source_tag['src']
-                response = requests.get(sound_url, headers=headers, timeout=constants.RequestTimeout)
-                return response.content
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
+
+            section_class_map = {
+                languages.AudioLanguage.en_GB: 'uk dpron-i',
+                languages.AudioLanguage.en_US: 'us dpron-i',
+            }
+            wanted_class = section_class_map[voice.audio_languages[0]]
+            logger.debug(f'wanted_class: [{wanted_class}]')
+            
+            # <span class="uk dpron-i ">
+            # Some pages have multiple pronunciation spans, and the first one may not
+            # contain an audio source tag, so iterate through all matches.
+            for span_pronunciation_section in soup.find_all('span', {'class': wanted_class}):
+                logger.debug(f'span_pronunciation_section: {span_pronunciation_section}')
+                source_tag = span_pronunciation_section.find('source', {'type': 'audio/mpeg'})
+                if source_tag != None:
+                    return self.WEBSITE + source_tag['src']
+            return None
+
+        sound_url = self.lookup_audio_url(f'{voice.voice_key}:{source_text}', lookup_sound_url)
+        if sound_url != None:
+            response = requests.get(sound_url, headers=headers, timeout=constants.RequestTimeout)
+            return response.content
 
         # if we couldn't locate the source tag, raise notfound
         raise errors.AudioNotFoundError(source_text, voice)
\ No newline at end of file
@@ -12,10 +12,11 @@ logger = logging_utils.get_child_logger(__name__)
 class CereProc(service.ServiceBase):
     CONFIG_USERNAME = 'username'
     CONFIG_PASSWORD = 'password'
+    # the auth response doesn't say how long the token lasts, stay on the conservative side
+    ACCESS_TOKEN_LIFETIME_SECONDS = 300
 
     def __init__(self):
         service.ServiceBase.__init__(self)
-        self.access_token = None
 
     def cloudlanguagetools_enabled(self):
         return True
@@ -34,7 +35,7 @@ class CereProc(service.ServiceBase):
             self.CONFIG_PASSWORD: str
         }
 
-    def get_access_token(self):
+    def fetch_access_token(self):
         username = self.get_configuration_value_mandatory(self.CONFIG_USERNAME)
         password = self.get_configuration_value_mandatory(self.CONFIG_PASSWORD)
         combined = f'{username}:{password}'
@@ -46,7 +47,7 @@ class CereProc(service.ServiceBase):
             timeout=constants.RequestTimeout)
 
         access_token = response.json()['access_token']        
-        return access_token
+        return access_token, self.ACCESS_TOKEN_LIFETIME_SECONDS
     
     def get_auth_headers(self):
         headers={'Authorization': f'Bearer {self.get_access_token()}'}
@@ -69,6 +70,10 @@ class CereProc(service.ServiceBase):
         if response.status_code == 200:
             return response.content
 
+        if response.status_code == 401:
+            # the token may have been revoked, request a new one next time
+            self.token_manager.invalidate()
+
         # otherwise, an error occured
         error_message = f"status code: {response.status_code} reason: {response.reason}"
         raise errors.RequestError(source_text, voice, error_message)
\ No newline at end of file
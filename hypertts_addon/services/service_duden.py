@@ -63,15 +63,23 @@ class Duden(service.ServiceBase):
         # URL encode the text after replacements
         encoded_text = urllib.parse.quote(url_text)
         full_url = self.SEARCH_URL + encoded_text
-        logger.info(f'Requesting Duden URL: {full_url} (original text: {source_text})')
-        response = requests.get(full_url, headers=headers, timeout=constants.RequestTimeout)
 
-        soup = bs4.BeautifulSoup(response.content, 'html.parser')
+        def lookup_sound_url():
+            logger.info(f'Requesting Duden URL: {full_url} (original text: {source_text})')
+            response = requests.get(full_url, headers=headers, timeout=constants.RequestTimeout)
+            if response.status_code not in [200, 404]:
+                raise errors.RequestError(source_text, voice, f'status code {response.status_code} loading {full_url}')
 
-        pronunciation_button = soup.find('button', {'class': 'pronunciation-guide__sound'})
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
 
-        if pronunciation_button is not None:
-            sound_url = pronunciation_button['data-href']
+            pronunciation_button = soup.find('button', {'class': 'pronunciation-guide__sound'})
+            if pronunciation_button is not None:
+                return pronunciation_button['data-href']
+            return None
+
+        sound_url = self.lookup_audio_url(source_text, lookup_sound_url)
+
+        if sound_url is not None:
             logger.info(f'downloading url {sound_url}')
             response = requests.get(sound_url, headers=headers, timeout=constants.RequestTimeout)
             return response.content
@@ -57,14 +57,22 @@ class DigitalesWorterbuchDeutschenSprache(service.ServiceBase):
         }
 
         full_url = self.SEARCH_URL + source_text
-        response = requests.get(full_url, headers=headers, timeout=constants.RequestTimeout)
 
-        soup = bs4.BeautifulSoup(response.content, 'html.parser')
+        def lookup_sound_url():
+            response = requests.get(full_url, headers=headers, timeout=constants.RequestTimeout)
+            if response.status_code not in [200, 404]:
+                raise errors.RequestError(source_text, voice, f'status code {response.status_code} loading {full_url}')
 
-        source_tag = soup.find('source', {'type': 'audio/mpeg'})
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
 
-        if source_tag != None:
-            sound_url = source_tag['src']
+            source_tag = soup.find('source', {'type': 'audio/mpeg'})
+            if source_tag != None:
+                return source_tag['src']
+            return None
+
+        sound_url = self.lookup_audio_url(source_text, lookup_sound_url)
+
+        if sound_url != None:
             logger.info(f'downloading url {sound_url}')
             response = requests.get(sound_url, headers=headers, timeout=constants.RequestTimeout)
             return response.content
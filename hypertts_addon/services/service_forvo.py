@@ -24,6 +24,9 @@ class Forvo(service.ServiceBase):
 
     COUNTRY_ANY = 'ANY'
 
+    # the audio urls returned by the API don't stay valid for long
+    LOOKUP_FOUND_TTL_SECONDS = 3600
+
     def __init__(self):
         service.ServiceBase.__init__(self)
         self.access_token = None
@@ -90,8 +93,11 @@ class Forvo(service.ServiceBase):
         else:
             url = f'{api_url}/key/{api_key}/format/json/action/word-pronunciations/word/{encoded_text}/language/{language}{sex_param}{username_param}/order/rate-desc/limit/1{country_code}'
 
-        response = requests.get(url, headers=headers, timeout=constants.RequestTimeout)
-        if response.status_code == 200:
+        def lookup_audio_url():
+            response = requests.get(url, headers=headers, timeout=constants.RequestTimeout)
+            if response.status_code != 200:
+                error_message = f'status_code: {response.status_code} response: {response.content}'
+                raise errors.RequestError(source_text, voice, error_message)
             try:
                 data = response.json()
             except json.JSONDecodeError:
@@ -102,14 +108,18 @@ class Forvo(service.ServiceBase):
             else:
                 items = data['items']
             if len(items) == 0:
-                raise errors.AudioNotFoundError(source_text, voice)
-            audio_url = items[0]['pathmp3']
-            audio_request = requests.get(audio_url, headers=headers, timeout=constants.RequestTimeout)
-            content_type = audio_request.headers.get('Content-Type', '')
-            if content_type != 'audio/mpeg':
-                logger.error(f'Forvo: unexpected content type from audio request: {content_type}, url: {audio_url}')
-                raise errors.RequestError(source_text, voice, f'Unexpected content type from Forvo: {content_type}')
-            return audio_request.content
-
-        error_message = f'status_code: {response.status_code} response: {response.content}'
-        raise errors.RequestError(source_text, voice, error_message)
+                return None
+            return items[0]['pathmp3']
+
+        lookup_key = f'{language}{sex_param}{country_code}:{source_text}'
+        audio_url = self.lookup_audio_url(lookup_key, lookup_audio_url)
+        if audio_url == None:
+            raise errors.AudioNotFoundError(source_text, voice)
+        audio_request = requests.get(audio_url, headers=headers, timeout=constants.RequestTimeout)
+        content_type = audio_request.headers.get('Content-Type', '')
+        if content_type != 'audio/mpeg':
+            logger.error(f'Forvo: unexpected content type from audio request: {content_type}, url: {audio_url}')
+            # the audio url may have expired, look it up again next time
+            self.forget_audio_url(lookup_key)
+            raise errors.RequestError(source_text, voice, f'Unexpected content type from Forvo: {content_type}')
+        return audio_request.content
@@ -18,7 +18,6 @@ class FptAi(service.ServiceBase):
 
     def __init__(self):
         service.ServiceBase.__init__(self)
-        self.access_token = None
 
     def cloudlanguagetools_enabled(self):
         return True
@@ -34,6 +34,8 @@ GENDER_MAP = {
 
 class GoogleTranslate(service.ServiceBase):
     CONFIG_THROTTLE_SECONDS = 'throttle_seconds'
+    # gtts would otherwise split longer texts itself and request the parts one after the other
+    MAX_TEXT_LENGTH = 100
 
     def __init__(self):
         service.ServiceBase.__init__(self)
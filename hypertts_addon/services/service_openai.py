@@ -12,6 +12,7 @@ logger = logging_utils.get_child_logger(__name__)
 
 class OpenAI(service.ServiceBase):
     CONFIG_API_KEY = 'api_key'
+    MAX_TEXT_LENGTH = 4096
 
     def __init__(self):
         service.ServiceBase.__init__(self)
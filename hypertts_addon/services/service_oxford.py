@@ -47,27 +47,34 @@ class Oxford(service.ServiceBase):
 		    'User-Agent':'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:97.0) Gecko/20100101 Firefox/97.0'
         }
         url = self.URL_BASE + source_text.lower()
-        logger.debug(f'loading url: {url}')
-        response = requests.get(url, headers=headers, timeout=constants.RequestTimeout)
-        logger.debug(f'response.status_code: {response.status_code}')
-        
-        soup = bs4.BeautifulSoup(response.content, 'html.parser')
 
-        section_class_map = {
-            languages.AudioLanguage.en_GB: 'pron-uk',
-            languages.AudioLanguage.en_US: 'pron-us',
-        }
-        wanted_class = section_class_map[voice.audio_languages[0]]
-        logger.debug(f'wanted_class: [{wanted_class}]')
+        def lookup_sound_url():
+            logger.debug(f'loading url: {url}')
+            response = requests.get(url, headers=headers, timeout=constants.RequestTimeout)
+            logger.debug(f'response.status_code: {response.status_code}')
+            if response.status_code not in [200, 404]:
+                raise errors.RequestError(source_text, voice, f'status code {response.status_code} loading {url}')
+            
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
+
+            section_class_map = {
+                languages.AudioLanguage.en_GB: 'pron-uk',
+                languages.AudioLanguage.en_US: 'pron-us',
+            }
+            wanted_class = section_class_map[voice.audio_languages[0]]
+            logger.debug(f'wanted_class: [{wanted_class}]')
+
+            # <span class="uk dpron-i ">
+            div_pronunciation = soup.find('div', {'class': f'sound audio_play_button {wanted_class} icon-audio'})
+            # logger.debug(f'span_pronunciation_section: {span_pronunciation_section}')
+            if div_pronunciation != None:
+                return div_pronunciation.get('data-src-mp3', None)
+            return None
 
-        # <span class="uk dpron-i ">
-        div_pronunciation = soup.find('div', {'class': f'sound audio_play_button {wanted_class} icon-audio'})
-        # logger.debug(f'span_pronunciation_section: {span_pronunciation_section}')
-        if div_pronunciation != None:
-            sound_url = div_pronunciation['data-src-mp3']
-            if sound_url != None:
-                response = requests.get(sound_url, headers=headers, timeout=constants.RequestTimeout)
-                return response.content
+        sound_url = self.lookup_audio_url(f'{voice.voice_key}:{source_text.lower()}', lookup_sound_url)
+        if sound_url != None:
+            response = requests.get(sound_url, headers=headers, timeout=constants.RequestTimeout)
+            return response.content
 
         # if we couldn't locate the source tag, raise notfound
         raise errors.AudioNotFoundError(source_text, voice)
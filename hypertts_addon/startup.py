@@ -0,0 +1,36 @@
+import os
+
+from . import constants
+from . import servicemanager
+from . import lookup_cache
+from . import hypertts
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+def services_dir():
+    current_script_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(current_script_dir, constants.DIR_SERVICES)
+
+def init_hypertts(ankiutils, tracer) -> hypertts.HyperTTS:
+    """initialization sequence run when Anki loads the addon, each step gets recorded by the tracer.
+    also used by the startup tests, with mock anki utils."""
+
+    with tracer.phase('service discovery'):
+        service_manager = servicemanager.ServiceManager(services_dir(), f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}', False)
+        service_manager.init_services()
+    with tracer.phase('lookup cache'):
+        service_manager.set_lookup_cache(lookup_cache.LookupCache(
+            os.path.join(ankiutils.get_user_files_dir(), constants.LOOKUP_CACHE_FILENAME)))
+    with tracer.phase('hypertts and config migration'):
+        hyper_tts = hypertts.HyperTTS(ankiutils, service_manager)
+    with tracer.phase('configure services'):
+        # configure services based on config
+        with hyper_tts.error_manager.get_single_action_context('Configuring Services'):
+            service_manager.configure(hyper_tts.get_configuration())
+        hyper_tts.schedule_sentry_email_update()
+    return hyper_tts
+
+def finish_trace(ankiutils, tracer):
+    tracer.finish(os.path.join(ankiutils.get_user_files_dir(), constants.STARTUP_REPORT_FILENAME),
+        constants.STARTUP_WARNING_SECONDS)
@@ -0,0 +1,92 @@
+import sys
+import json
+import time
+import contextlib
+
+from . import logging_utils
+logger = logging_utils.get_child_logger(__name__)
+
+
+class StartupPhase():
+    def __init__(self, name, start_seconds, duration_seconds, imported_modules):
+        self.name = name
+        # relative to the start of the trace
+        self.start_seconds = start_seconds
+        self.duration_seconds = duration_seconds
+        # modules which got imported during this phase, in import order
+        self.imported_modules = imported_modules
+
+    def serialize(self):
+        return {
+            'name': self.name,
+            'start_seconds': round(self.start_seconds, 4),
+            'duration_seconds': round(self.duration_seconds, 4),
+            'imported_module_count': len(self.imported_modules),
+            'imported_modules': self.imported_modules
+        }
+
+
+class StartupTracer():
+    """records the wall time of each phase of the addon initialization, along with the modules imported
+    during that phase. the timeline gets written to a json report in user_files, and a warning is logged
+    when startup takes longer than expected."""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.phases = []
+        # (name, start time, modules imported before it started)
+        self.current_phase = None
+
+    def start_phase(self, name):
+        self.current_phase = (name, time.perf_counter(), set(sys.modules.keys()))
+
+    def end_phase(self):
+        name, phase_start_time, modules_before = self.current_phase
+        self.current_phase = None
+        phase_end_time = time.perf_counter()
+        imported_modules = [module_name for module_name in sys.modules.keys() if module_name not in modules_before]
+        self.phases.append(StartupPhase(name, phase_start_time - self.start_time,
+            phase_end_time - phase_start_time, imported_modules))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.start_phase(name)
+        try:
+            yield
+        finally:
+            self.end_phase()
+
+    def get_total_seconds(self):
+        if len(self.phases) == 0:
+            return 0
+        last_phase = self.phases[-1]
+        return last_phase.start_seconds + last_phase.duration_seconds
+
+    def get_phase(self, name) -> StartupPhase:
+        for phase in self.phases:
+            if phase.name == name:
+                return phase
+        raise KeyError(name)
+
+    def get_summary(self):
+        phases_str = ', '.join([f'{phase.name}: {phase.duration_seconds * 1000:.0f}ms' for phase in self.phases])
+        return f'startup took {self.get_total_seconds() * 1000:.0f}ms ({phases_str})'
+
+    def serialize(self):
+        return {
+            'total_seconds': round(self.get_total_seconds(), 4),
+            'phases': [phase.serialize() for phase in self.phases]
+        }
+
+    def finish(self, report_path, warning_seconds=None):
+        # warning_seconds: log a warning when startup took longer, None to disable
+        summary = self.get_summary()
+        if warning_seconds != None and self.get_total_seconds() > warning_seconds:
+            logger.warning(f'slow startup, {summary}')
+        else:
+            logger.info(summary)
+        try:
+            with open(report_path, 'w', encoding='utf-8') as report_file:
+                json.dump(self.serialize(), report_file, indent=2)
+        except OSError as e:
+            logger.warning(f'could not write startup report {report_path}: {e}')
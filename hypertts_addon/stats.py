@@ -3,6 +3,9 @@ import os
 import requests
 import json
 import functools
+import threading
+import collections
+import datetime
 import anki
 import pprint
 
@@ -12,9 +15,70 @@ from . import logging_utils
 from . import version
 logger = logging_utils.get_child_logger(__name__)
 
+class EventQueue:
+    """events waiting to be sent. a single background thread sends them in batches, and goes away
+    when there is nothing left to send. the queue is bounded, the oldest events get dropped first."""
+
+    def __init__(self, send_batch_fn, flush_interval_seconds, batch_size, max_size):
+        self.send_batch_fn = send_batch_fn
+        self.flush_interval_seconds = flush_interval_seconds
+        self.batch_size = batch_size
+        self.condition = threading.Condition()
+        self.events = collections.deque(maxlen=max_size)
+        self.dropped_event_count = 0
+        self.thread = None
+
+    def add(self, event):
+        with self.condition:
+            if len(self.events) == self.events.maxlen:
+                self.dropped_event_count += 1
+            self.events.append(event)
+            if self.thread == None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            if len(self.events) >= self.batch_size:
+                self.condition.notify()
+
+    def pending_event_count(self):
+        with self.condition:
+            return len(self.events)
+
+    def take_batch(self):
+        # must be called with self.condition held
+        batch = [self.events.popleft() for i in range(min(self.batch_size, len(self.events)))]
+        if self.dropped_event_count > 0:
+            logger.warning(f'dropped {self.dropped_event_count} events')
+            self.dropped_event_count = 0
+        return batch
+
+    def run(self):
+        while True:
+            with self.condition:
+                if len(self.events) < self.batch_size:
+                    self.condition.wait(self.flush_interval_seconds)
+                if len(self.events) == 0:
+                    # the next event will start a new thread
+                    self.thread = None
+                    return
+                batch = self.take_batch()
+            self.send_batch_fn(batch)
+
+    def flush(self):
+        # send everything right away, on the calling thread. called when the profile closes, so it gives up
+        # after the first batch which couldn't be sent (offline), rather than waiting for the timeout of each batch
+        while True:
+            with self.condition:
+                if len(self.events) == 0:
+                    return
+                batch = self.take_batch()
+            if self.send_batch_fn(batch) == False:
+                logger.warning(f'could not flush events, {self.pending_event_count()} events not sent')
+                return
+
 class StatsGlobal:
     BASE_URL = "https://st.vocab.ai"
     CAPTURE_URL = f"{BASE_URL}/capture/"
+    BATCH_URL = f"{BASE_URL}/batch/"
 
     def __init__(self, anki_utils, user_uuid, user_properties, first_install, hypertts_pro: bool):
         self.anki_utils = anki_utils
@@ -27,6 +91,10 @@ class StatsGlobal:
         self.hypertts_pro = hypertts_pro
         self.init_done = False
         self.session = requests.Session()
+        self.event_queue = EventQueue(self.send_event_batch,
+            constants_events.EVENT_QUEUE_FLUSH_INTERVAL_SECONDS,
+            constants_events.EVENT_QUEUE_BATCH_SIZE,
+            constants_events.EVENT_QUEUE_MAX_SIZE)
 
     def publish(self, 
                 context: constants_events.EventContext, 
@@ -34,13 +102,8 @@ class StatsGlobal:
                 event_mode: constants_events.EventMode,
                 event_properties: dict):
         logger.debug('publish')
-        def get_publish_lambda(context: constants_events.EventContext, event: constants_events.Event,
-                               event_mode: constants_events.EventMode,
-                               event_properties: dict):
-            def publish():
-                self.publish_event(context, event, event_mode, event_properties)
-            return publish
-        self.anki_utils.run_in_background(get_publish_lambda(context, event, event_mode, event_properties), None)
+        # only queues the event, it gets sent in the background
+        self.publish_event(context, event, event_mode, event_properties)
 
     def construct_event_name(self, context: constants_events.EventContext, event: constants_events.Event):
         return f'{constants_events.PREFIX}:{constants_events.ADDON}:{context.name}:{event.name}'
@@ -51,7 +114,6 @@ class StatsGlobal:
                 event_mode: constants_events.EventMode,
                 event_properties: dict):
         logger.debug('publishing event')
-        # in background thread
         if event_mode:
             event_properties['mode'] = event_mode.name
         
@@ -78,26 +140,36 @@ class StatsGlobal:
     def publish_posthog_event(self, event_name: str, event_properties: dict):
         """
         Publish a standard PostHog event (e.g., $feature_flag_called).
-        This method sends events directly without the custom prefix.
+        This method queues events directly without the custom prefix.
         """
+        logger.debug(f'queueing posthog event: {event_name}, properties: {pprint.pformat(event_properties)}')
+        self.event_queue.add({
+            "event": event_name,
+            "distinct_id": self.user_uuid,
+            "properties": event_properties,
+            # events may be sent a little later, keep the time at which they happened
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        })
+
+    def send_event_batch(self, events: list) -> bool:
+        # in the event queue background thread, or on the main thread when flushing
         headers = {
             "Content-Type": "application/json"
         }
         payload = {
             "api_key": self.api_key,
-            "event": event_name,
-            "distinct_id": self.user_uuid,
-            "properties": event_properties,
+            "batch": events,
         }
         try:
-            logger.debug(f'sending posthog event: {event_name}, properties: {pprint.pformat(event_properties)}')
-            response = self.session.post(self.CAPTURE_URL,
+            response = self.session.post(self.BATCH_URL,
                     headers=headers,
                     data=json.dumps(payload),
                     timeout=constants.RequestTimeoutShort)
-            logger.debug(f'sent posthog event: {event_name}, status: {response.status_code}')
+            logger.debug(f'sent {len(events)} posthog events, status: {response.status_code}')
+            return True
         except Exception as e:
-            logger.warning(f'could not send posthog event: {event_name}: {e}')
+            logger.warning(f'could not send {len(events)} posthog events: {e}')
+            return False
 
     def load_feature_flags(self):
         """
@@ -231,6 +303,11 @@ def event_global(event: constants_events.Event):
     if hasattr(sys, '_hypertts_stats_global'):
         sys._hypertts_stats_global.publish(constants_events.EventContext.addon, event, None, {})
 
+def flush_events():
+    # the event queue thread is a daemon, events still queued when Anki exits would be lost
+    if hasattr(sys, '_hypertts_stats_global'):
+        sys._hypertts_stats_global.event_queue.flush()
+
 def send_event(context: constants_events.EventContext, event: constants_events.Event, event_mode: constants_events.EventMode,
                event_properties: dict):
     if hasattr(sys, '_hypertts_stats_global'):
@@ -238,7 +315,7 @@ def send_event(context: constants_events.EventContext, event: constants_events.E
 
 def send_event_bg(context: constants_events.EventContext, event: constants_events.Event, event_mode: constants_events.EventMode,
                event_properties: dict):
-    # we are already in the background thread
+    # same as send_event, events are queued and sent by the event queue thread either way
     if hasattr(sys, '_hypertts_stats_global'):
         sys._hypertts_stats_global.publish_event(context, event, event_mode, event_properties)
 
@@ -0,0 +1,8 @@
+from hypertts_addon import constants
+from hypertts_addon.service import ServiceManifestEntry
+
+SERVICES = [
+    ServiceManifestEntry('ServiceA', 'service_a', constants.ServiceType.tts, constants.ServiceFee.free, False, test_service=True),
+    ServiceManifestEntry('ServiceB', 'service_b', constants.ServiceType.tts, constants.ServiceFee.paid, True, test_service=True),
+    ServiceManifestEntry('ServiceC', 'service_c', constants.ServiceType.tts, constants.ServiceFee.paid, True, test_service=True),
+]
@@ -97,6 +97,95 @@ def process_text(source_text, text_processing_model):
         processed_text = process_text_rules(text, text_processing_model)
     return processed_text
 
+# bulk text processing
+# ====================
+# same result as process_text on each text, but each stage runs over the whole list, with the patterns
+# compiled once. a stage is skipped entirely when none of the texts contains what it looks for.
+
+REGEXP_SOUND_TAG = re.compile(r'\[sound:[^\]]+\]')
+REGEXP_CLOZE = re.compile(r'\{\{c\d+::([^:}]+)(?:::[^}]+)?\}\}')
+REGEXP_HTML_TAG = re.compile('<.*?>')
+REGEXP_BRACKETS = [
+    ('(', re.compile(r'\([^\)]*\)')),
+    ('[', re.compile(r'\[[^\]]*\]')),
+    ('{', re.compile(r'\{[^\}]*\}')),
+    ('<', re.compile(r'\<[^\>]*\>')),
+]
+
+def any_text_contains(texts, substring):
+    return any(substring in text for text in texts)
+
+def bulk_regex_sub(texts, marker, regex, replacement):
+    # only the texts containing the marker can match
+    if not any_text_contains(texts, marker):
+        return texts
+    return [regex.sub(replacement, text) if marker in text else text for text in texts]
+
+def bulk_process_text_rules(texts, text_processing_model):
+    texts = [text.strip() for text in bulk_regex_sub(texts, '[sound:', REGEXP_SOUND_TAG, '')]
+    if text_processing_model.strip_cloze:
+        texts = bulk_regex_sub(texts, '{{c', REGEXP_CLOZE, r'\1')
+    if text_processing_model.html_to_text_line:
+        texts = bulk_regex_sub(texts, '<', REGEXP_HTML_TAG, '')
+        if any_text_contains(texts, '&'):
+            texts = [html.unescape(text) for text in texts]
+    if text_processing_model.strip_brackets:
+        for marker, regex in REGEXP_BRACKETS:
+            texts = bulk_regex_sub(texts, marker, regex, '')
+    if text_processing_model.ssml_convert_characters:
+        for pattern, replace in SSML_CONVERSION_MAP.items():
+            if any_text_contains(texts, pattern):
+                texts = [text.replace(pattern, replace) for text in texts]
+    return texts
+
+def get_bulk_replace_fn(rule, text_processing_model):
+    # the rule's replacement with the pattern compiled. invalid rules go through process_text_replacement_rule,
+    # which raises the same error as when processing a single text
+    if rule.source != None and rule.target != None:
+        if rule.rule_type == constants.TextReplacementRuleType.Regex:
+            flags = re.IGNORECASE if text_processing_model.ignore_case else 0
+            try:
+                regex = re.compile(rule.source, flags)
+            except re.error:
+                pass
+            else:
+                return lambda text: regex.sub(rule.target, text)
+        elif rule.rule_type == constants.TextReplacementRuleType.Simple:
+            return lambda text: text.replace(rule.source, rule.target)
+    return lambda text: process_text_replacement_rule(text, rule, text_processing_model)
+
+def bulk_process_text_replacement(texts, text_errors, text_processing_model):
+    for rule in text_processing_model.text_replacement_rules:
+        if rule.rule_type == constants.TextReplacementRuleType.Simple and rule.source != None and rule.target != None \
+            and not any_text_contains(texts, rule.source):
+            continue
+        replace_fn = get_bulk_replace_fn(rule, text_processing_model)
+        for i, text in enumerate(texts):
+            if i in text_errors:
+                continue
+            try:
+                texts[i] = replace_fn(text)
+            except errors.TextReplacementError as e:
+                text_errors[i] = e
+            except Exception as e:
+                text_errors[i] = errors.TextReplacementError(text, rule.source, rule.target, str(e))
+    return texts
+
+def process_text_bulk(source_texts, text_processing_model):
+    """processes a list of texts, for batch previews and planning. returns the processed texts, and a dict
+    index -> TextReplacementError for the texts on which a replacement rule failed (their processed text is None)"""
+    texts = list(source_texts)
+    text_errors = {}
+    if text_processing_model.run_replace_rules_after:
+        texts = bulk_process_text_rules(texts, text_processing_model)
+        texts = bulk_process_text_replacement(texts, text_errors, text_processing_model)
+    else:
+        texts = bulk_process_text_replacement(texts, text_errors, text_processing_model)
+        texts = bulk_process_text_rules(texts, text_processing_model)
+    for i in text_errors:
+        texts[i] = None
+    return texts, text_errors
+
 def process_text_replacement_rule(input_text, rule, text_processing_model):
     try:
         if rule.source == None:
@@ -121,6 +210,60 @@ def check_length(text):
     if text is None or len(text.strip()) == 0:
         raise errors.SourceTextEmpty()
 
+# end of sentence, including CJK punctuation which isn't followed by a space
+REGEXP_SENTENCE_END = re.compile(r'(?<=[.!?;…])\s+|(?<=[。！？；])\s*')
+REGEXP_CLAUSE_END = re.compile(r'(?<=[,:、，：])\s*|\s+')
+# SSML and other markup, such as <break time="1s"/>, must not be cut
+REGEXP_MARKUP = re.compile(r'<[^<>]*>')
+
+def split_text_chunks(text, max_length):
+    # split text into chunks of at most max_length characters, preferably at sentence
+    # boundaries, then at commas or spaces, and as a last resort in the middle of a word.
+    # chunks are slices of the original text, the separators between sentences are kept as they
+    # are (CJK and Thai text doesn't get extra spaces), and markup tags are never split.
+    text = text.strip()
+    if len(text) <= max_length:
+        return [text]
+    markup_spans = [match.span() for match in REGEXP_MARKUP.finditer(text)]
+    def inside_markup(offset):
+        return any([markup_start < offset < markup_end for markup_start, markup_end in markup_spans])
+    # (end of the chunk, start of the next one)
+    sentence_cuts = [match.span() for match in REGEXP_SENTENCE_END.finditer(text) if not inside_markup(match.start())]
+    clause_cuts = [match.span() for match in REGEXP_CLAUSE_END.finditer(text) if not inside_markup(match.start())]
+
+    chunks = []
+    chunk_start = 0
+    while len(text) - chunk_start > max_length:
+        limit = chunk_start + max_length
+        cut = find_last_cut(sentence_cuts, chunk_start, limit)
+        if cut == None:
+            cut = find_last_cut(clause_cuts, chunk_start, limit)
+        if cut == None:
+            cut = (limit, limit)
+            for markup_start, markup_end in markup_spans:
+                if markup_start < limit < markup_end:
+                    # cut before the tag, or after it when the tag alone is longer than the limit
+                    cut_offset = markup_start if markup_start > chunk_start else markup_end
+                    cut = (cut_offset, cut_offset)
+        chunk = text[chunk_start:cut[0]].strip()
+        if len(chunk) > 0:
+            chunks.append(chunk)
+        chunk_start = cut[1]
+    chunk = text[chunk_start:].strip()
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+def find_last_cut(cuts, chunk_start, limit):
+    # the cut giving the longest chunk which stays within the limit
+    result = None
+    for cut in cuts:
+        if cut[0] > limit:
+            break
+        if cut[0] > chunk_start:
+            result = cut
+    return result
+
 def strip_sound_tag(field_value):
     field_value = re.sub(r'\[sound:[^\]]+\]', '', field_value)
     return field_value.strip()
\ No newline at end of file
@@ -2,7 +2,6 @@ import sys
 import abc
 import dataclasses
 import databind.json
-import functools
 from typing import Dict, Any, List, Union
 
 from . import constants
@@ -100,6 +99,8 @@ class Voice(VoiceBase):
 # voice identification only
 @dataclasses.dataclass
 class TtsVoiceId_v3:
+    __slots__ = ('voice_key', 'service')
+
     voice_key: Union[Dict[str, Any], str]
     service: str
 
@@ -117,9 +118,38 @@ class TtsVoiceId_v3:
             return hash((frozenset(self.voice_key.items()), self.service))
 
 
+# the voices of a service mostly share the same options schema and the same languages. catalogs
+# contain thousands of voices (ElevenLabsCustom: voices x models), so each distinct schema / language
+# list is kept only once and shared. they must not be modified once a voice has been built.
+INTERNED_OPTIONS = {}
+INTERNED_AUDIO_LANGUAGES = {}
+
+def freeze_value(value):
+    # hashable representation of an options schema, types are kept so that 1 and 1.0 don't get merged
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((key, freeze_value(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(freeze_value(item) for item in value))
+    return (type(value), value)
+
+def intern_options(options):
+    try:
+        key = freeze_value(options)
+        hash(key)
+    except TypeError:
+        # not a plain schema, don't share it
+        return options
+    return INTERNED_OPTIONS.setdefault(key, options)
+
+def intern_audio_languages(audio_languages):
+    return INTERNED_AUDIO_LANGUAGES.setdefault(tuple(audio_languages), audio_languages)
+
 # full voice information (to display in the GUI)
 @dataclasses.dataclass
 class TtsVoice_v3:
+    __slots__ = ('name', 'voice_key', 'options', 'service', 'gender', 'audio_languages', 'service_fee',
+        '_voice_id', '_language_list')
+
     name: str
     voice_key: Dict[str, Any]
     options: Dict[str, Dict[str, Any]]
@@ -128,20 +158,28 @@ class TtsVoice_v3:
     audio_languages: List[languages.AudioLanguage]
     service_fee: constants.ServiceFee
 
+    def __post_init__(self):
+        self.options = intern_options(self.options)
+        self.audio_languages = intern_audio_languages(self.audio_languages)
+        self._voice_id = TtsVoiceId_v3(voice_key=self.voice_key, service=self.service)
+        self._language_list = None
+
     @property
     def voice_id(self) -> TtsVoiceId_v3:
-        return self.get_voice_id()
+        return self._voice_id
 
     def get_voice_id(self) -> TtsVoiceId_v3:
-        return TtsVoiceId_v3(voice_key=self.voice_key, service=self.service)
+        return self._voice_id
 
     # languages that this voide provides
     def get_languages(self) -> List[languages.Language]:
         return list(set(audio_language.lang for audio_language in self.audio_languages))
 
-    @functools.cached_property
+    @property
     def language_list(self) -> List[languages.Language]:
-        return self.get_languages()
+        if self._language_list == None:
+            self._language_list = self.get_languages()
+        return self._language_list
     
 
     def __str__(self):
@@ -201,3 +239,50 @@ def get_audio_language_for_voice(voice: TtsVoice_v3) -> languages.AudioLanguage:
         return voice.audio_languages[0]
     # otherwise, we are dealing with a multilingual voice. default to en_US for now
     return languages.AudioLanguage.en_US
+
+class VoiceIndex:
+    """faceted index over the full voice list, used by the voice selection screens to filter
+    thousands of voices without rescanning / resorting the list on every filter change"""
+
+    def __init__(self, voice_list: List[TtsVoice_v3]):
+        # compute the display string once per voice, and sort on it once
+        display_entries = sorted([(voice_str(voice), voice) for voice in voice_list], key=lambda entry: entry[0])
+        self.voices = [voice for display_name, voice in display_entries]
+        self.display_names = [display_name for display_name, voice in display_entries]
+        self.search_names = [display_name.lower() for display_name in self.display_names]
+
+        # each facet maps a value to the set of positions (within self.voices) of matching voices
+        self.audio_language_facet = {}
+        self.language_facet = {}
+        self.service_facet = {}
+        self.gender_facet = {}
+        for position, voice in enumerate(self.voices):
+            for audio_language in voice.audio_languages:
+                self.audio_language_facet.setdefault(audio_language, set()).add(position)
+                self.language_facet.setdefault(audio_language.lang, set()).add(position)
+            self.service_facet.setdefault(voice.service, set()).add(position)
+            self.gender_facet.setdefault(voice.gender, set()).add(position)
+
+    def filter(self, audio_language=None, language=None, service=None, gender=None, search_text=None) -> List[int]:
+        # returns the sorted positions of the voices matching all the supplied filters
+        facet_sets = []
+        for facet, value in [
+            (self.audio_language_facet, audio_language),
+            (self.language_facet, language),
+            (self.service_facet, service),
+            (self.gender_facet, gender)]:
+            if value is not None:
+                facet_sets.append(facet.get(value, set()))
+
+        if len(facet_sets) == 0:
+            positions = range(len(self.voices))
+        else:
+            # intersect starting from the most selective facet
+            facet_sets.sort(key=len)
+            positions = sorted(facet_sets[0].intersection(*facet_sets[1:]))
+
+        if search_text:
+            search_text = search_text.strip().lower()
+            positions = [position for position in positions if search_text in self.search_names[position]]
+
+        return list(positions)
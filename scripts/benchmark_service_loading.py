@@ -0,0 +1,71 @@
+"""measures the startup cost of the service manager, as seen when Anki opens a profile: creating
+the manager, init_services() and configure() with the services the user has enabled.
+
+    python scripts/benchmark_service_loading.py [--runs 5] [--services Azure,GoogleTranslate]
+
+each run happens in a fresh interpreter, so that module imports are counted. the "eager" mode
+loads every service after init_services(), which is what startup used to do before services got
+imported on first use.
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+def run_once(mode, service_names):
+    # same sys.path as the test suite, dependencies are bundled in external/
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'external'))
+    sys.path.insert(0, ROOT_DIR)
+    # don't run the anki initialization in hypertts_addon/__init__.py
+    sys._pytest_mode = True
+    modules_before = len(sys.modules)
+    start_time = time.perf_counter()
+    from hypertts_addon import constants
+    from hypertts_addon import config_models
+    from hypertts_addon import servicemanager
+    manager = servicemanager.ServiceManager(os.path.join(ROOT_DIR, constants.DIR_HYPERTTS_ADDON, constants.DIR_SERVICES),
+        f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}', False)
+    manager.init_services()
+    if mode == 'eager':
+        manager.get_all_services()
+    configuration = config_models.Configuration()
+    for service_name in service_names:
+        configuration.set_service_enabled(service_name, True)
+    manager.configure(configuration)
+    elapsed = time.perf_counter() - start_time
+    return {
+        'seconds': elapsed,
+        'services_loaded': len(manager.services),
+        'modules_imported': len(sys.modules) - modules_before
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark service manager startup')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--services', default='Azure,GoogleTranslate', help='comma separated list of enabled services')
+    parser.add_argument('--single-run', choices=['lazy', 'eager'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    service_names = [service_name for service_name in args.services.split(',') if service_name != '']
+
+    if args.single_run != None:
+        print(json.dumps(run_once(args.single_run, service_names)))
+        return
+
+    for mode in ['eager', 'lazy']:
+        results = []
+        for i in range(args.runs):
+            output = subprocess.run([sys.executable, os.path.realpath(__file__), '--single-run', mode, '--services', args.services],
+                check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        seconds = [result['seconds'] for result in results]
+        print(f'{mode:>5}: median {statistics.median(seconds) * 1000:.0f}ms, min {min(seconds) * 1000:.0f}ms, '
+              f'services loaded: {results[0]["services_loaded"]}, modules imported: {results[0]["modules_imported"]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""measures the memory held by the voice catalog: the voice lists of all the services are loaded
+(as when all services are enabled), and the python heap / resident size growth is reported.
+
+    python scripts/benchmark_voice_memory.py [--elevenlabs-models 10 --elevenlabs-voices 200]
+
+services which need a network connection or a local installation are skipped when their voice
+list can't be retrieved. ElevenLabsCustom gets simulated with the requested number of voices and
+models, since its voice list multiplies voices by models.
+"""
+
+import sys
+import os
+import gc
+import argparse
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+def get_resident_size():
+    # linux only, None elsewhere
+    try:
+        with open('/proc/self/statm') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def build_elevenlabs_custom_voices(voice_module, constants, languages, model_count, voice_count):
+    # same construction as ElevenLabsCustom.voice_list_cached, with a fresh options dict and language list per voice
+    result = []
+    audio_languages = [languages.AudioLanguage.en_US, languages.AudioLanguage.fr_FR, languages.AudioLanguage.de_DE,
+        languages.AudioLanguage.es_ES, languages.AudioLanguage.ja_JP]
+    for model_index in range(model_count):
+        for voice_index in range(voice_count):
+            result.append(voice_module.TtsVoice_v3(
+                name=f'voice {voice_index} (model {model_index})',
+                gender=constants.Gender.Female,
+                audio_languages=list(audio_languages),
+                service='ElevenLabsCustom',
+                voice_key={'voice_id': f'voice_{voice_index}', 'model_id': f'model_{model_index}'},
+                options={
+                    'stability': {'type': 'number', 'min': 0.0, 'max': 1.0, 'default': 0.75},
+                    'similarity_boost': {'type': 'number', 'min': 0.0, 'max': 1.0, 'default': 0.75},
+                    'format': {'type': 'list', 'values': ['mp3', 'ogg_opus'], 'default': 'mp3'}
+                },
+                service_fee=constants.ServiceFee.paid
+            ))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark voice catalog memory usage')
+    parser.add_argument('--elevenlabs-models', type=int, default=10)
+    parser.add_argument('--elevenlabs-voices', type=int, default=200)
+    args = parser.parse_args()
+
+    # same sys.path as the test suite, dependencies are bundled in external/
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'external'))
+    sys.path.insert(0, ROOT_DIR)
+    # don't run the anki initialization in hypertts_addon/__init__.py
+    sys._pytest_mode = True
+    from hypertts_addon import constants
+    from hypertts_addon import languages
+    from hypertts_addon import voice as voice_module
+    from hypertts_addon import servicemanager
+
+    manager = servicemanager.ServiceManager(os.path.join(ROOT_DIR, constants.DIR_HYPERTTS_ADDON, constants.DIR_SERVICES),
+        f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}', False)
+    manager.init_services()
+    service_names = [service.name for service in manager.get_all_services()]
+
+    gc.collect()
+    resident_size_before = get_resident_size()
+    tracemalloc.start()
+
+    voice_lists = []
+    for service_name in service_names:
+        if service_name == 'ElevenLabsCustom':
+            continue
+        try:
+            voice_lists.append(manager.get_service_voice_list(service_name))
+        except Exception as e:
+            print(f'skipping {service_name}: {e}')
+    voice_lists.append(build_elevenlabs_custom_voices(voice_module, constants, languages, args.elevenlabs_models, args.elevenlabs_voices))
+
+    gc.collect()
+    heap_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resident_size_after = get_resident_size()
+
+    voice_count = sum([len(voice_list) for voice_list in voice_lists])
+    print(f'voices: {voice_count}')
+    print(f'python heap: {heap_size / 1024 / 1024:.1f}MB ({heap_size / voice_count:.0f} bytes per voice)')
+    if resident_size_before != None:
+        print(f'resident size growth: {(resident_size_after - resident_size_before) / 1024 / 1024:.1f}MB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""adds audio to the notes of an Anki collection without the Anki GUI, for example on a server:
+
+    python scripts/hypertts_batch.py ~/collection.anki2 --config meta.json --preset "Chinese audio" \
+        --query "deck:Chinese" [--workers 4] [--changed-only] [--start-over]
+
+the config is the HyperTTS addon config (meta.json from the addon folder), with the presets and service
+settings. the anki and aqt packages need to be installed, the addon modules import aqt, but no window
+gets opened. set HYPER_TTS_DEBUG_LOGGING=enable for debug logging, the same as within Anki.
+"""
+
+import sys
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+if __name__ == '__main__':
+    # same sys.path as the test suite, dependencies are bundled in external/
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'external'))
+    sys.path.insert(0, ROOT_DIR)
+    # don't run the anki initialization in hypertts_addon/__init__.py
+    os.environ['HYPER_TTS_HEADLESS'] = 'enable'
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    # logging must be configured before the addon modules get imported
+    from hypertts_addon import logging_utils
+    if os.environ.get('HYPER_TTS_DEBUG_LOGGING', '') == 'enable':
+        logging_utils.configure_console_logging()
+    else:
+        logging_utils.configure_silent()
+
+    from hypertts_addon import headless
+    sys.exit(headless.main())
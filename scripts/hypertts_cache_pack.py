@@ -0,0 +1,34 @@
+"""shares pre-generated audio between machines. exports the cached audio of a preset's notes to a pack file,
+which collaborators import into their audio cache, so that they get cache hits instead of generating the
+same audio again:
+
+    python scripts/hypertts_cache_pack.py export ~/collection.anki2 chinese.zip --config meta.json \
+        --preset "Chinese audio" --query "deck:Chinese"
+    python scripts/hypertts_cache_pack.py import chinese.zip
+
+the anki and aqt packages need to be installed, see hypertts_batch.py. the collection must not be open in
+Anki while exporting. importing into the addon's user_files while Anki runs is fine.
+"""
+
+import sys
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+if __name__ == '__main__':
+    # same sys.path as the test suite, dependencies are bundled in external/
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'external'))
+    sys.path.insert(0, ROOT_DIR)
+    # don't run the anki initialization in hypertts_addon/__init__.py
+    os.environ['HYPER_TTS_HEADLESS'] = 'enable'
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    # logging must be configured before the addon modules get imported
+    from hypertts_addon import logging_utils
+    if os.environ.get('HYPER_TTS_DEBUG_LOGGING', '') == 'enable':
+        logging_utils.configure_console_logging()
+    else:
+        logging_utils.configure_silent()
+
+    from hypertts_addon import headless
+    sys.exit(headless.cache_pack_main())
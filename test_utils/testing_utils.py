@@ -111,7 +111,7 @@ class MockCollection():
         pass
 
     def update_note(self, note):
-        pass
+        note.mod += 1
 
 class MockTextInputTypingTimer():
     def __init__(self, text_input, text_input_changed_fn):
@@ -132,6 +132,7 @@ class MockAnkiUtils():
         self.updated_note_model = None        
         self.editor_set_field_value_calls = []
         self.added_media_file = None
+        self.media_files = set()
         self.show_loading_indicator_called = None
         self.hide_loading_indicator_called = None
         self.tooltip_messages = []
@@ -208,6 +209,9 @@ class MockAnkiUtils():
     def get_note_by_id(self, note_id):
         return self.notes_by_id[note_id]
 
+    def get_note_mod_times(self, note_id_list):
+        return {note_id: self.notes_by_id[note_id].mod for note_id in note_id_list if note_id in self.notes_by_id}
+
 
     def get_model(self, model_id):
         # should return a dict which has flds
@@ -230,8 +234,12 @@ class MockAnkiUtils():
 
     def media_add_file(self, filename):
         self.added_media_file = filename
+        self.media_files.add(os.path.basename(filename))
         return filename
 
+    def media_file_exists(self, filename):
+        return filename in self.media_files
+
     def undo_start(self):
         self.undo_started = True
 
@@ -544,6 +552,7 @@ class MockNote():
         self.model = model
         self.set_values = {}
         self.flush_called = False
+        self.mod = 0
     
     def __contains__(self, key):
         return key in self.field_dict
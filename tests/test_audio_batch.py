@@ -1,11 +1,16 @@
 import re
+import os
 import datetime
 
 from test_utils import testing_utils
 
 from hypertts_addon import constants
+from hypertts_addon import errors
 from hypertts_addon import config_models
 from hypertts_addon import batch_status
+from hypertts_addon import batch_estimate
+from hypertts_addon import context
+from hypertts_addon import servicemanager
 from hypertts_addon import logging_utils
 
 logger = logging_utils.get_test_child_logger(__name__)
@@ -851,3 +856,276 @@ def test_priority_voices_not_found(qtbot):
 
     # make sure we got a AudioNotFoundError in the batch error manager
     assert str(batch_status_obj[0].error) == 'Service request error for [老人家]: Audio not found in any voices (voice: None)'
+
+def test_batch_journal_resume(qtbot):
+    config_gen = testing_utils.TestConfigGenerator()
+    hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+    voice_a_1 = get_default_voice_id(hypertts_instance)
+    single = config_models.VoiceSelectionSingle()
+    single.set_voice(config_models.VoiceWithOptions(voice_a_1, {}))
+
+    batch = config_models.BatchConfig(hypertts_instance.anki_utils)
+    batch.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Chinese'))
+    batch.set_target(config_models.BatchTarget('Sound', False, True))
+    batch.set_voice_selection(single)
+    batch.set_text_processing(config_models.TextProcessing())
+
+    note_id_list = [config_gen.note_id_1, config_gen.note_id_2, config_gen.note_id_4]
+
+    # the second note fails, the batch gets stopped after the third one
+    service_a = hypertts_instance.service_manager.get_service('ServiceA')
+    original_get_tts_audio = service_a.get_tts_audio
+    requested_texts = []
+    def get_tts_audio(source_text, voice, options):
+        requested_texts.append(source_text)
+        if source_text == '你好':
+            raise errors.AudioNotFoundError(source_text, voice)
+        return original_get_tts_audio(source_text, voice, options)
+    service_a.get_tts_audio = get_tts_audio
+
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    original_batch_change = listener.batch_change
+    def batch_change(note_id, row, total_count, start_time, current_time):
+        original_batch_change(note_id, row, total_count, start_time, current_time)
+        if note_id == config_gen.note_id_4:
+            batch_status_obj.stop()
+    listener.batch_change = batch_change
+    hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection())
+    assert requested_texts == ['老人家', '你好', '赚钱']
+    assert batch_status_obj[1].status == constants.BatchNoteStatus.Error
+    journal_path = hypertts_instance.get_batch_journal_path(batch)
+    assert os.path.isfile(journal_path)
+
+    # the third note was edited since the interrupted run, its audio may be outdated
+    hypertts_instance.anki_utils.get_note_by_id(config_gen.note_id_4).mod += 1
+
+    # resuming only processes the note which failed and the edited one, done notes get skipped without being fetched
+    service_a.get_tts_audio = original_get_tts_audio
+    requested_note_ids = []
+    original_get_note_by_id = hypertts_instance.anki_utils.get_note_by_id
+    def get_note_by_id(note_id):
+        requested_note_ids.append(note_id)
+        return original_get_note_by_id(note_id)
+    hypertts_instance.anki_utils.get_note_by_id = get_note_by_id
+
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection())
+    assert requested_note_ids == [config_gen.note_id_2, config_gen.note_id_4]
+    for i in range(3):
+        assert batch_status_obj[i].status == constants.BatchNoteStatus.Done
+    # skipped rows still show what their audio was generated from
+    assert batch_status_obj[0].sound_file != None
+    assert batch_status_obj[0].source_text == '老人家'
+    assert batch_status_obj[0].processed_text == '老人家'
+
+    # the batch completed, so the journal is gone and the next run starts from scratch
+    assert not os.path.isfile(journal_path)
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection())
+    assert requested_note_ids == [config_gen.note_id_2, config_gen.note_id_4] + note_id_list
+
+def test_batch_journal_discard_progress(qtbot):
+    config_gen = testing_utils.TestConfigGenerator()
+    hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+    single = config_models.VoiceSelectionSingle()
+    single.set_voice(config_models.VoiceWithOptions(get_default_voice_id(hypertts_instance), {}))
+    batch = config_models.BatchConfig(hypertts_instance.anki_utils)
+    batch.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Chinese'))
+    batch.set_target(config_models.BatchTarget('Sound', False, True))
+    batch.set_voice_selection(single)
+    batch.set_text_processing(config_models.TextProcessing())
+
+    # the batch gets stopped after the first note
+    note_id_list = [config_gen.note_id_1, config_gen.note_id_2]
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    original_batch_change = listener.batch_change
+    def batch_change(note_id, row, total_count, start_time, current_time):
+        original_batch_change(note_id, row, total_count, start_time, current_time)
+        batch_status_obj.stop()
+    listener.batch_change = batch_change
+    hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection())
+    assert os.path.isfile(hypertts_instance.get_batch_journal_path(batch))
+
+    # starting over processes every note again
+    requested_note_ids = []
+    original_get_note_by_id = hypertts_instance.anki_utils.get_note_by_id
+    def get_note_by_id(note_id):
+        requested_note_ids.append(note_id)
+        return original_get_note_by_id(note_id)
+    hypertts_instance.anki_utils.get_note_by_id = get_note_by_id
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection(),
+        discard_progress=True)
+    assert requested_note_ids == note_id_list
+    assert not os.path.isfile(hypertts_instance.get_batch_journal_path(batch))
+
+def test_batch_event_counts_evicted(qtbot):
+    config_gen = testing_utils.TestConfigGenerator()
+    hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+    single = config_models.VoiceSelectionSingle()
+    single.set_voice(config_models.VoiceWithOptions(get_default_voice_id(hypertts_instance), {}))
+    batch = config_models.BatchConfig(hypertts_instance.anki_utils)
+    batch.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Chinese'))
+    batch.set_target(config_models.BatchTarget('Sound', False, True))
+    batch.set_voice_selection(single)
+    batch.set_text_processing(config_models.TextProcessing())
+
+    # the per-batch event counter goes away once the batch is done
+    servicemanager.COUNT_BY_BATCH_UUID.clear()
+    note_id_list = [config_gen.note_id_1, config_gen.note_id_2]
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection())
+    assert batch_status_obj[1].status == constants.BatchNoteStatus.Done
+    assert len(servicemanager.COUNT_BY_BATCH_UUID) == 0
+
+def test_batch_estimate(qtbot):
+    config_gen = testing_utils.TestConfigGenerator()
+    hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+    voice_a_1 = get_default_voice_id(hypertts_instance)
+    single = config_models.VoiceSelectionSingle()
+    single.set_voice(config_models.VoiceWithOptions(voice_a_1, {}))
+    source = config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Chinese')
+    text_processing = config_models.TextProcessing()
+
+    # audio for the first note was generated already
+    hypertts_instance.generate_audio_write_file('老人家', voice_a_1, {},
+        context.AudioRequestContext(constants.AudioRequestReason.batch))
+
+    # the last note has the same text as the second one, only one request is needed for both
+    note_id_list = [config_gen.note_id_1, config_gen.note_id_2, config_gen.note_id_4, config_gen.note_id_2]
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+    estimate = batch_estimate.BatchEstimate(hypertts_instance, single)
+    hypertts_instance.service_manager.request_durations['ServiceA'] = 2.0
+    hypertts_instance.populate_batch_status_processed_text(note_id_list, source, text_processing, batch_status_obj, estimate)
+
+    assert estimate.note_count == 4
+    assert estimate.cache_hits == 2
+    assert estimate.get_request_count() == 2
+    assert estimate.characters_by_service == {'ServiceA': 4}
+    assert estimate.get_projected_duration_seconds() == 4.0
+    assert estimate.get_summary_text() == '<b>Estimate:</b> 4 notes, 2 already generated, 2 requests (ServiceA: 4 characters), about 4 seconds'
+
+    # random mode, requests are split between the voices according to their weight
+    voice_list = hypertts_instance.service_manager.full_voice_list()
+    voice_b = [x for x in voice_list if x.name == 'alex'][0].voice_id
+    random = config_models.VoiceSelectionRandom()
+    random.add_voice(config_models.VoiceWithOptionsRandom(voice_a_1, {}, random_weight=3))
+    random.add_voice(config_models.VoiceWithOptionsRandom(voice_b, {}, random_weight=1))
+    estimate = batch_estimate.BatchEstimate(hypertts_instance, random)
+    for text in ['老人家', '你好', '赚钱']:
+        estimate.add_text(text)
+    assert estimate.cache_hits == 0.75
+    assert estimate.requests_by_service == {'ServiceA': 1.5, 'ServiceB': 0.75}
+    # no history for ServiceB yet
+    assert estimate.get_projected_duration_seconds() == 1.5 * 2.0 + 0.75 * constants.BATCH_ESTIMATE_DEFAULT_REQUEST_SECONDS
+
+    # an empty file left behind by a failed write isn't in the cache, for the estimate as for the generation
+    full_filename = hypertts_instance.get_audio_request_full_filename('你好', voice_a_1, {})
+    open(full_filename, 'wb').close()
+    estimate = batch_estimate.BatchEstimate(hypertts_instance, single)
+    estimate.add_text('你好')
+    assert estimate.cache_hits == 0
+    assert not hypertts_instance.is_cached_audio_file(full_filename)
+
+def test_batch_changed_notes_only(qtbot):
+    config_gen = testing_utils.TestConfigGenerator()
+    hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+    single = config_models.VoiceSelectionSingle()
+    single.set_voice(config_models.VoiceWithOptions(get_default_voice_id(hypertts_instance), {}))
+    batch = config_models.BatchConfig(hypertts_instance.anki_utils)
+    batch.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Chinese'))
+    batch.set_target(config_models.BatchTarget('Sound', False, True))
+    batch.set_voice_selection(single)
+    batch.set_text_processing(config_models.TextProcessing())
+
+    note_id_list = [config_gen.note_id_1, config_gen.note_id_2, config_gen.note_id_4]
+    notes_by_id = hypertts_instance.anki_utils.notes_by_id
+
+    requested_note_ids = []
+    original_get_note_by_id = hypertts_instance.anki_utils.get_note_by_id
+    def get_note_by_id(note_id):
+        requested_note_ids.append(note_id)
+        return original_get_note_by_id(note_id)
+    hypertts_instance.anki_utils.get_note_by_id = get_note_by_id
+
+    def run_batch(changed_notes_only):
+        listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+        batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+        hypertts_instance.process_batch_audio(note_id_list, batch, batch_status_obj, testing_utils.MockCollection(),
+            changed_notes_only=changed_notes_only)
+        return batch_status_obj
+
+    # first run processes everything
+    batch_status_obj = run_batch(True)
+    assert requested_note_ids == note_id_list
+    sound_file_1 = batch_status_obj[0].sound_file
+    # the mock notes don't return the values which were set
+    for note_id in note_id_list:
+        notes_by_id[note_id].field_dict['Sound'] = notes_by_id[note_id].set_values['Sound']
+
+    # nothing changed, no note gets loaded
+    requested_note_ids.clear()
+    batch_status_obj = run_batch(True)
+    assert requested_note_ids == []
+    assert batch_status_obj[0].status == constants.BatchNoteStatus.Unchanged
+    assert batch_status_obj[0].sound_file == sound_file_1
+
+    # a note edited in a field which doesn't affect the audio gets checked, but not regenerated
+    notes_by_id[config_gen.note_id_1].mod += 1
+    # a note with a different source text gets regenerated
+    notes_by_id[config_gen.note_id_2].field_dict['Chinese'] = '你好吗'
+    notes_by_id[config_gen.note_id_2].mod += 1
+    requested_note_ids.clear()
+    batch_status_obj = run_batch(True)
+    assert requested_note_ids == [config_gen.note_id_1, config_gen.note_id_2]
+    assert batch_status_obj[0].status == constants.BatchNoteStatus.Unchanged
+    assert batch_status_obj[1].status == constants.BatchNoteStatus.Done
+    assert batch_status_obj[1].processed_text == '你好吗'
+    assert batch_status_obj[2].status == constants.BatchNoteStatus.Unchanged
+
+    # the audio file of an unmodified note went missing from the media folder, it gets regenerated
+    hypertts_instance.anki_utils.media_files.remove(batch_status_obj[2].sound_file)
+    requested_note_ids.clear()
+    batch_status_obj = run_batch(True)
+    assert requested_note_ids == [config_gen.note_id_4]
+    assert batch_status_obj[2].status == constants.BatchNoteStatus.Done
+
+    # without the option, every note gets processed
+    requested_note_ids.clear()
+    run_batch(False)
+    assert requested_note_ids == note_id_list
+
+def test_batch_status_storage(qtbot):
+    config_gen = testing_utils.TestConfigGenerator()
+    hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+    note_id_list = [config_gen.note_id_1, config_gen.note_id_2]
+    listener = MockBatchStatusListener(hypertts_instance.anki_utils)
+    batch_status_obj = batch_status.BatchStatus(hypertts_instance.anki_utils, note_id_list, listener)
+
+    assert len(batch_status_obj) == 2
+    assert batch_status_obj[1].note_id == config_gen.note_id_2
+    assert batch_status_obj[1].status == None
+
+    # long texts only get a preview
+    long_text = 'long text ' * 100
+    batch_status_obj.set_processed_text(config_gen.note_id_1, long_text)
+    assert batch_status_obj[0].processed_text == long_text[:constants.BATCH_STATUS_TEXT_PREVIEW_LENGTH] + '...'
+    assert batch_status.is_truncated(batch_status_obj[0].processed_text)
+
+    # errors are kept as messages
+    batch_status_obj.report_known_error(config_gen.note_id_2, errors.SourceTextEmpty())
+    assert batch_status_obj.get_status(config_gen.note_id_2) == constants.BatchNoteStatus.Error
+    assert batch_status_obj[1].error == 'Source text is empty'
+    assert [note_status.status for note_status in batch_status_obj] == [None, constants.BatchNoteStatus.Error]
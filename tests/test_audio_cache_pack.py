@@ -0,0 +1,86 @@
+import os
+import json
+import zipfile
+import tempfile
+import unittest
+
+from test_utils import testing_utils
+
+from hypertts_addon import constants
+from hypertts_addon import errors
+from hypertts_addon import config_models
+from hypertts_addon import context
+from hypertts_addon import audio_cache_pack
+
+
+class AudioCachePackTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix='hypertts_testing_cache_pack_')
+        self.pack_path = os.path.join(self.temp_dir.name, 'pack.zip')
+        self.config_gen = testing_utils.TestConfigGenerator()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build_batch(self, hypertts_instance):
+        voice_a_1 = [x for x in hypertts_instance.service_manager.full_voice_list() if x.name == 'voice_a_1'][0]
+        single = config_models.VoiceSelectionSingle()
+        single.set_voice(config_models.VoiceWithOptions(voice_a_1.voice_id, {}))
+        batch = config_models.BatchConfig(hypertts_instance.anki_utils)
+        batch.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Chinese'))
+        batch.set_target(config_models.BatchTarget('Sound', False, True))
+        batch.set_voice_selection(single)
+        batch.set_text_processing(config_models.TextProcessing())
+        return batch
+
+    def generate_audio(self, hypertts_instance, batch, note_id_list):
+        audio_request_context = context.AudioRequestContext(constants.AudioRequestReason.batch)
+        for note_id in note_id_list:
+            note = hypertts_instance.anki_utils.get_note_by_id(note_id)
+            hypertts_instance.generate_note_audio(batch, note, audio_request_context, None)
+
+    def test_export_import(self):
+        note_id_list = [self.config_gen.note_id_1, self.config_gen.note_id_2, self.config_gen.note_id_4]
+
+        # the audio of two notes has been generated on the exporting side
+        hypertts_export = self.config_gen.build_hypertts_instance_test_servicemanager('default')
+        batch = self.build_batch(hypertts_export)
+        self.generate_audio(hypertts_export, batch, note_id_list[0:2])
+        entries = audio_cache_pack.collect_entries(hypertts_export, note_id_list, batch)
+        self.assertEqual([entry.source_text for entry in entries], ['老人家', '你好'])
+        audio_cache_pack.export_pack(hypertts_export, self.pack_path, entries)
+
+        hypertts_import = self.config_gen.build_hypertts_instance_test_servicemanager('default')
+        self.assertEqual(audio_cache_pack.import_pack(hypertts_import, self.pack_path), (2, 0))
+        # already in the cache
+        self.assertEqual(audio_cache_pack.import_pack(hypertts_import, self.pack_path), (0, 2))
+
+        # the imported audio gets used, only the third note's audio needs to be requested
+        service_a = hypertts_import.service_manager.get_service('ServiceA')
+        original_get_tts_audio = service_a.get_tts_audio
+        requested_texts = []
+        def get_tts_audio(source_text, voice, options):
+            requested_texts.append(source_text)
+            return original_get_tts_audio(source_text, voice, options)
+        service_a.get_tts_audio = get_tts_audio
+        self.generate_audio(hypertts_import, batch, note_id_list)
+        self.assertEqual(requested_texts, ['赚钱'])
+
+    def test_import_invalid(self):
+        hypertts_export = self.config_gen.build_hypertts_instance_test_servicemanager('default')
+        batch = self.build_batch(hypertts_export)
+        self.generate_audio(hypertts_export, batch, [self.config_gen.note_id_1])
+        entries = audio_cache_pack.collect_entries(hypertts_export, [self.config_gen.note_id_1], batch)
+
+        # an entry whose text doesn't match the file name is skipped
+        entries[0].source_text = 'other text'
+        audio_cache_pack.export_pack(hypertts_export, self.pack_path, entries)
+        hypertts_import = self.config_gen.build_hypertts_instance_test_servicemanager('default')
+        self.assertEqual(audio_cache_pack.import_pack(hypertts_import, self.pack_path), (0, 1))
+        self.assertEqual(os.listdir(hypertts_import.anki_utils.get_user_files_dir()), [])
+
+        with zipfile.ZipFile(self.pack_path, 'w') as pack:
+            pack.writestr(constants.AUDIO_CACHE_PACK_INDEX, json.dumps({'version': 100, 'entries': []}))
+        with self.assertRaises(errors.InvalidAudioCachePack):
+            audio_cache_pack.import_pack(hypertts_import, self.pack_path)
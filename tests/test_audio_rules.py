@@ -1,6 +1,7 @@
 import sys
 import os
 import unittest
+import time
 
 from test_utils import testing_utils
 from test_utils import gui_testing_utils
@@ -232,3 +233,64 @@ class AudioRulesTests(unittest.TestCase):
         assert audio_data['source_text'] == 'old people'        
         
 
+    def test_process_rules_concurrently(self):
+        # pytest --log-cli-level=DEBUG  test_audio_rules.py -k test_process_rules_concurrently
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance, deck_note_type, editor_context = gui_testing_utils.get_editor_context()
+
+        # each request to ServiceA takes 1s
+        hypertts_instance.service_manager.get_service('ServiceA').configure({'delay': 1, 'api_key': 'valid_key'})
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        voice_a_1 = [x for x in voice_list if x.name == 'voice_a_1'][0].voice_id
+
+        preset_mapping_rules = config_models.PresetMappingRules()
+        for preset_name, source_field, target_field in [
+                ('preset_1', 'Chinese', 'Sound'),
+                ('preset_2', 'English', 'Sound English'),
+                ('preset_3', 'Chinese', 'Pinyin')]:
+            voice_selection = config_models.VoiceSelectionSingle()
+            voice_selection.set_voice(config_models.VoiceWithOptions(voice_a_1, {}))
+            batch_config = config_models.BatchConfig(hypertts_instance.anki_utils)
+            batch_config.name = preset_name
+            batch_config.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field=source_field))
+            batch_config.set_target(config_models.BatchTarget(target_field, False, True))
+            batch_config.set_voice_selection(voice_selection)
+            batch_config.set_text_processing(config_models.TextProcessing())
+            hypertts_instance.save_preset(batch_config)
+            preset_mapping_rules.rules.append(config_models.MappingRule(preset_id=batch_config.uuid,
+                                           rule_type = constants.MappingRuleType.NoteType,
+                                           model_id = config_gen.model_id_chinese,
+                                           enabled = True,
+                                           automatic = False))
+
+        # this rule points to a preset which doesn't exist, it should fail without affecting the others
+        preset_mapping_rules.rules.insert(1, config_models.MappingRule(preset_id='missing_preset',
+                                           rule_type = constants.MappingRuleType.NoteType,
+                                           model_id = config_gen.model_id_chinese,
+                                           enabled = True,
+                                           automatic = False))
+
+        start_time = time.time()
+        apply_all_tasks_fn = hypertts_instance.get_apply_all_rules_task(deck_note_type, editor_context, preset_mapping_rules)
+        apply_all_tasks_fn()
+        elapsed = time.time() - start_time
+        # three requests of 1s each, run concurrently
+        self.assertLess(elapsed, 2.5)
+
+        # per-rule status, in rule order
+        status = hypertts_instance.anki_utils.preset_rules_status
+        self.assertEqual([x.success for x in status.rule_action_context_list], [True, False, True, True])
+        self.assertEqual(status.rule_action_context_list[2].preset.name, 'preset_2')
+
+        # all the fields got updated
+        note_1 = editor_context.note
+        for target_field, expected_text in [('Sound', '老人家'), ('Sound English', 'old people'), ('Pinyin', '老人家')]:
+            sound_tag = note_1.set_values[target_field]
+            audio_full_path = hypertts_instance.anki_utils.extract_sound_tag_audio_full_path(sound_tag)
+            audio_data = hypertts_instance.anki_utils.extract_mock_tts_audio(audio_full_path)
+            assert audio_data['source_text'] == expected_text
+
+        # sounds are played in rule order
+        played_text = [x['source_text'] for x in hypertts_instance.anki_utils.all_played_sounds]
+        self.assertEqual(played_text, ['老人家', 'old people', '老人家'])
@@ -0,0 +1,33 @@
+import unittest
+
+from hypertts_addon import options
+from hypertts_addon import audio_utils
+
+
+def build_mp3_frame(payload):
+    # MPEG 1 layer III, 128kbps, 44100Hz, stereo: 417 bytes per frame
+    frame = b'\xff\xfb\x90\x00' + payload
+    return frame + b'\x00' * (417 - len(frame))
+
+def build_mp3_file(audio_byte):
+    id3v2 = b'ID3\x04\x00\x00\x00\x00\x00\x05' + b'title'
+    info_frame = build_mp3_frame(b'\x00' * 32 + b'Info' + b'\x00\x00\x00\x0f')
+    audio_frames = build_mp3_frame(audio_byte * 413) * 2
+    id3v1 = b'TAG' + b'\x00' * 125
+    return id3v2 + info_frame + audio_frames + id3v1, audio_frames
+
+
+class AudioUtilsTests(unittest.TestCase):
+
+    def test_join_mp3_chunks(self):
+        chunk_1, audio_frames_1 = build_mp3_file(b'\x01')
+        chunk_2, audio_frames_2 = build_mp3_file(b'\x02')
+        # only the audio frames remain, the tags and info frames only describe their own chunk
+        self.assertEqual(audio_utils.join_audio_chunks([chunk_1, chunk_2], options.AudioFormat.mp3), audio_frames_1 + audio_frames_2)
+        # data without headers is left alone
+        self.assertEqual(audio_utils.strip_mp3_headers(audio_frames_1), audio_frames_1)
+        self.assertEqual(audio_utils.strip_mp3_headers(b'not audio'), b'not audio')
+
+    def test_join_ogg_chunks(self):
+        # chained ogg streams
+        self.assertEqual(audio_utils.join_audio_chunks([b'OggS1', b'OggS2'], options.AudioFormat.ogg_opus), b'OggS1OggS2')
@@ -789,6 +789,46 @@ def test_voice_selection_filters(qtbot):
 
     # dialog.exec()
 
+def test_voice_selection_search(qtbot):
+    # pytest tests/test_components_1.py -k test_voice_selection_search -s -rPP
+    hypertts_instance = gui_testing_utils.get_hypertts_instance()
+
+    dialog = gui_testing_utils.EmptyDialog()
+    dialog.setupUi()
+
+    model_change_callback = gui_testing_utils.MockModelChangeCallback()
+    voiceselection = component_voiceselection.VoiceSelection(hypertts_instance, dialog, model_change_callback.model_updated)
+    dialog.addChildWidget(voiceselection.draw())
+
+    # type a partial voice name
+    voiceselection.voice_search_lineedit.setText('voice_a')
+    assert len(voiceselection.filtered_voice_list) < len(voiceselection.voice_list)
+    assert len(voiceselection.filtered_voice_list) == voiceselection.voices_combobox.count()
+    for index, voice in enumerate(voiceselection.filtered_voice_list):
+        assert 'voice_a' in voice.name
+        assert voiceselection.voices_combobox.itemText(index) == str(voice)
+    # first match gets selected
+    assert model_change_callback.model.voice.voice_id == voiceselection.filtered_voice_list[0].voice_id
+
+    # narrow down the search
+    voiceselection.voice_search_lineedit.setText('voice_a_2')
+    assert [voice.name for voice in voiceselection.filtered_voice_list] == ['voice_a_2']
+    assert voiceselection.voices_combobox.count() == 1
+    assert voiceselection.voices_combobox.itemText(0) == str(voiceselection.filtered_voice_list[0])
+
+    # combine with service filter
+    voiceselection.voice_search_lineedit.setText('voice_a')
+    voiceselection.services_combobox.setCurrentText('ServiceB')
+    assert len(voiceselection.filtered_voice_list) == 0
+    assert voiceselection.voices_combobox.count() == 0
+
+    # reset filters clears the search as well
+    voiceselection.reset_filters()
+    assert voiceselection.voice_search_lineedit.text() == ''
+    assert len(voiceselection.filtered_voice_list) == len(voiceselection.voice_list)
+    for index, voice in enumerate(voiceselection.filtered_voice_list):
+        assert voiceselection.voices_combobox.itemText(index) == str(voice)
+
 def test_voice_selection_samples(qtbot):
     hypertts_instance = gui_testing_utils.get_hypertts_instance()
 
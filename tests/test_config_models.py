@@ -1887,6 +1887,95 @@ class ConfigModelsTests(unittest.TestCase):
         assert applicable_rules[0] == (0, 0, rule_1)
         assert applicable_rules[1] == (2, 1, rule_2)
 
+    def test_iterate_applicable_rules_index(self):
+        mapping_rules = config_models.PresetMappingRules()
+
+        rule_1 = config_models.MappingRule(preset_id='preset_1', 
+            rule_type=constants.MappingRuleType.DeckNoteType, 
+            model_id=42,
+            deck_id=52,
+            enabled=True, 
+            automatic=True)
+        mapping_rules.rules.append(rule_1)
+
+        rule_2 = config_models.MappingRule(preset_id='preset_2', 
+            rule_type=constants.MappingRuleType.NoteType, 
+            model_id=42,
+            enabled=True, 
+            automatic=False)
+        mapping_rules.rules.append(rule_2)
+
+        rule_3 = config_models.MappingRule(preset_id='preset_3', 
+            rule_type=constants.MappingRuleType.DeckNoteType, 
+            model_id=1042,
+            deck_id=1053,
+            enabled=True, 
+            automatic=True)
+        mapping_rules.rules.append(rule_3)
+
+        rule_4 = config_models.MappingRule(preset_id='preset_4', 
+            rule_type=constants.MappingRuleType.DeckNoteType, 
+            model_id=42,
+            deck_id=52,
+            enabled=True, 
+            automatic=True,
+            is_default=True)
+        mapping_rules.rules.append(rule_4)
+
+        deck_note_type = config_models.DeckNoteType(model_id=42, deck_id=52)
+        expected_manual = list(mapping_rules.iterate_applicable_rules(deck_note_type, False))
+        expected_automated = list(mapping_rules.iterate_applicable_rules(deck_note_type, True))
+
+        mapping_rules.build_index()
+        self.assertIsNotNone(mapping_rules.get_index())
+
+        # indexed lookups yield the same rules, in the same order
+        applicable_rules = list(mapping_rules.iterate_applicable_rules(deck_note_type, False))
+        self.assertEqual(applicable_rules, expected_manual)
+        self.assertEqual(applicable_rules, [(0, 0, rule_1), (1, 1, rule_2), (3, 2, rule_4)])
+        self.assertEqual(list(mapping_rules.iterate_applicable_rules(deck_note_type, True)), expected_automated)
+
+        # NoteType rule applies to any deck
+        other_deck = config_models.DeckNoteType(model_id=42, deck_id=99)
+        self.assertEqual(list(mapping_rules.iterate_applicable_rules(other_deck, False)), [(1, 0, rule_2)])
+        # unknown note type
+        self.assertEqual(list(mapping_rules.iterate_applicable_rules(config_models.DeckNoteType(model_id=7, deck_id=52), False)), [])
+
+        # enabled flag is still evaluated on the indexed candidates
+        rule_1.enabled = False
+        self.assertEqual(list(mapping_rules.iterate_applicable_rules(deck_note_type, False)), [(1, 0, rule_2), (3, 1, rule_4)])
+
+        self.assertEqual(mapping_rules.get_default_preset_id(deck_note_type), 'preset_4')
+        self.assertEqual(mapping_rules.get_default_preset_id(other_deck), None)
+
+        # setting a default for a new deck/note type adds a rule, which invalidates the index
+        new_deck = config_models.DeckNoteType(model_id=42, deck_id=53)
+        mapping_rules.set_default_preset_id(new_deck, 'preset_6')
+        self.assertIsNone(mapping_rules.get_index())
+        self.assertEqual(mapping_rules.get_default_preset_id(new_deck), 'preset_6')
+        # updating an existing default keeps the index, it holds the rule objects
+        mapping_rules.build_index()
+        mapping_rules.set_default_preset_id(deck_note_type, 'preset_7')
+        self.assertIsNotNone(mapping_rules.get_index())
+        self.assertEqual(mapping_rules.get_default_preset_id(deck_note_type), 'preset_7')
+
+        # other changes to the rules require rebuilding the index, which happens when they are saved
+        rule_5 = config_models.MappingRule(preset_id='preset_5', 
+            rule_type=constants.MappingRuleType.NoteType, 
+            model_id=42,
+            enabled=True, 
+            automatic=True)
+        mapping_rules.rules.append(rule_5)
+        mapping_rules.build_index()
+        self.assertEqual(list(mapping_rules.iterate_applicable_rules(other_deck, False)), [(1, 0, rule_2), (5, 1, rule_5)])
+
+        # the index is not serialized, and a deserialized instance has none
+        serialized = config_models.serialize_preset_mapping_rules(mapping_rules)
+        self.assertNotIn('_index', serialized)
+        deserialized = config_models.deserialize_preset_mapping_rules(serialized)
+        self.assertIsNone(deserialized.get_index())
+        self.assertEqual(deserialized, mapping_rules)
+
 
     def test_iterate_related_rules(self):
         mapping_rules = config_models.PresetMappingRules()
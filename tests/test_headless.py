@@ -0,0 +1,84 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+
+import anki.collection
+
+from test_utils import testing_utils
+
+from hypertts_addon import constants
+from hypertts_addon import config_models
+from hypertts_addon import servicemanager
+from hypertts_addon import hypertts
+from hypertts_addon import headless
+
+
+class HeadlessTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix='hypertts_testing_headless_')
+        self.user_files_dir = os.path.join(self.temp_dir.name, 'user_files')
+        os.mkdir(self.user_files_dir)
+        self.col = anki.collection.Collection(os.path.join(self.temp_dir.name, 'collection.anki2'))
+
+    def tearDown(self):
+        self.col.close()
+        self.temp_dir.cleanup()
+
+    def add_note(self, front):
+        note = self.col.new_note(self.col.models.by_name('Basic'))
+        note['Front'] = front
+        self.col.add_note(note, self.col.decks.id_for_name('Default'))
+        return note.id
+
+    def build_hypertts(self):
+        anki_utils = headless.HeadlessAnkiUtils(self.col, {}, self.user_files_dir)
+        manager = servicemanager.ServiceManager(testing_utils.get_test_services_dir(), f'{constants.DIR_HYPERTTS_ADDON}.test_services', True,
+            testing_utils.MockCloudLanguageTools())
+        manager.init_services()
+        manager.get_service('ServiceA').enabled = True
+        return hypertts.HyperTTS(anki_utils, manager)
+
+    def build_batch(self, hyper_tts):
+        voice_a_1 = [x for x in hyper_tts.service_manager.full_voice_list() if x.name == 'voice_a_1'][0]
+        single = config_models.VoiceSelectionSingle()
+        single.set_voice(config_models.VoiceWithOptions(voice_a_1.voice_id, {}))
+        batch = config_models.BatchConfig(hyper_tts.anki_utils)
+        batch.set_source(config_models.BatchSource(mode=constants.BatchMode.simple, source_field='Front'))
+        batch.set_target(config_models.BatchTarget('Back', False, True))
+        batch.set_voice_selection(single)
+        batch.set_text_processing(config_models.TextProcessing())
+        return batch
+
+    def test_run_batch(self):
+        note_id_list = [self.add_note('old people'), self.add_note('hello'), self.add_note('to make money')]
+        hyper_tts = self.build_hypertts()
+        batch = self.build_batch(hyper_tts)
+
+        output = io.StringIO()
+        status = headless.run_batch(hyper_tts, note_id_list, batch, workers=4, stream=output)
+        self.assertEqual([note_status.status for note_status in status], [constants.BatchNoteStatus.Done] * 3)
+        self.assertIn('updating notes: 3/3 notes', output.getvalue())
+        for note_status in status:
+            note = self.col.get_note(note_status.note_id)
+            self.assertEqual(note['Back'], f'[sound:{note_status.sound_file}]')
+            self.assertTrue(os.path.isfile(os.path.join(self.col.media.dir(), note_status.sound_file)))
+
+        # only the edited note gets processed again
+        note = self.col.get_note(note_id_list[1])
+        note['Front'] = 'hello again'
+        self.col.update_note(note)
+        # the modification time has a one second resolution
+        self.col.db.execute('update notes set mod = mod + 1 where id = ?', note.id)
+        status = headless.run_batch(hyper_tts, note_id_list, batch, workers=4, changed_notes_only=True, stream=io.StringIO())
+        self.assertEqual([note_status.status for note_status in status],
+            [constants.BatchNoteStatus.Unchanged, constants.BatchNoteStatus.Done, constants.BatchNoteStatus.Unchanged])
+
+    def test_load_addon_config(self):
+        config = {constants.CONFIG_PRESETS: {'preset_1': {'name': 'Chinese'}}}
+        config_path = os.path.join(self.temp_dir.name, 'meta.json')
+        with open(config_path, 'w') as config_file:
+            json.dump({'config': config}, config_file)
+        self.assertEqual(headless.load_addon_config(config_path), config)
@@ -1,10 +1,12 @@
 import sys
 import os
 import unittest
+import unittest.mock
 import pytest
 import json
 import pprint
 import datetime
+import time
 
 from test_utils import testing_utils
 from test_utils import gui_testing_utils
@@ -12,6 +14,7 @@ from test_utils import gui_testing_utils
 from hypertts_addon import errors
 from hypertts_addon import config_models
 from hypertts_addon import constants
+from hypertts_addon import context
 from hypertts_addon import cloudlanguagetools
 
 class HyperTTSTests(unittest.TestCase):
@@ -93,6 +96,187 @@ yoyo
         priority = config_models.VoiceSelectionPriority()
         self.assertRaises(errors.NoVoicesAdded, hypertts_instance.get_audio_file, 'yoyo', priority, None)
 
+    def test_get_audio_file_priority_concurrent_probing(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        voice_1 = [x for x in voice_list if x.name == 'voice_a_1'][0].voice_id
+        voice_2 = [x for x in voice_list if x.name == 'voice_a_2'][0].voice_id
+        voice_3 = [x for x in voice_list if x.name == 'voice_a_3'][0].voice_id
+
+        found_voices = []
+        voice_names = []
+        def generate_audio_write_file(source_text, voice_id, options, context):
+            time.sleep(0.5)
+            if voice_id not in found_voices:
+                raise errors.AudioNotFoundError(source_text, voice_id)
+            voice_name = voice_names[found_voices.index(voice_id)]
+            return f'full_{voice_name}.mp3', f'{voice_name}.mp3'
+        hypertts_instance.generate_audio_write_file = generate_audio_write_file
+
+        priority = config_models.VoiceSelectionPriority()
+        priority.concurrent_probing = True
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_1, {}))
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_2, {}))
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_3, {}))
+
+        # only the last voice finds audio, all three requests run at the same time
+        found_voices.extend([voice_3])
+        voice_names.extend(['voice_a_3'])
+        start_time = time.time()
+        result = hypertts_instance.get_audio_file('old man', priority, None)
+        self.assertLess(time.time() - start_time, 1.0)
+        self.assertEqual(result, ('full_voice_a_3.mp3', 'voice_a_3.mp3'))
+
+        # several voices find audio, the highest priority one wins
+        found_voices.extend([voice_2])
+        voice_names.extend(['voice_a_2'])
+        result = hypertts_instance.get_audio_file('old man', priority, None)
+        self.assertEqual(result, ('full_voice_a_2.mp3', 'voice_a_2.mp3'))
+
+        # none of the voices find audio
+        found_voices.clear()
+        self.assertRaises(errors.AudioNotFoundAnyVoiceError, hypertts_instance.get_audio_file, 'old man', priority, None)
+
+        # setting only gets serialized when enabled, and round trips
+        self.assertEqual(priority.serialize()['concurrent_probing'], True)
+        deserialized = hypertts_instance.deserialize_voice_selection(priority.serialize())
+        self.assertTrue(deserialized.concurrent_probing)
+        priority.concurrent_probing = False
+        self.assertNotIn('concurrent_probing', priority.serialize())
+        deserialized = hypertts_instance.deserialize_voice_selection(priority.serialize())
+        self.assertFalse(deserialized.concurrent_probing)
+
+    def test_get_audio_file_priority_concurrent_probing_paid_voices(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        # ServiceA is free, ServiceB is paid
+        voice_free_1 = [x for x in voice_list if x.name == 'voice_a_1'][0].voice_id
+        voice_paid = [x for x in voice_list if x.name == 'alex'][0].voice_id
+        voice_free_2 = [x for x in voice_list if x.name == 'voice_a_2'][0].voice_id
+        self.assertTrue(hypertts_instance.voice_can_be_probed(voice_free_1))
+        self.assertFalse(hypertts_instance.voice_can_be_probed(voice_paid))
+
+        found_voices = []
+        requested_voices = []
+        def generate_audio_write_file(source_text, voice_id, options, context):
+            requested_voices.append(voice_id)
+            if voice_id not in found_voices:
+                raise errors.AudioNotFoundError(source_text, voice_id)
+            return f'full_{voice_id.service}.mp3', f'{voice_id.service}.mp3'
+        hypertts_instance.generate_audio_write_file = generate_audio_write_file
+
+        priority = config_models.VoiceSelectionPriority()
+        priority.concurrent_probing = True
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_free_1, {}))
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_paid, {}))
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_free_2, {}))
+
+        # the first free voice finds audio, the paid voice never gets requested
+        found_voices.extend([voice_free_1, voice_free_2])
+        result = hypertts_instance.get_audio_file('old man', priority, None)
+        self.assertEqual(result, ('full_ServiceA.mp3', 'ServiceA.mp3'))
+        self.assertNotIn(voice_paid, requested_voices)
+
+        # the paid voice comes before the second free voice in priority order
+        found_voices.clear()
+        found_voices.extend([voice_paid, voice_free_2])
+        requested_voices.clear()
+        result = hypertts_instance.get_audio_file('old man', priority, None)
+        self.assertEqual(result, ('full_ServiceB.mp3', 'ServiceB.mp3'))
+        self.assertEqual(requested_voices.count(voice_paid), 1)
+
+        # only the last free voice finds audio, the paid voice got requested once on the way
+        found_voices.clear()
+        found_voices.extend([voice_free_2])
+        requested_voices.clear()
+        result = hypertts_instance.get_audio_file('old man', priority, None)
+        self.assertEqual(result, ('full_ServiceA.mp3', 'ServiceA.mp3'))
+        self.assertEqual(requested_voices.count(voice_paid), 1)
+
+    def test_generate_audio_write_file_chunked(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        voice_a_1 = [x for x in voice_list if x.name == 'voice_a_1'][0]
+        service_a = hypertts_instance.service_manager.get_service('ServiceA')
+
+        requested_chunks = []
+        def get_tts_audio(source_text, voice, options, audio_request_context):
+            requested_chunks.append(source_text)
+            time.sleep(0.3)
+            return f'<{source_text}>'.encode('utf-8')
+        hypertts_instance.service_manager.get_tts_audio = get_tts_audio
+
+        source_text = 'The old man walked. He was tired. Was he hungry? Yes.'
+        audio_request_context = context.AudioRequestContext(constants.AudioRequestReason.batch)
+
+        # no limit on the service, a single request
+        full_filename, audio_filename = hypertts_instance.generate_audio_write_file(
+            source_text, voice_a_1.voice_id, {}, audio_request_context)
+        self.assertEqual(requested_chunks, [source_text])
+        os.remove(full_filename)
+
+        # the text is split into sentences, requested in parallel and joined in order
+        requested_chunks.clear()
+        with unittest.mock.patch.object(service_a, 'MAX_TEXT_LENGTH', 20):
+            start_time = time.time()
+            chunked_full_filename, chunked_audio_filename = hypertts_instance.generate_audio_write_file(
+                source_text, voice_a_1.voice_id, {}, audio_request_context)
+            self.assertLess(time.time() - start_time, 0.6)
+        self.assertEqual(sorted(requested_chunks), sorted(['The old man walked.', 'He was tired.', 'Was he hungry? Yes.']))
+        # cached under the hash of the original request
+        self.assertEqual(chunked_full_filename, full_filename)
+        with open(chunked_full_filename, 'rb') as f:
+            self.assertEqual(f.read(), b'<The old man walked.><He was tired.><Was he hungry? Yes.>')
+
+    def test_write_audio_file_error(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+        user_files_dir = hypertts_instance.anki_utils.get_user_files_dir()
+        full_filename = os.path.join(user_files_dir, 'hypertts-write-error.mp3')
+
+        # writing fails part way, neither the temporary file nor the audio file is left behind
+        with self.assertRaises(TypeError):
+            hypertts_instance.write_audio_file(full_filename, 'not bytes')
+        self.assertEqual([filename for filename in os.listdir(user_files_dir) if 'write-error' in filename], [])
+
+        hypertts_instance.write_audio_file(full_filename, b'audio')
+        with open(full_filename, 'rb') as f:
+            self.assertEqual(f.read(), b'audio')
+        os.remove(full_filename)
+
+    def test_get_audio_file_priority_service_unavailable(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        voice_1 = [x for x in voice_list if x.name == 'alex'][0].voice_id
+        voice_2 = [x for x in voice_list if x.name == 'voice_a_1'][0].voice_id
+        priority = config_models.VoiceSelectionPriority()
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_1, {}))
+        priority.add_voice(config_models.VoiceWithOptionsPriority(voice_2, {}))
+        single = config_models.VoiceSelectionSingle()
+        single.set_voice(config_models.VoiceWithOptions(voice_1, {}))
+
+        audio_request_context = context.AudioRequestContext(constants.AudioRequestReason.batch)
+        service_b = hypertts_instance.service_manager.get_service('ServiceB')
+        with unittest.mock.patch.object(service_b, 'get_tts_audio',
+                side_effect=errors.ServiceGatewayError('old man', None, 'bad gateway')):
+            for i in range(constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD):
+                self.assertRaises(errors.ServiceGatewayError, hypertts_instance.get_audio_file, 'old man', single, audio_request_context)
+
+            # the first service is down, priority mode falls back to the next voice
+            full_filename, audio_filename = hypertts_instance.get_audio_file('old man', priority, audio_request_context)
+            audio_data = hypertts_instance.anki_utils.extract_mock_tts_audio(full_filename)
+            self.assertEqual(audio_data['voice']['name'], 'voice_a_1')
+
+            self.assertRaises(errors.ServiceUnavailableError, hypertts_instance.get_audio_file, 'old man', single, audio_request_context)
+
     def test_process_hypertts_tag(self):
         config_gen = testing_utils.TestConfigGenerator()
         hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
@@ -108,6 +292,92 @@ yoyo
         self.assertRaises(errors.TTSTagProcessingError, hypertts_instance.extract_hypertts_preset, extra_args_array)
 
 
+    def test_get_audio_filename_tts_tag_cache(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        voice_a_1 = [x for x in voice_list if x.name == 'voice_a_1'][0]
+        voice_selection = config_models.VoiceSelectionSingle()
+        voice_selection.set_voice(config_models.VoiceWithOptions(voice_a_1.voice_id, {}))
+
+        realtime_config = config_models.RealtimeConfig()
+        realtime_config.front = config_models.RealtimeConfigSide()
+        realtime_config.front.side_enabled = True
+        realtime_config.front.source = config_models.RealtimeSourceAnkiTTS()
+        realtime_config.front.source.field_name = 'Chinese'
+        realtime_config.front.source.field_type = constants.AnkiTTSFieldType.Regular
+        realtime_config.front.text_processing = config_models.TextProcessing()
+        realtime_config.front.voice_selection = voice_selection
+        realtime_config.back = config_models.RealtimeConfigSide()
+        settings_key = hypertts_instance.save_realtime_config(realtime_config, None)
+
+        tts_tag = testing_utils.MockTTSTag('老人家')
+        tts_tag.other_args = [f'{constants.TTS_TAG_HYPERTTS_PRESET}=Front_{settings_key}']
+
+        with unittest.mock.patch.object(hypertts_instance, 'get_realtime_side_config', 
+                wraps=hypertts_instance.get_realtime_side_config) as get_realtime_side_config:
+            full_filename = hypertts_instance.get_audio_filename_tts_tag(tts_tag)
+            self.assertEqual(get_realtime_side_config.call_count, 1)
+            audio_data = hypertts_instance.anki_utils.extract_mock_tts_audio(full_filename)
+            self.assertEqual(audio_data['source_text'], '老人家')
+
+            # second play doesn't need to load the realtime config
+            self.assertEqual(hypertts_instance.get_audio_filename_tts_tag(tts_tag), full_filename)
+            self.assertEqual(get_realtime_side_config.call_count, 1)
+
+            # different text
+            tts_tag_2 = testing_utils.MockTTSTag('你好')
+            tts_tag_2.other_args = tts_tag.other_args
+            hypertts_instance.get_audio_filename_tts_tag(tts_tag_2)
+            self.assertEqual(get_realtime_side_config.call_count, 2)
+
+            # saving the realtime config invalidates the cache
+            realtime_config.front.voice_selection.get_voice().options = {'speaking_rate': 2.0}
+            hypertts_instance.save_realtime_config(realtime_config, settings_key)
+            new_full_filename = hypertts_instance.get_audio_filename_tts_tag(tts_tag)
+            self.assertEqual(get_realtime_side_config.call_count, 3)
+            self.assertNotEqual(new_full_filename, full_filename)
+
+            # removed file gets regenerated
+            os.remove(new_full_filename)
+            self.assertEqual(hypertts_instance.get_audio_filename_tts_tag(tts_tag), new_full_filename)
+            self.assertEqual(get_realtime_side_config.call_count, 4)
+            self.assertTrue(os.path.isfile(new_full_filename))
+
+    def test_render_card_template_extract_tts_tag(self):
+        config_gen = testing_utils.TestConfigGenerator()
+        hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
+
+        voice_list = hypertts_instance.service_manager.full_voice_list()
+        voice_a_1 = [x for x in voice_list if x.name == 'voice_a_1'][0]
+        voice_selection = config_models.VoiceSelectionSingle()
+        voice_selection.set_voice(config_models.VoiceWithOptions(voice_a_1.voice_id, {}))
+
+        realtime_side = config_models.RealtimeConfigSide()
+        realtime_side.side_enabled = True
+        realtime_side.source = config_models.RealtimeSourceAnkiTTS()
+        realtime_side.source.field_name = 'Chinese'
+        realtime_side.source.field_type = constants.AnkiTTSFieldType.Regular
+        realtime_side.text_processing = config_models.TextProcessing()
+        realtime_side.voice_selection = voice_selection
+
+        note_1 = hypertts_instance.anki_utils.get_note_by_id(config_gen.note_id_1)
+        original_templates = json.loads(json.dumps(note_1.note_type()['tmpls']))
+
+        tts_tags = hypertts_instance.render_card_template_extract_tts_tag(realtime_side, note_1, constants.AnkiCardSide.Front, 0)
+        self.assertEqual([tag.field_text for tag in tts_tags], ['老人家'])
+        self.assertEqual(len(hypertts_instance.realtime_preview_template_cache), 1)
+
+        # render again with a different field, the cached template gets reused
+        realtime_side.source.field_name = 'English'
+        tts_tags = hypertts_instance.render_card_template_extract_tts_tag(realtime_side, note_1, constants.AnkiCardSide.Back, 0)
+        self.assertEqual([tag.field_text for tag in tts_tags], ['old people'])
+        self.assertEqual(len(hypertts_instance.realtime_preview_template_cache), 1)
+
+        # the note type is left untouched
+        self.assertEqual(note_1.note_type()['tmpls'], original_templates)
+
     def test_keep_only_sound_tags(self):
         config_gen = testing_utils.TestConfigGenerator()
         hypertts_instance = config_gen.build_hypertts_instance_test_servicemanager('default')
@@ -0,0 +1,75 @@
+import os
+import errno
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from hypertts_addon import media_link
+
+
+class MediaLinkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(prefix='hypertts_testing_media_link_')
+        self.user_files_dir = os.path.join(self.temp_dir.name, 'user_files')
+        self.media_dir = os.path.join(self.temp_dir.name, 'collection.media')
+        os.mkdir(self.user_files_dir)
+        os.mkdir(self.media_dir)
+        media_link.unsupported_media_dirs.clear()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, directory, filename, data):
+        path = os.path.join(directory, filename)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_link_media_file(self):
+        source_path = self.write_file(self.user_files_dir, 'hypertts-1.mp3', b'audio 1')
+        self.assertEqual(media_link.link_media_file(source_path, self.media_dir), 'hypertts-1.mp3')
+        media_path = os.path.join(self.media_dir, 'hypertts-1.mp3')
+        self.assertTrue(os.path.samefile(source_path, media_path))
+
+        # already linked, no new link
+        with patch('os.link') as link_mock:
+            self.assertEqual(media_link.link_media_file(source_path, self.media_dir), 'hypertts-1.mp3')
+            link_mock.assert_not_called()
+
+        # regenerating the cached file (written to a new file, then swapped in) leaves the media file alone
+        temp_path = self.write_file(self.user_files_dir, 'hypertts-1.mp3.tmp', b'audio 1 regenerated')
+        os.replace(temp_path, source_path)
+        with open(media_path, 'rb') as f:
+            self.assertEqual(f.read(), b'audio 1')
+
+        # same name, different file: let anki copy (and rename) it
+        self.assertEqual(media_link.link_media_file(source_path, self.media_dir), None)
+
+        # empty files don't get linked
+        empty_path = self.write_file(self.user_files_dir, 'hypertts-2.mp3', b'')
+        self.assertEqual(media_link.link_media_file(empty_path, self.media_dir), None)
+
+    def test_fallback(self):
+        source_path = self.write_file(self.user_files_dir, 'hypertts-1.mp3', b'audio 1')
+
+        # hardlink fails (different filesystem), reflink gets used
+        def reflink_file(source, target):
+            self.write_file(self.media_dir, 'hypertts-1.mp3', b'audio 1')
+        with patch('os.link', side_effect=OSError(errno.EXDEV, 'cross-device link')):
+            with patch.object(media_link, 'reflink_file', side_effect=reflink_file):
+                self.assertEqual(media_link.link_media_file(source_path, self.media_dir), 'hypertts-1.mp3')
+
+        # a reflink which doesn't match the source gets removed
+        source_path = self.write_file(self.user_files_dir, 'hypertts-2.mp3', b'audio 2')
+        def bad_reflink_file(source, target):
+            self.write_file(self.media_dir, 'hypertts-2.mp3', b'audio')
+        with patch('os.link', side_effect=OSError(errno.EXDEV, 'cross-device link')):
+            with patch.object(media_link, 'reflink_file', side_effect=bad_reflink_file):
+                self.assertEqual(media_link.link_media_file(source_path, self.media_dir), None)
+        self.assertFalse(os.path.exists(os.path.join(self.media_dir, 'hypertts-2.mp3')))
+
+        # linking isn't attempted again on that media folder
+        with patch('os.link') as link_mock:
+            self.assertEqual(media_link.link_media_file(source_path, self.media_dir), None)
+            link_mock.assert_not_called()
@@ -1,6 +1,10 @@
 import sys
 import os
 import json
+import time
+import tempfile
+import threading
+import concurrent.futures
 import unittest
 from unittest.mock import MagicMock, patch
 
@@ -13,6 +17,8 @@ from hypertts_addon import servicemanager
 from hypertts_addon import voice
 from hypertts_addon import errors
 from hypertts_addon import context
+from hypertts_addon import lookup_cache
+from hypertts_addon import startup
 
 
 class ServiceManagerTests(unittest.TestCase):
@@ -35,6 +41,58 @@ class ServiceManagerTests(unittest.TestCase):
     def test_import(self):
         self.manager.init_services()
 
+    def test_lazy_service_loading(self):
+        service_modules = [f'{constants.DIR_HYPERTTS_ADDON}.test_services.{module_name}' for module_name in ['service_a', 'service_b', 'service_c']]
+        with patch.dict(sys.modules):
+            for module_name in service_modules:
+                sys.modules.pop(module_name, None)
+            manager = servicemanager.ServiceManager(testing_utils.get_test_services_dir(), f'{constants.DIR_HYPERTTS_ADDON}.test_services', True, testing_utils.MockCloudLanguageTools())
+            manager.init_services()
+            # the manifest is enough to know which services exist
+            self.assertTrue(manager.service_exists('ServiceA'))
+            self.assertTrue(manager.service_exists('ServiceC'))
+            self.assertFalse(manager.service_exists('ServiceZ'))
+            self.assertEqual(manager.services, {})
+
+            # disabled services don't get imported when configuring
+            configuration = config_models.Configuration()
+            configuration.set_service_enabled('ServiceA', True)
+            configuration.set_service_enabled('ServiceB', False)
+            manager.configure(configuration)
+            self.assertEqual(manager.services, {})
+            for module_name in service_modules:
+                self.assertNotIn(module_name, sys.modules)
+
+            # first use imports the module, only for the enabled service
+            voice_list = manager.full_voice_list()
+            self.assertEqual(set([voice.service for voice in voice_list]), set(['ServiceA']))
+            self.assertEqual(list(manager.services.keys()), ['ServiceA'])
+            self.assertTrue(manager.get_service('ServiceA').enabled)
+            self.assertIn(service_modules[0], sys.modules)
+            self.assertNotIn(service_modules[1], sys.modules)
+
+            # pending enabled state gets applied when the service is loaded
+            self.assertFalse(manager.get_service('ServiceB').enabled)
+            self.assertIn(service_modules[1], sys.modules)
+
+    def test_manifest_matches_services(self):
+        # the manifest duplicates what the service classes report, it has to stay in sync with them
+        for services_dir, package_name in [
+                (testing_utils.get_test_services_dir(), f'{constants.DIR_HYPERTTS_ADDON}.test_services'),
+                (startup.services_dir(), f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}')]:
+            manager = servicemanager.ServiceManager(services_dir, package_name, True, testing_utils.MockCloudLanguageTools())
+            manifest_entries = manager.load_manifest()
+            # every service module is listed
+            self.assertEqual(sorted(manager.discover_services()), sorted([entry.module_name for entry in manifest_entries]))
+            for entry in manifest_entries:
+                module = manager.import_service_module(entry.module_name)
+                service_instance = getattr(module, entry.name)()
+                self.assertEqual(service_instance.name, entry.name)
+                self.assertEqual(service_instance.service_type, entry.service_type, entry.name)
+                self.assertEqual(service_instance.service_fee, entry.service_fee, entry.name)
+                self.assertEqual(service_instance.cloudlanguagetools_enabled(), entry.cloudlanguagetools_enabled, entry.name)
+                self.assertEqual(service_instance.test_service(), entry.test_service, entry.name)
+
     def test_services_enabled(self):
         # test service enabled / disabled logic
 
@@ -198,6 +256,62 @@ class ServiceManagerTests(unittest.TestCase):
         assert servicea_voice_1.name == 'jane'
         assert servicea_voice_1.audio_languages == [languages.AudioLanguage.ja_JP]
 
+    def test_voice_index(self):
+        self.manager.init_services()
+        self.manager.get_service('ServiceA').enabled = True
+        self.manager.get_service('ServiceB').enabled = True
+        voice_list = self.manager.full_voice_list()
+
+        voice_index = voice.VoiceIndex(voice_list)
+        # voices are sorted by display string
+        assert voice_index.display_names == sorted([str(entry) for entry in voice_list])
+        assert [str(entry) for entry in voice_index.voices] == voice_index.display_names
+
+        # no filters
+        assert voice_index.filter() == list(range(len(voice_list)))
+
+        def filtered_voices(**kwargs):
+            return [voice_index.voices[position] for position in voice_index.filter(**kwargs)]
+
+        def expected_voices(predicate):
+            return sorted([entry for entry in voice_list if predicate(entry)], key=str)
+
+        assert filtered_voices(service='ServiceA') == expected_voices(lambda v: v.service == 'ServiceA')
+        assert filtered_voices(language=languages.Language.ja) == expected_voices(lambda v: languages.Language.ja in v.language_list)
+        assert filtered_voices(audio_language=languages.AudioLanguage.fr_FR, gender=constants.Gender.Male) == \
+            expected_voices(lambda v: languages.AudioLanguage.fr_FR in v.audio_languages and v.gender == constants.Gender.Male)
+        # no voices match
+        assert filtered_voices(language=languages.Language.en, service='ServiceB') == []
+
+        # type-ahead search, case insensitive
+        subset = filtered_voices(search_text='VOICE_A_1')
+        assert [entry.name for entry in subset] == ['voice_a_1']
+        assert filtered_voices(service='ServiceB', search_text='voice_a') == []
+
+
+    def test_voice_interning(self):
+        def build_voice(name, options, audio_languages):
+            return voice.TtsVoice_v3(name=name, voice_key={'name': name}, options=options, service='ServiceA',
+                gender=constants.Gender.Male, audio_languages=audio_languages, service_fee=constants.ServiceFee.free)
+
+        voice_1 = build_voice('voice_1', {'speed': {'type': 'number', 'min': 0.5, 'max': 2.0, 'default': 1.0}}, [languages.AudioLanguage.fr_FR])
+        voice_2 = build_voice('voice_2', {'speed': {'type': 'number', 'min': 0.5, 'max': 2.0, 'default': 1.0}}, [languages.AudioLanguage.fr_FR])
+        # same values but with a different type
+        voice_3 = build_voice('voice_3', {'speed': {'type': 'number', 'min': 0.5, 'max': 2, 'default': 1.0}}, [languages.AudioLanguage.en_US])
+
+        # identical schemas and language lists are shared
+        self.assertIs(voice_1.options, voice_2.options)
+        self.assertIs(voice_1.audio_languages, voice_2.audio_languages)
+        self.assertIsNot(voice_1.options, voice_3.options)
+        self.assertIsInstance(voice_3.options['speed']['max'], int)
+        self.assertEqual(voice_3.audio_languages, [languages.AudioLanguage.en_US])
+
+        # no per-instance dict, the voice id is computed once
+        self.assertFalse(hasattr(voice_1, '__dict__'))
+        self.assertIs(voice_1.voice_id, voice_1.get_voice_id())
+        self.assertEqual(voice_1.voice_id, voice.TtsVoiceId_v3(voice_key={'name': 'voice_1'}, service='ServiceA'))
+        self.assertEqual(voice_1.language_list, [languages.Language.fr])
+        self.assertEqual(voice_1, build_voice('voice_1', {'speed': {'type': 'number', 'min': 0.5, 'max': 2.0, 'default': 1.0}}, [languages.AudioLanguage.fr_FR]))
 
     def test_voice_serialization(self):
         self.manager.init_services()
@@ -309,3 +423,256 @@ class ServiceManagerTests(unittest.TestCase):
                 print(f'{key} is integer')
             elif isinstance(value, list):
                 print(f'{key} is list')
+
+    def test_access_token_manager(self):
+        self.manager.init_services()
+        service_a = self.manager.get_service('ServiceA')
+
+        fetch_count = {'count': 0}
+        def fetch_access_token():
+            time.sleep(0.2)
+            fetch_count['count'] += 1
+            return f'token_{fetch_count["count"]}', 3600
+
+        with patch.object(service_a, 'fetch_access_token', side_effect=fetch_access_token):
+            # concurrent workers share a single auth round trip
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                tokens = list(executor.map(lambda i: service_a.get_access_token(), range(8)))
+            assert tokens == ['token_1'] * 8
+            assert fetch_count['count'] == 1
+
+            # token is cached until it gets close to expiry
+            assert service_a.get_access_token() == 'token_1'
+            assert fetch_count['count'] == 1
+
+            # about to expire: current token is still handed out, refreshed in the background
+            service_a.token_manager.set_token('token_1', constants.ACCESS_TOKEN_REFRESH_MARGIN_SECONDS - 1)
+            assert service_a.get_access_token() == 'token_1'
+            for i in range(50):
+                if service_a.get_access_token() == 'token_2':
+                    break
+                time.sleep(0.1)
+            assert service_a.get_access_token() == 'token_2'
+            assert fetch_count['count'] == 2
+
+            # reconfiguring the service drops the token
+            configuration = config_models.Configuration()
+            configuration.set_service_enabled('ServiceA', True)
+            configuration.set_service_configuration_key('ServiceA', 'api_key', 'yoyo')
+            self.manager.configure(configuration)
+            assert service_a.get_access_token() == 'token_3'
+            assert fetch_count['count'] == 3
+
+        # a refresh which was in flight when the service got reconfigured doesn't bring back its token
+        fetch_started = threading.Event()
+        fetch_release = threading.Event()
+        def fetch_access_token_blocking():
+            fetch_started.set()
+            fetch_release.wait(5)
+            return 'stale_token', 3600
+        with patch.object(service_a, 'fetch_access_token', side_effect=fetch_access_token_blocking):
+            refresh_thread = threading.Thread(target=service_a.token_manager.background_refresh)
+            refresh_thread.start()
+            assert fetch_started.wait(5)
+            service_a.token_manager.invalidate()
+            fetch_release.set()
+            refresh_thread.join()
+        assert service_a.token_manager.token == None
+
+    def test_service_client(self):
+        self.manager.init_services()
+        configuration = config_models.Configuration()
+        configuration.set_service_enabled('ServiceA', True)
+        configuration.set_service_configuration_key('ServiceA', 'api_key', 'yoyo')
+        self.manager.configure(configuration)
+        service_a = self.manager.get_service('ServiceA')
+        self.assertFalse(self.manager.get_service('ServiceB').uses_client())
+
+        build_count = {'count': 0, 'fail': False}
+        def build_client(service_self):
+            time.sleep(0.2)
+            if build_count['fail']:
+                build_count['fail'] = False
+                raise Exception('could not build client')
+            build_count['count'] += 1
+            return f'client_{build_count["count"]}'
+
+        with patch.object(type(service_a), 'build_client', build_client):
+            self.assertTrue(service_a.uses_client())
+            # built in the background, requests which come in the meantime wait for it
+            prepare_thread = threading.Thread(target=self.manager.prepare_service_clients)
+            prepare_thread.start()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                clients = list(executor.map(lambda i: service_a.get_client(), range(8)))
+            prepare_thread.join()
+            self.assertEqual(clients, ['client_1'] * 8)
+            self.assertEqual(build_count['count'], 1)
+
+            # reconfiguring the service drops the client
+            self.manager.configure(configuration)
+            self.assertEqual(service_a.get_client(), 'client_2')
+
+            # a failure isn't remembered
+            self.manager.configure(configuration)
+            build_count['fail'] = True
+            self.manager.prepare_service_clients()
+            self.assertEqual(service_a.get_client(), 'client_3')
+
+    def test_lookup_cache(self):
+        self.manager.init_services()
+        service_a = self.manager.get_service('ServiceA')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            database_path = os.path.join(temp_dir, constants.LOOKUP_CACHE_FILENAME)
+            self.manager.set_lookup_cache(lookup_cache.LookupCache(database_path))
+
+            lookup_count = {'count': 0}
+            def get_lookup_fn(audio_url):
+                def lookup():
+                    lookup_count['count'] += 1
+                    return audio_url
+                return lookup
+
+            # found and not found both get remembered
+            assert service_a.lookup_audio_url('word_1', get_lookup_fn('https://audio/word_1.mp3')) == 'https://audio/word_1.mp3'
+            assert service_a.lookup_audio_url('word_2', get_lookup_fn(None)) == None
+            assert lookup_count['count'] == 2
+            assert service_a.lookup_audio_url('word_1', get_lookup_fn('https://audio/other.mp3')) == 'https://audio/word_1.mp3'
+            assert service_a.lookup_audio_url('word_2', get_lookup_fn('https://audio/other.mp3')) == None
+            assert lookup_count['count'] == 2
+
+            # transient errors are not remembered
+            def failing_lookup():
+                raise errors.RequestError('word_3', None, 'status code 503')
+            with self.assertRaises(errors.RequestError):
+                service_a.lookup_audio_url('word_3', failing_lookup)
+            assert service_a.lookup_audio_url('word_3', get_lookup_fn('https://audio/word_3.mp3')) == 'https://audio/word_3.mp3'
+            assert lookup_count['count'] == 3
+
+            # persisted across instances
+            self.manager.lookup_cache.close()
+            self.manager.set_lookup_cache(lookup_cache.LookupCache(database_path))
+            assert service_a.lookup_audio_url('word_1', get_lookup_fn('https://audio/other.mp3')) == 'https://audio/word_1.mp3'
+            assert lookup_count['count'] == 3
+
+            # not found entries expire sooner than found entries
+            later = time.time() + constants.LOOKUP_CACHE_NOT_FOUND_TTL_SECONDS + 60
+            with patch('hypertts_addon.lookup_cache.time.time', return_value=later):
+                assert service_a.lookup_audio_url('word_1', get_lookup_fn('https://audio/other.mp3')) == 'https://audio/word_1.mp3'
+                assert service_a.lookup_audio_url('word_2', get_lookup_fn('https://audio/word_2.mp3')) == 'https://audio/word_2.mp3'
+            assert lookup_count['count'] == 4
+
+            # forget an entry
+            service_a.forget_audio_url('word_1')
+            assert service_a.lookup_audio_url('word_1', get_lookup_fn('https://audio/word_1_new.mp3')) == 'https://audio/word_1_new.mp3'
+            assert lookup_count['count'] == 5
+
+            self.manager.lookup_cache.close()
+            self.manager.set_lookup_cache(None)
+
+    def test_circuit_breaker(self):
+        self.manager.init_services()
+        service_b = self.manager.get_service('ServiceB')
+        voice_a_1 = [x for x in self.manager.get_service('ServiceA').voice_list() if x.name == 'voice_a_1'][0]
+        voice_b_1 = [x for x in service_b.voice_list() if x.name == 'alex'][0]
+        audio_request_context = context.AudioRequestContext(constants.AudioRequestReason.batch)
+
+        request_count = {'count': 0}
+        def get_tts_audio_down(source_text, voice, options):
+            request_count['count'] += 1
+            raise errors.ServiceConnectionError(source_text, voice, 'connection refused')
+
+        with patch.object(service_b, 'get_tts_audio', side_effect=get_tts_audio_down), \
+                patch.object(constants, 'CIRCUIT_BREAKER_OPEN_SECONDS', 0.2):
+            self.manager.circuit_breakers = {}
+            for i in range(constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD):
+                with self.assertRaises(errors.ServiceConnectionError):
+                    self.manager.get_tts_audio('old man', voice_b_1, {}, audio_request_context)
+
+            # circuit is open, fails fast without making a request. not retried by batches
+            with self.assertRaises(errors.ServiceUnavailableError) as cm:
+                self.manager.get_tts_audio('old man', voice_b_1, {}, audio_request_context)
+            assert cm.exception.retryable == False
+            assert request_count['count'] == constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+
+            # other services are not affected
+            self.manager.get_tts_audio('old man', voice_a_1, {}, audio_request_context)
+
+            # a trial request goes through after a while, it fails and the circuit opens again
+            time.sleep(0.3)
+            with self.assertRaises(errors.ServiceConnectionError):
+                self.manager.get_tts_audio('old man', voice_b_1, {}, audio_request_context)
+            with self.assertRaises(errors.ServiceUnavailableError):
+                self.manager.get_tts_audio('old man', voice_b_1, {}, audio_request_context)
+            assert request_count['count'] == constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD + 1
+
+        # service is back up, the next trial request closes the circuit
+        time.sleep(0.3)
+        with patch.object(service_b, 'get_tts_audio', return_value=b'audio'):
+            self.manager.get_tts_audio('old man', voice_b_1, {}, audio_request_context)
+            self.manager.get_tts_audio('old man', voice_b_1, {}, audio_request_context)
+        self.manager.circuit_breakers = {}
+
+    def test_request_scheduler_priority(self):
+        self.manager.init_services()
+        service_a = self.manager.get_service('ServiceA')
+        voice_a_1 = [x for x in service_a.voice_list() if x.name == 'voice_a_1'][0]
+        scheduler = self.manager.request_scheduler
+
+        started_requests = []
+        started_condition = threading.Condition()
+        release_semaphore = threading.Semaphore(0)
+        def get_tts_audio(source_text, voice, options):
+            with started_condition:
+                started_requests.append(source_text)
+                started_condition.notify_all()
+            release_semaphore.acquire(timeout=5)
+            return b'audio'
+
+        def wait_for_started(count):
+            with started_condition:
+                assert started_condition.wait_for(lambda: len(started_requests) >= count, timeout=5)
+
+        def wait_for(condition):
+            for i in range(100):
+                if condition():
+                    return
+                time.sleep(0.01)
+            raise Exception('timed out')
+
+        def request(executor, source_text, audio_request_reason):
+            return executor.submit(self.manager.get_tts_audio, source_text, voice_a_1, {},
+                context.AudioRequestContext(audio_request_reason))
+
+        with patch.object(service_a, 'get_tts_audio', side_effect=get_tts_audio), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            # batch requests can't use all the slots
+            futures = [request(executor, f'batch_{i}', constants.AudioRequestReason.batch) for i in range(5)]
+            batch_limit = constants.SERVICE_MAX_CONCURRENT_REQUESTS - constants.SERVICE_RESERVED_INTERACTIVE_REQUESTS
+            wait_for(lambda: len(started_requests) == batch_limit and scheduler.waiting_request_count('ServiceA') == 5 - batch_limit)
+
+            # a realtime request goes through right away
+            futures.append(request(executor, 'realtime_1', constants.AudioRequestReason.realtime))
+            wait_for_started(batch_limit + 1)
+            assert started_requests[batch_limit] == 'realtime_1'
+
+            # once the service is busy, waiting requests go by priority
+            futures.append(request(executor, 'preview', constants.AudioRequestReason.preview))
+            wait_for(lambda: scheduler.waiting_request_count('ServiceA') == 5 - batch_limit + 1)
+            futures.append(request(executor, 'realtime_2', constants.AudioRequestReason.realtime))
+            wait_for(lambda: scheduler.waiting_request_count('ServiceA') == 5 - batch_limit + 2)
+
+            # the service is full, each request finishing lets the next one in line start
+            release_semaphore.release()
+            wait_for_started(batch_limit + 2)
+            release_semaphore.release()
+            wait_for_started(batch_limit + 3)
+            # the remaining batch requests
+            release_semaphore.release(len(futures) - 2)
+            for future in futures:
+                assert future.result(timeout=5) == b'audio'
+
+        assert started_requests[batch_limit + 1:batch_limit + 3] == ['realtime_2', 'preview']
+        # the batch requests were all submitted at the same time, the order among them isn't known
+        assert sorted(started_requests[:batch_limit] + started_requests[batch_limit + 3:]) == [f'batch_{i}' for i in range(5)]
+        assert scheduler.waiting_request_count('ServiceA') == 0
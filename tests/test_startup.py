@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+from test_utils import testing_utils
+
+from hypertts_addon import constants
+from hypertts_addon import startup
+from hypertts_addon import startup_tracer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# run in a separate interpreter, the test process has imported every service module already
+INIT_HYPERTTS_IMPORTS_SCRIPT = '''
+import sys
+import os
+import json
+sys._pytest_mode = True
+sys.path.insert(0, os.path.join(sys.argv[1], 'external'))
+sys.path.insert(0, sys.argv[1])
+from test_utils import testing_utils
+from hypertts_addon import startup
+from hypertts_addon import startup_tracer
+startup.init_hypertts(testing_utils.MockAnkiUtils({}), startup_tracer.StartupTracer())
+print(json.dumps(list(sys.modules.keys())))
+'''
+
+class StartupTests(unittest.TestCase):
+
+    def test_init_hypertts(self):
+        # runs the same initialization sequence as when Anki loads the addon
+        anki_utils = testing_utils.MockAnkiUtils({})
+        tracer = startup_tracer.StartupTracer()
+        hyper_tts = startup.init_hypertts(anki_utils, tracer)
+
+        phase_names = [phase.name for phase in tracer.phases]
+        self.assertEqual(phase_names, ['service discovery', 'lookup cache', 'hypertts and config migration', 'configure services'])
+
+        # no service gets instantiated until it's used
+        self.assertEqual(hyper_tts.service_manager.services, {})
+        self.assertTrue(hyper_tts.service_manager.service_exists('Azure'))
+
+        startup.finish_trace(anki_utils, tracer)
+        report_path = os.path.join(anki_utils.get_user_files_dir(), constants.STARTUP_REPORT_FILENAME)
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+        self.assertEqual([phase['name'] for phase in report['phases']], phase_names)
+        self.assertAlmostEqual(report['total_seconds'], tracer.get_total_seconds(), places=3)
+
+    def test_init_hypertts_imports(self):
+        # no service module or voice catalog gets imported until a service is used
+        result = subprocess.run([sys.executable, '-c', INIT_HYPERTTS_IMPORTS_SCRIPT, ROOT_DIR],
+            capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        module_names = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertIn(f'{constants.DIR_HYPERTTS_ADDON}.servicemanager', module_names)
+        for module_name in module_names:
+            self.assertFalse(module_name.startswith(f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}.service_'), module_name)
+            self.assertNotEqual(module_name, f'{constants.DIR_HYPERTTS_ADDON}.{constants.DIR_SERVICES}.voicelist')
+
+    def test_tracer(self):
+        tracer = startup_tracer.StartupTracer()
+        with tracer.phase('import'):
+            import xml.dom.minidom
+        with self.assertRaises(ValueError):
+            with tracer.phase('failing'):
+                raise ValueError('init error')
+
+        self.assertEqual(tracer.get_phase('failing').imported_modules, [])
+        self.assertGreaterEqual(tracer.get_phase('failing').start_seconds, tracer.get_phase('import').duration_seconds)
+
+        # slow startup gets reported
+        with self.assertLogs(startup_tracer.logger, level='WARNING'):
+            tracer.finish(os.devnull, warning_seconds=0)
@@ -0,0 +1,73 @@
+import sys
+import time
+import threading
+import unittest
+import unittest.mock
+
+from hypertts_addon import stats
+
+
+class EventQueueTests(unittest.TestCase):
+
+    def test_batches_and_drop_policy(self):
+        sent_batches = []
+        send_event = threading.Event()
+        def send_batch(events):
+            sent_batches.append(events)
+            send_event.set()
+
+        # a full batch goes out right away, from a single thread
+        event_queue = stats.EventQueue(send_batch, 0.2, 10, 25)
+        for i in range(10):
+            event_queue.add({'event': f'event_{i}'})
+        self.assertTrue(send_event.wait(0.1))
+        self.assertEqual(sent_batches, [[{'event': f'event_{i}'} for i in range(10)]])
+
+        # smaller batches go out after the flush interval
+        sent_batches.clear()
+        send_event.clear()
+        event_queue.add({'event': 'event_10'})
+        self.assertTrue(send_event.wait(1))
+        self.assertEqual(sent_batches, [[{'event': 'event_10'}]])
+
+        # thread goes away when there's nothing left to send
+        for i in range(100):
+            if event_queue.thread == None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(event_queue.thread, None)
+
+        # the queue is bounded, oldest events get dropped
+        sent_batches.clear()
+        event_queue = stats.EventQueue(send_batch, 60, 100, 25)
+        for i in range(40):
+            event_queue.add({'event': f'event_{i}'})
+        self.assertEqual(event_queue.pending_event_count(), 25)
+        self.assertEqual(event_queue.dropped_event_count, 15)
+        event_queue.flush()
+        self.assertEqual(sent_batches, [[{'event': f'event_{i}'} for i in range(15, 40)]])
+        self.assertEqual(event_queue.pending_event_count(), 0)
+
+    def test_flush_events(self):
+        # called when the profile closes, sends whatever is still queued
+        sent_batches = []
+        event_queue = stats.EventQueue(sent_batches.append, 60, 100, 25)
+        event_queue.add({'event': 'event_1'})
+        stats_global = unittest.mock.Mock()
+        stats_global.event_queue = event_queue
+        with unittest.mock.patch.object(sys, '_hypertts_stats_global', stats_global, create=True):
+            stats.flush_events()
+        self.assertEqual(sent_batches, [[{'event': 'event_1'}]])
+
+    def test_flush_stops_on_failure(self):
+        # when offline, flushing gives up after the first batch instead of waiting for the timeout of each one
+        sent_batches = []
+        def send_batch(events):
+            sent_batches.append(events)
+            return False
+        event_queue = stats.EventQueue(send_batch, 60, 10, 100)
+        # queued directly, add() would have the background thread send the full batches
+        event_queue.events.extend([{'event': f'event_{i}'} for i in range(30)])
+        event_queue.flush()
+        self.assertEqual(sent_batches, [[{'event': f'event_{i}'} for i in range(10)]])
+        self.assertEqual(event_queue.pending_event_count(), 20)
@@ -272,4 +272,76 @@ def test_check_length(qtbot):
     pytest.raises(errors.SourceTextEmpty, text_utils.check_length, '')
     pytest.raises(errors.SourceTextEmpty, text_utils.check_length, '  ')
     pytest.raises(errors.SourceTextEmpty, text_utils.check_length, ' \t\n ')
-    pytest.raises(errors.SourceTextEmpty, text_utils.check_length, None)
\ No newline at end of file
+    pytest.raises(errors.SourceTextEmpty, text_utils.check_length, None)
+
+def test_split_text_chunks(qtbot):
+    # short text is left alone
+    assert text_utils.split_text_chunks('Hello there.', 20) == ['Hello there.']
+
+    # sentences are packed together up to the limit
+    text = 'The old man walked. He was tired! Was he hungry? Yes.'
+    assert text_utils.split_text_chunks(text, 35) == ['The old man walked. He was tired!', 'Was he hungry? Yes.']
+    assert text_utils.split_text_chunks(text, 20) == ['The old man walked.', 'He was tired!', 'Was he hungry? Yes.']
+
+    # CJK sentence endings aren't followed by spaces, and none get added
+    assert text_utils.split_text_chunks('我很好。你呢？我也很好。', 8) == ['我很好。你呢？', '我也很好。']
+    assert ''.join(text_utils.split_text_chunks('我很好。你呢？我也很好。' * 5, 10)) == '我很好。你呢？我也很好。' * 5
+
+    # a sentence longer than the limit gets split at commas and spaces, then mid-word
+    assert text_utils.split_text_chunks('one two three, four five', 14) == ['one two three,', 'four five']
+    assert text_utils.split_text_chunks('abcdefghij', 4) == ['abcd', 'efgh', 'ij']
+
+    # no chunk goes above the limit, and no text is lost
+    text = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 20
+    chunks = text_utils.split_text_chunks(text, 100)
+    assert all([len(chunk) <= 100 for chunk in chunks])
+    assert ' '.join(chunks).split() == text.split()
+
+    # markup doesn't get cut, even at the spaces inside of it
+    text = 'Hello there my friend <break time="1s"/> how are you'
+    assert text_utils.split_text_chunks(text, 30) == ['Hello there my friend', '<break time="1s"/> how are you']
+    assert text_utils.split_text_chunks('abcdefgh<break time="1s"/>ijk', 10) == ['abcdefgh', '<break time="1s"/>', 'ijk']
+
+def test_process_text_bulk(qtbot):
+    source_texts = [
+        'sentence word_a word_c',
+        '<b>unter</b> (etw +D) [sound:test.mp3]',
+        '{{c1::Paris::capital}} is in France',
+        'A &amp; B {curly} [square] <angle>',
+        '你好，世界',
+        '  plain text  ',
+        '',
+    ]
+    rule_simple = config_models.TextReplacementRule(constants.TextReplacementRuleType.Simple)
+    rule_simple.source = 'word_a'
+    rule_simple.target = 'word_b'
+    rule_regex = config_models.TextReplacementRule(constants.TextReplacementRuleType.Regex)
+    rule_regex.source = 'PARIS'
+    rule_regex.target = 'Lyon'
+
+    # same result as processing the texts one by one, with each combination of options
+    for run_replace_rules_after in [True, False]:
+        for enabled in [True, False]:
+            text_processing = config_models.TextProcessing()
+            text_processing.run_replace_rules_after = run_replace_rules_after
+            text_processing.html_to_text_line = enabled
+            text_processing.strip_brackets = enabled
+            text_processing.strip_cloze = enabled
+            text_processing.ssml_convert_characters = enabled
+            text_processing.ignore_case = enabled
+            text_processing.add_text_replacement_rule(rule_simple)
+            text_processing.add_text_replacement_rule(rule_regex)
+            processed_texts, text_errors = text_utils.process_text_bulk(source_texts, text_processing)
+            assert text_errors == {}
+            assert processed_texts == [text_utils.process_text(text, text_processing) for text in source_texts]
+
+    # a rule which fails: every text gets the error process_text would raise
+    text_processing = config_models.TextProcessing()
+    rule = config_models.TextReplacementRule(constants.TextReplacementRuleType.Regex)
+    rule.source = 'yoyo)'
+    rule.target = 'rep'
+    text_processing.add_text_replacement_rule(rule)
+    processed_texts, text_errors = text_utils.process_text_bulk(source_texts, text_processing)
+    assert sorted(text_errors.keys()) == list(range(len(source_texts)))
+    assert isinstance(text_errors[0], errors.TextReplacementError)
+    assert processed_texts == [None] * len(source_texts)